@@ -0,0 +1,112 @@
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from app.info_containers.local_revision import LocalRevision
+from app.utils.db_utils import sqlite_connection, fetch_cached_analysis_result, save_cached_analysis_result, DB_PATH
+
+
+class AnalysisResultsCache(object):
+    """
+    Cache of edit war analyses results (reverts, mutual reverts and value), kept in memory and in the local database
+    under a fingerprint of the revisions analysed. Any revision added or trimmed changes the fingerprint, so results
+    of a different history are never returned and repeating an analysis only costs computing its fingerprint
+    """
+    MAX_MEMORY_ENTRIES = 128        # Max nº of results kept in memory
+    MAX_DB_ENTRIES = 4096           # Max nº of results kept in database
+
+    _results_dict: OrderedDict[str, dict] = OrderedDict()     # From least to most recently used
+    _lock = threading.Lock()
+
+
+    @staticmethod
+    def fingerprint(revs_list: list[LocalRevision], params: tuple = ()) -> str:
+        """
+        Function that computes the fingerprint of an analysis from everything its result depends on: the revision
+        fields used to detect edit wars (in order) and the parameters of the detection
+
+        :param revs_list:
+        :param params: parameters of the detection (e.g. revert horizon)
+        :return: str
+        """
+        fields = [repr(params)]
+        fields.extend(f"{local_rev.revid}\x1f{local_rev.timestamp}\x1f{local_rev.user}\x1f{local_rev.sha1}"
+                      for local_rev in revs_list)
+
+        return hashlib.blake2b("\x1e".join(fields).encode(), digest_size=20).hexdigest()
+
+
+    @classmethod
+    def get(cls, fingerprint: str, revs_list: list[LocalRevision]) \
+            -> tuple[list[tuple[LocalRevision, LocalRevision, set[str]]], list[tuple], int] | None:
+        """
+        Function that returns the result cached for an analysis, looking for it in memory and then in database
+
+        :param fingerprint:
+        :param revs_list: revisions analysed (the ones the result refers to)
+        :return: (reverts list, mutual reverts list, edit war value) | None
+        """
+        with cls._lock:
+            result = cls._results_dict.get(fingerprint)
+            if result is not None:
+                cls._results_dict.move_to_end(fingerprint)
+
+        if result is None:
+            with sqlite_connection(DB_PATH) as conn:
+                result = fetch_cached_analysis_result(conn, fingerprint)
+
+            if result is None:
+                return None
+
+            cls._remember(fingerprint, result)
+
+        # Results are stored by indexes, so they are rebuilt over the revisions given
+        reverts_list = [(revs_list[i], revs_list[j], set(reverted_users))
+                        for i, j, reverted_users in result["reverts"]]
+        mutual_reverts_list = [(reverts_list[k], reverts_list[l]) for k, l in result["mutual_reverts"]]
+
+        return reverts_list, mutual_reverts_list, result["value"]
+
+
+    @classmethod
+    def save(cls, fingerprint: str, revs_list: list[LocalRevision],
+             reverts_list: list[tuple[LocalRevision, LocalRevision, set[str]]], mutual_reverts_list: list[tuple],
+             edit_war_value: int):
+        """
+        Function that caches the result of an analysis
+
+        :param fingerprint:
+        :param revs_list: revisions analysed
+        :param reverts_list:
+        :param mutual_reverts_list:
+        :param edit_war_value:
+        :return: None
+        """
+        revs_idxs_dict = {local_rev.revid: i for i, local_rev in enumerate(revs_list)}
+        reverts_idxs_dict = {(revert[0].revid, revert[1].revid): k for k, revert in enumerate(reverts_list)}
+
+        result = {
+            "reverts": [(revs_idxs_dict[base_rev.revid], revs_idxs_dict[revertant_rev.revid], sorted(reverted_users))
+                        for base_rev, revertant_rev, reverted_users in reverts_list],
+            "mutual_reverts": [(reverts_idxs_dict[(revert_1[0].revid, revert_1[1].revid)],
+                                reverts_idxs_dict[(revert_2[0].revid, revert_2[1].revid)])
+                               for revert_1, revert_2 in mutual_reverts_list],
+            "value": edit_war_value
+        }
+
+        cls._remember(fingerprint, result)
+
+        with sqlite_connection(DB_PATH) as conn:
+            save_cached_analysis_result(conn, fingerprint, result, cls.MAX_DB_ENTRIES)
+
+
+    @classmethod
+    def _remember(cls, fingerprint: str, result: dict):
+        with cls._lock:
+            cls._results_dict[fingerprint] = result
+            cls._results_dict.move_to_end(fingerprint)
+
+            # Discard least recently used results until the memory budget is met again
+            while len(cls._results_dict) > cls.MAX_MEMORY_ENTRIES:
+                cls._results_dict.popitem(last=False)
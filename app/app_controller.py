@@ -6,31 +6,32 @@ import logging
 import sys
 from pathlib import Path
 
-import pywikibot
-
 logging.getLogger("pywikibot.api").setLevel(logging.ERROR)
 
-from ipwhois import IPWhois
 from datetime import datetime, timedelta
 from sortedcontainers import SortedSet
-from babel import Locale, localedata
 from sqlite3 import Connection
+from typing import Callable
 
 from app.wiki_crawler import WikiCrawler
 from app.edit_war_detector import EditWarDetector
+from app.whois_resolver import WhoisResolver
+from app.revision_content_cache import RevisionContentCache
+from app.revision_diff_service import RevisionDiffService
+from app.revision_store import RevisionStore
 from app.info_containers.article_edit_war_info import ArticleEditWarInfo
 from app.utils.helpers import Singleton, create_scheduled_task, delete_scheduled_task
+from app.utils.site_pool import SitePool
 from app.info_containers.local_page import LocalPage
 from app.info_containers.local_revision import LocalRevision
 from app.info_containers.local_user import LocalUser
 from app.utils.helpers import (validate_idx, ask_valid_date, print_delim_line, clear_terminal, clear_n_lines,
                            validate_idx_in_list, datetime_to_iso, ask_yes_or_no_question, plot_graph)
 from app.utils.db_utils import (reset_db, fetch_items_from_db, print_db_table, delete_from_db_table,
-                                save_session_data, save_article_data, save_period_data, save_edit_war_value,
-                                save_user_data, save_revision_data, save_revert_data, save_reverted_user_pair_data,
-                                save_mutual_revert_data, save_mutual_reverters_activity, sanitize_and_execute_select,
-                                print_query_contents, sqlite_connection, create_temp_session_db,
-                                delete_non_referenced_users, update_db_table)
+                                save_session_data, save_article_data, save_article_edit_war_data,
+                                sanitize_and_execute_select, print_query_contents, sqlite_connection,
+                                create_temp_session_db, delete_non_referenced_users, update_db_table,
+                                fetch_rescored_edit_war_values, fetch_revision_chunks, DB_PATH)
 
 
 class AppController(object):
@@ -42,6 +43,9 @@ class AppController(object):
     __SIMPLE_DATE_FORMAT = "%d/%m/%Y"
     __ISO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+    # Sessions are loaded with only the summary of each article, the rest is loaded when the article is accessed
+    LAZY_SESSION_LOADING = True
+
 
     def __init__(self, conn: Connection):
         self.articles_set = SortedSet[LocalPage]()
@@ -73,12 +77,11 @@ class AppController(object):
                     # Ask user about search parameters
                     search, limit, _ = self.__obtain_search_parameters()
 
-                    # Crawl wikipedia for articles
-                    pages = WikiCrawler.crawl_articles(search, search_limit=limit, search_type=0)
+                    # Crawl wikipedia for articles (received with their info in batches)
+                    local_pages = WikiCrawler.crawl_articles(search, search_limit=limit, search_type=0)
 
-                    # Save results in SortedSet as PageGenerator only allows to iterate it once
-                    for page in pages:
-                        self.search_articles_set.add(LocalPage.init_with_page(page))
+                    # Save results in SortedSet
+                    self.search_articles_set.update(local_pages)
 
                     # Inform user and return to main menu if search yielded no results
                     if len(self.search_articles_set) == 0:
@@ -104,12 +107,18 @@ class AppController(object):
                     if idx == 0:
                         continue    # Return to main menu
 
-                    # Extract related categories
-                    pages = self.articles_set[idx-1].categories()
+                    # Related articles can be searched automatically through several levels of categories and links
+                    question = ("Do you want to automatically search related articles through several levels of "
+                                "categories and links? (otherwise, you will select the category to search in) ")
+                    if ask_yes_or_no_question(question):
+                        self.__expand_related_articles(self.articles_set[idx-1])
+                        continue    # Return to main menu
+
+                    # Extract related categories (received with their info in batches)
+                    local_pages = WikiCrawler.crawl_categories(self.articles_set[idx-1])
 
-                    # Save results in SortedSet as PageGenerator only allows to iterate it once
-                    for page in pages:
-                        self.search_categories_set.add(LocalPage.init_with_page(page))
+                    # Save results in SortedSet
+                    self.search_categories_set.update(local_pages)
 
                     if len(self.search_categories_set) == 0:
                         clear_terminal()
@@ -155,8 +164,21 @@ class AppController(object):
                     if start_date > end_date:
                         start_date, end_date = end_date, start_date
 
-                    # Detect edit wars in all articles of the set
-                    EditWarDetector.detect_edit_wars_in_set(self.articles_set, start_date, end_date)
+                    # Articles can be triaged first from their revert tags, analysing in full only those that may
+                    # be in an edit war
+                    articles_to_analyse_set = self.articles_set
+                    question = ("Do you want to triage first the articles from their revert tags and fully analyse "
+                                "only those that may be in an edit war? ")
+                    if ask_yes_or_no_question(question):
+                        triage_results_dict = EditWarDetector.triage_articles(self.articles_set, start_date, end_date)
+                        articles_to_analyse_set = SortedSet(
+                            article for article, (may_be_edit_war, _) in triage_results_dict.items() if may_be_edit_war)
+
+                        print(f'\n{len(articles_to_analyse_set)} of {len(self.articles_set)} articles have an '
+                              f'estimated value over {EditWarDetector.TRIAGE_THRESHOLD}, analysing them in full')
+
+                    # Detect edit wars in all articles of the set (or those selected in triage)
+                    EditWarDetector.detect_edit_wars_in_set(articles_to_analyse_set, start_date, end_date)
 
                     # Show results
                     print_delim_line("-")
@@ -217,6 +239,10 @@ class AppController(object):
 
     @staticmethod
     def __obtain_search_parameters() -> [str, int, str]:
+        # Imported only when a search is made, as both libraries are slow to import
+        import pywikibot
+        from babel import Locale, localedata
+
         # Ask keywords for search
         search = input("What do you want to search for? ")
 
@@ -270,6 +296,39 @@ class AppController(object):
         return search, limit, language
 
 
+    def __expand_related_articles(self, local_page: LocalPage):
+        # Ask user about expansion parameters
+        max_depth = input("How many levels of categories and links do you want to explore? (Enter for 2) ")
+
+        while max_depth != "" and (not max_depth.isdigit() or int(max_depth) <= 0):
+            max_depth = input("Invalid nº of levels, introduce a value higher than zero ")
+
+        max_depth = 2 if max_depth == "" else int(max_depth)
+
+        page_budget = input("How many articles do you want to search at most? (Enter for 500) ")
+
+        while page_budget != "" and (not page_budget.isdigit() or int(page_budget) <= 0):
+            page_budget = input("Invalid limit, introduce a value higher than zero ")
+
+        page_budget = 500 if page_budget == "" else int(page_budget)
+
+        # Articles are added to the search results as they are found
+        print("\nSearching related articles...\n")
+
+        def on_article_found(found_page: LocalPage):
+            self.search_articles_set.add(found_page)
+            clear_n_lines(1)
+            print(f"\tArticles found: {len(self.search_articles_set)}/{page_budget}")
+
+        WikiCrawler.expand_related_articles([local_page], max_depth, page_budget, on_article_found)
+
+        # Inform user and return to main menu if search yielded no results
+        if len(self.search_articles_set) == 0:
+            input("Search yielded no results (Enter to continue) ")
+        else:
+            self.__searched_articles_menu()     # Show menu with searched articles
+
+
     def __searched_articles_menu(self) -> str:
         clear_terminal()
         print_delim_line("#")
@@ -335,12 +394,12 @@ class AppController(object):
 
             limit = None if limit == "" else int(limit)     # Adapt limit to the format that pywikibot requires
 
-            # Search articles within selected category
-            pages = WikiCrawler.crawl_articles((self.search_categories_set[int(idx)-1]).title, search_limit=limit, search_type=1)
+            # Search articles within selected category (received with their info in batches)
+            local_pages = WikiCrawler.crawl_articles((self.search_categories_set[int(idx)-1]).title,
+                                                     search_limit=limit, search_type=1)
 
             # Store results
-            for page in pages:
-                self.search_articles_set.add(LocalPage.init_with_page(page))
+            self.search_articles_set.update(local_pages)
 
             if len(self.search_articles_set) == 0:
                 input("Search yielded no results try another category (Enter to continue) ")
@@ -543,16 +602,17 @@ class AppController(object):
               f'{EditWarDetector.EDIT_WAR_THRESHOLD} is considered edit war): {edit_war_value}')
 
         # Conflict's size (nº of users mutually reverting each other)
-        if not info.mutual_reverters_dict:
-            for mutual_reverts_tuple in info.mutual_reverts_list:
-                user_i = mutual_reverts_tuple[0][1].user
-                user_j = mutual_reverts_tuple[1][1].user
-                info.mutual_reverters_dict[user_i] = info.mutual_reverters_dict.get(user_i, 0) + 1
-                info.mutual_reverters_dict[user_j] = info.mutual_reverters_dict.get(user_j, 0) + 1
+        info.count_mutual_reverters()
 
         n_mutual_reverters = len(info.mutual_reverters_dict)
         print(f'\n\t- Conflict\'s size (nº of users mutually reverting each other): {n_mutual_reverters}')
 
+        # Start Whois requests of anonymous mutual reverters in background, so they are ready if inspected
+        users_info_dict = Singleton().users_info_dict
+        WhoisResolver.prefetch(username for username in info.mutual_reverters_dict
+                               if WhoisResolver.is_ip_address(username) and (users_info_dict.get(username) is None or
+                                                                          users_info_dict[username].asn is None))
+
         # Conflict's temporal evolution
         self._print_conflict_evolution(info)
 
@@ -574,6 +634,7 @@ class AppController(object):
         print("[2] Inspect article's discussion page")
         print("[3] Inspect a user from the list")
         print("[4] Inspect a revision from the list")
+        print("[5] Show changes made by every revert")
         print("[0] Return to articles' list\n")
 
         opt = input(self.__CHOOSE_OPTION_MSG)
@@ -590,9 +651,12 @@ class AppController(object):
                 # Show discussion page
                 clear_terminal()
                 print_delim_line("#")
+                discussion_diffs = ask_yes_or_no_question("Do you want to see the changes made by each revision "
+                                                          "of the discussion page? ")
                 self.unsaved_changes = WikiCrawler.print_pages(SortedSet({local_page}),
                                                                time_range=(info.start_date, info.end_date),
-                                                               discussion_changes=True)
+                                                               discussion_changes=True,
+                                                               discussion_diffs=discussion_diffs)
                 input(self.__CONTINUE_MSG)
             case '3':
                 # Show user info, new menu until user wants to return
@@ -600,6 +664,18 @@ class AppController(object):
             case '4':
                 # Show revision info, new menu until user wants to return
                 self.__inspect_revision_menu(info, reverted_revisions_dict)
+            case '5':
+                # Show changes made by every revert (requested simultaneously if they are not cached)
+                clear_terminal()
+                print_delim_line("#")
+                print("Retrieving changes made by the reverts...")
+                diffs_dict = RevisionDiffService.get_revert_diffs(info)
+                clear_n_lines(1)
+
+                revertant_revs_list = list({revertant_rev.revid: revertant_rev
+                                            for _, revertant_rev, _ in info.reverts_list}.values())
+                self._print_revert_diffs(revertant_revs_list, diffs_dict)
+                input(self.__CONTINUE_MSG)
             case '0':
                 pass  # Return
             case _:
@@ -619,13 +695,18 @@ class AppController(object):
                 x_vals.append(interval_end_date.strftime(self.__SIMPLE_DATE_FORMAT))
                 y_vals.append(int(info.edit_war_over_time_list[i][0]))
 
+        elif info.out_of_core and info.revision_store is None:
+            # History page kept out of memory no longer exists, so only the value of the complete time range is known
+            print("\n\tHistory page of this article is no longer stored, it must be analysed again to plot its "
+                  "evolution")
+            x_vals.append(intervals[-1].strftime(self.__SIMPLE_DATE_FORMAT))
+            y_vals.append(int(info.edit_war_over_time_list[-1][0]))
+
         else:  # Otherwise, they are calculated
             print("\n\t==> Calculating edit war values to plot...\n")
 
-            # Calculate edit war values for each of the intervals. To do so, the revs_list of each interval has to
-            # be created incrementally, except for the final interval (complete time range) previously calculated
-            revs_list = []
-            last_rev_idx = 0
+            # Calculate edit war values for each of the intervals (revisions published until the end of each one),
+            # except for the final interval (complete time range) previously calculated
 
             # Save last value (complete time range) as it is already calculated in graph's values
             x_vals.append(intervals[-1].strftime(self.__SIMPLE_DATE_FORMAT))
@@ -634,20 +715,24 @@ class AppController(object):
             # Indicate that new data should be saved in database
             self.unsaved_changes = True
 
-            for i, interval_end_date in enumerate(intervals[:-1]):
+            # Histories kept out of memory are scored for every interval in a single pass over their rows
+            if info.revision_store is not None:
+                edit_war_values_list = EditWarDetector.score_revision_store(info.revision_store, intervals[:-1],
+                                                                            info.article.site)
+            else:
+                edit_war_values_list = None
 
-                # For each interval create the list of revisions published within it
-                for local_rev in info.revs_list[last_rev_idx:]:
-                    rev_date = datetime.strptime(local_rev.timestamp, self.__ISO_DATE_FORMAT)
+            for i, interval_end_date in enumerate(intervals[:-1]):
 
-                    if rev_date > interval_end_date:
-                        break
+                if edit_war_values_list is not None:
+                    edit_war_value = edit_war_values_list[i]
+                else:
+                    # For each interval take the revisions published within it
+                    revs_list = info.revs_list[:info.revs_list.position_after(interval_end_date)]
 
-                    revs_list.append(local_rev)
-                    last_rev_idx += 1
+                    # Calculate the edit war value of the revisions within the interval
+                    _, _, edit_war_value = EditWarDetector.is_article_in_edit_war(revs_list, site=info.article.site)
 
-                # Calculate the edit war value of the revisions within the interval
-                _, _, edit_war_value = EditWarDetector.is_article_in_edit_war(revs_list)
                 info.edit_war_over_time_list.insert(-1, (edit_war_value, interval_end_date))
 
                 # Save interval results in graph's values (penultimate position as last value is already stored)
@@ -667,17 +752,15 @@ class AppController(object):
 
     @staticmethod
     def _print_most_reverted_revisions(info: ArticleEditWarInfo) -> dict:
-        # Create a dictionary where, for each revision, a set with all the revisions that revert to it is stored
-        reverted_revisions_dict = {}
-        for reverted_rev, revertant_rev, reverted_users in info.reverts_list:
-            if reverted_rev.revid not in reverted_revisions_dict:
-                reverted_revisions_dict[reverted_rev.revid] = [reverted_rev, [revertant_rev]]
-            else:
-                reverted_revisions_dict[reverted_rev.revid][1].append(revertant_rev)
+        # Dictionary where, for each revision, all the revisions that revert to it are stored (grouped only once)
+        reverted_revisions_dict = info.group_reverts_by_base()
 
         # Extract top 10 most reverted revisions
         top10 = heapq.nlargest(10, reverted_revisions_dict.items(), key=lambda item: len(item[1][1]))
 
+        # Their contents are retrieved in background, as they are the most likely to be inspected
+        RevisionContentCache.prefetch(info.article.site, [rev_id for rev_id, [rev, _] in top10 if not rev.text])
+
         print(f'\n\t- Top {len(top10)} most reverted revisions, along with the number of reverts (a high number may '
               f'indicate bots\' presence, trying to impose the narrative of a particular revision): ')
         print("\n\t\tRANK --> [REVISION ID, TIMESTAMP, AUTHOR] --> Nº OF REVERTS TO THAT REVISION")
@@ -702,16 +785,11 @@ class AppController(object):
         # If any required info about the user is missing, it is retrieved from Wikipedia
         if not user_info or user_info.is_registered is None or (
                 user_info.is_registered == False and user_info.asn is None):
-            # Create a User object from Wikipedia to retrieve info and create a user_info object
-            user = pywikibot.User(WikiCrawler.site, username)
-
-            username = user.username
-            is_registered = user.isRegistered()
-            is_blocked = user.is_blocked()
-            registration = user.registration()
-            edit_count = user.editCount()
 
-            user_info = LocalUser(username, str(WikiCrawler.site), is_registered, is_blocked, registration, edit_count)
+            # User metadata is usually retrieved in batch after detection, it is only requested here if missing
+            if not user_info or user_info.is_registered is None:
+                site = SitePool.get_site(info.article.site)
+                user_info = WikiCrawler.get_users_info(site, [username]).get(username, user_info)
 
             # Print user info
             clear_terminal()
@@ -719,18 +797,17 @@ class AppController(object):
             print(f'Selected user: {username}')
             print_delim_line("-")
             print("User info:")
-            print(f'\n\t- Username: {username} \n\n\t- Is registered?: {is_registered} '
-                  f'\n\n\t- Is blocked?: {is_blocked} \n\n\t- Registration date: {registration} '
-                  f'\n\n\t- Nº of global user edits (0 for anonymous users, ie. IP) {edit_count}')
+            print(f'\n\t- Username: {username} \n\n\t- Is registered?: {user_info.is_registered} '
+                  f'\n\n\t- Is blocked?: {user_info.is_blocked} \n\n\t- Registration date: '
+                  f'{user_info.registration_date} '
+                  f'\n\n\t- Nº of global user edits (0 for anonymous users, ie. IP) {user_info.edit_count}')
 
             # Check if the username corresponds to an IP address (editor not registered in Wikipedia), if it is the case
             # a Whois request is made and additional info printed
-            ipv4_pattern = r'^((25[0-5]|2[0-4]\d|1\d{2}|[1-9]?\d)(\.|$)){4}$'
-            ipv6_pattern = r'^([0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$'
-            if re.fullmatch(ipv4_pattern, username) or re.fullmatch(ipv6_pattern, username):
-                # Make Whois request and store and print info as it is extracted from the results
-                whois = IPWhois(user.username)
-                result = whois.lookup_rdap()
+            if WhoisResolver.is_ip_address(username):
+                # Make Whois request (or reuse the prefetched or cached result of its network) and store and print
+                # info as it is extracted from the results
+                result = WhoisResolver.lookup(username)
 
                 network = result.get("network", {})
                 user_info.asn = result["asn"]
@@ -789,9 +866,7 @@ class AppController(object):
               f'\n\n\t- Nº of global user edits (0 for anonymous users, ie. IP) {user_info.edit_count}')
 
         # In case that the username corresponds to an IP address additional info is printed
-        ipv4_pattern = r'^((25[0-5]|2[0-4]\d|1\d{2}|[1-9]?\d)(\.|$)){4}$'
-        ipv6_pattern = r'^([0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$'
-        if re.fullmatch(ipv4_pattern, user_info.username) or re.fullmatch(ipv6_pattern, user_info.username):
+        if WhoisResolver.is_ip_address(user_info.username):
             print(f'\n\t- ASN: {user_info.asn} ({user_info.asn_description})')
             print(f'\n\t- Network: {user_info.network_address} ({user_info.network_name}) '
                   f'\n\n\t- Country: {user_info.network_country} \n\n\t- Registrants info: {user_info.registrants_info}')
@@ -802,15 +877,15 @@ class AppController(object):
         rev_id = input("Please indicate the ID of the revision you want to inspect ")
 
         # Search rev with given id and keep asking for a correct id while no matching rev is found
-        selected_local_rev = None
+        selected_local_rev = info.revs_list.get(int(rev_id)) if rev_id.strip().isdigit() else None
         while selected_local_rev is None:
-            for local_rev in info.revs_list:
-                if str(local_rev.revid) == rev_id:
-                    selected_local_rev = local_rev
-                    break
+            rev_id = input("ID not found on article's history page, please try a different one ")
+            selected_local_rev = info.revs_list.get(int(rev_id)) if rev_id.strip().isdigit() else None
 
-            if selected_local_rev is None:
-                rev_id = input("ID not found on article's history page, please try a different one ")
+        # Revisions analysed only have the fields needed for the detection, the rest are retrieved now
+        if selected_local_rev.tags is None:
+            WikiCrawler.backfill_revisions(SitePool.get_site(info.article.site), [selected_local_rev])
+            self.unsaved_changes = True
 
         # Print revision info
         clear_terminal()
@@ -823,24 +898,14 @@ class AppController(object):
               f'\n\n\t- Comment: {selected_local_rev.comment}')
 
         print("\n\t- List of reverts made to this revision: ")
-        reverts_list = reverted_revisions_dict[int(rev_id)][1]
+        reverts_list = reverted_revisions_dict.get(selected_local_rev.revid, [selected_local_rev, []])[1]
         print("\n\t\tREV ID, TIMESTAMP, USER")
         for local_rev in reverts_list:
             print(f'\n\t\t{str(local_rev.revid)}, {local_rev.timestamp}, {local_rev.user}')
 
-        # If the text of the revision is not stored, it is retrieved from Wikipedia
+        # If the text of the revision is not stored, it is retrieved from cache (or Wikipedia if not cached)
         if not selected_local_rev.text:
-            rev_date = datetime.strptime(selected_local_rev.timestamp, self.__ISO_DATE_FORMAT)
-            fam, code = info.article.site.split(":", 1)
-            site = pywikibot.Site(code, fam)
-
-            if not info.article.page:
-                info.article.page = next(site.load_pages_from_pageids([info.article.pageid]))
-
-            local_rev_list = WikiCrawler.get_full_revisions_in_range(site, info.article.page, rev_date, rev_date,
-                                                                     include_text=True)
-
-            contents = local_rev_list[0].revision['slots']['main'].get('*', None)
+            contents = RevisionContentCache.get(info.article.site, selected_local_rev.revid)
         else:
             contents = selected_local_rev.text
 
@@ -855,9 +920,32 @@ class AppController(object):
             # Indicate that new data should be saved in database
             self.unsaved_changes = True
 
+        # Changes made by the reverts are only shown if requested, as they may be long
+        if reverts_list and ask_yes_or_no_question("\nDo you want to see the changes made by each revert to this "
+                                                   "revision? "):
+            if info.out_of_core:
+                prev_revids_dict = info.revision_store.get_previous_revids(rev.revid for rev in reverts_list) \
+                    if info.revision_store is not None else {}
+            else:
+                prev_revids_dict = {local_rev.revid: prev_local_rev.revid
+                                    for prev_local_rev, local_rev in zip(info.revs_list, info.revs_list[1:])}
+            diffs_dict = RevisionDiffService.get_diffs(info.article.site, [rev.revid for rev in reverts_list],
+                                                       prev_revids_dict)
+            self._print_revert_diffs(reverts_list, diffs_dict)
+
         input(self.__CONTINUE_MSG)
 
 
+    @staticmethod
+    def _print_revert_diffs(revertant_revs_list: list[LocalRevision], diffs_dict: dict[int, str]):
+        for local_rev in revertant_revs_list:
+            print(f'\n\t- Changes made by revert {local_rev.revid} ({local_rev.timestamp}, {local_rev.user}):\n')
+            if local_rev.revid not in diffs_dict:
+                print("\t\tChanges could not be retrieved, they will be requested again next time")
+            else:
+                print("\t\t" + (diffs_dict[local_rev.revid] or "No changes available").replace("\n", "\n\t\t"))
+
+
     def __manage_sessions_menu(self) -> str:
         # Show sessions stored
         clear_terminal()
@@ -879,6 +967,7 @@ class AppController(object):
         print("[3] Delete a saved session")
         print("[4] Make a custom SQL query to the database")
         print("[5] Reset database")
+        print("[6] Re-score stored analyses with another threshold or formula")
         print("[0] Return to main menu \n")
 
         opt = input(self.__CHOOSE_OPTION_MSG)
@@ -951,8 +1040,19 @@ class AppController(object):
                 answer = ask_yes_or_no_question(question)
 
                 if answer:
+                    # Details of the session loaded not accessed yet are loaded before they are deleted
+                    self.__load_pending_articles_details()
+
                     # Delete database and create a new one
                     reset_db(self.db_conn)
+                    RevisionStore.delete_unreferenced(self.db_conn)
+
+            case '6':
+                # Re-score stored analyses with another threshold or formula
+                if len(sessions) == 0:
+                    input(self.__EMPTY_SESSIONS_MSG)
+                else:
+                    self.__rescore_menu(stored_sessions_ids_list)
             case '0':
                 pass # Return
             case _:
@@ -961,13 +1061,15 @@ class AppController(object):
         return opt
 
 
-    def _load_session_data(self, session_id: str):
+    def _load_session_data(self, session_id: str, lazy: bool = None):
         # First of all, data currently loaded in the tool must be deleted to avoid mixing information
         singleton = Singleton()
         singleton.articles_with_edit_war_info_dict.clear()
         singleton.users_info_dict.clear()
         singleton.shared_dict.clear()
 
+        lazy = self.LAZY_SESSION_LOADING if lazy is None else lazy
+
         # 1º Load data in articles_set from articles' table
         session_articles = fetch_items_from_db(self.db_conn, "articles", "session = ?", [session_id])
         articles_ids_dict:dict[str, LocalPage] = {}
@@ -1001,9 +1103,15 @@ class AppController(object):
             article = articles_ids_dict[period[2]]
             start_date = datetime.strptime(period[3], self.__ISO_DATE_FORMAT) if period[2] else None
             end_date = datetime.strptime(period[4], self.__ISO_DATE_FORMAT) if period[2] else None
-            edit_war_notified = period[5] if period[2] else None
+            edit_war_notified = bool(period[5]) if period[2] else None
+
+            article_info = ArticleEditWarInfo(article, start_date, end_date, edit_war_notified=edit_war_notified)
 
-            article_info = ArticleEditWarInfo(article, start_date, end_date, edit_war_notified)
+            # Only the revisions of reverts of histories kept out of memory are stored, so their store is reopened (if
+            # it no longer exists, the article is analysed again from scratch when needed)
+            if period[6]:
+                article_info.revision_store_name = period[6]
+                article_info.revision_store = RevisionStore.open(period[6], start_date, end_date)
 
             articles_with_edit_war_info_dict[article] = article_info
             periods_ids_dict[period[1]] = article
@@ -1021,16 +1129,79 @@ class AppController(object):
             info.edit_war_over_time_list.append((value, date))
 
 
+        if lazy:
+            # Details of each article are loaded from the database the first time they are accessed
+            for period in session_periods:
+                article = articles_ids_dict[period[2]]
+                articles_with_edit_war_info_dict[article].set_loader(self.__article_details_loader(period[2],
+                                                                                                   period[1]))
+        else:
+            self._load_articles_details(self.db_conn, articles_ids_dict, periods_ids_dict,
+                                        articles_with_edit_war_info_dict)
+
+        # Only use input if a terminal is being used (automatic execution does not and could get blocked)
+        if sys.stdin.isatty():
+            input("Session successfully loaded (Enter to continue) ")
+
+
+    def __article_details_loader(self, article_id: int, period_id: int) -> Callable[[ArticleEditWarInfo], None]:
+        def load_article_details(info: ArticleEditWarInfo):
+            # A connection of its own is used, as the article may be accessed from any thread
+            with sqlite_connection(DB_PATH) as conn:
+                self._load_articles_details(conn, {article_id: info.article}, {period_id: info.article},
+                                            {info.article: info})
+
+        return load_article_details
+
+
+    @staticmethod
+    def __load_pending_articles_details():
+        for info in Singleton().articles_with_edit_war_info_dict.values():
+            info.load()
+
+
+    def _load_articles_details(self, conn: Connection, articles_ids_dict: dict[int, LocalPage],
+                               periods_ids_dict: dict[int, LocalPage],
+                               articles_with_edit_war_info_dict: dict[LocalPage, ArticleEditWarInfo]):
+        """
+        Function that loads the revisions, reverts, mutual reverts and users of some articles of a session (whose
+        summary, the period and the edit war values, is already loaded)
+
+        :param conn:
+        :param articles_ids_dict: articles by id
+        :param periods_ids_dict: articles by id of their period
+        :param articles_with_edit_war_info_dict: info of the articles to fill
+        :return: None
+        """
         # 4º Load data in _articles_with_edit_war_info_dict from revisions' table
-        session_revisions = fetch_items_from_db(self.db_conn, "revisions", "article IN (",
+        session_revisions = fetch_items_from_db(conn, "revisions", "article IN (",
                                              list(articles_ids_dict.keys()), in_clause=True)
         revisions_ids_dict: dict[str, (LocalPage, LocalRevision)] = {}
+        revs_by_article_dict: dict[LocalPage, list[LocalRevision]] = {}
         users_ids_set = set[str]()
 
+        # Revisions packed in chunks are read first, as revisions' table only holds those of their reverts
+        packed_revs_dict: dict[tuple[int, int], LocalRevision] = {}
+
+        for article_id, rows_list in fetch_revision_chunks(conn, list(articles_ids_dict.keys())).items():
+            article = articles_ids_dict[article_id]
+
+            for revid, timestamp, user, text, size, tags, comment, sha1 in rows_list:
+                local_rev = LocalRevision(revid, timestamp, user, text, size, tags, comment, sha1)
+
+                revs_by_article_dict.setdefault(article, []).append(local_rev)
+                packed_revs_dict[(article_id, revid)] = local_rev
+                users_ids_set.add(user)
+
         for rev in session_revisions:
             article = articles_ids_dict[rev[3]]
-            info = articles_with_edit_war_info_dict[article]
             revid = rev[2]
+
+            # Reverts reference the same revision objects as the history
+            if (rev[3], revid) in packed_revs_dict:
+                revisions_ids_dict[rev[1]] = (article, packed_revs_dict[(rev[3], revid)])
+                continue
+
             timestamp = rev[4]
             user = rev[5]
             text = rev[6]
@@ -1041,14 +1212,17 @@ class AppController(object):
 
             local_rev = LocalRevision(revid, timestamp, user, text, size, tags, comment, sha1)
 
-            info.revs_list.append(local_rev)
+            # Revisions are added to the history of the article once their usernames are known (step 8), as it is
+            # indexed by user
+            revs_by_article_dict.setdefault(article, []).append(local_rev)
             revisions_ids_dict[rev[1]] = (article, local_rev)
             users_ids_set.add(user)     # Keep username references as we will need them later to search users' table
 
         # 5º Load data in _articles_with_edit_war_info_dict from reverts' table
-        session_reverts = fetch_items_from_db(self.db_conn, "reverts", "revertant_rev IN (",
+        session_reverts = fetch_items_from_db(conn, "reverts", "revertant_rev IN (",
                                                 list(revisions_ids_dict.keys()), in_clause=True)
         reverts_ids_dict: dict[str, (LocalPage, LocalRevision)] = {}
+        reverts_by_revs_ids_dict: dict[tuple[str, str], tuple] = {}
 
         for session_revert in session_reverts:
             article, rev = revisions_ids_dict[session_revert[1]]
@@ -1061,9 +1235,10 @@ class AppController(object):
 
             info.reverts_list.append(revert)
             reverts_ids_dict[session_revert[1]] = (article, rev)
+            reverts_by_revs_ids_dict[(session_revert[1], session_revert[2])] = revert
 
         # 6º Load data in _articles_with_edit_war_info_dict from mutual_reverts' table
-        session_mutual_reverts = fetch_items_from_db(self.db_conn, "mutual_reverts", "revertant_rev_1 "
+        session_mutual_reverts = fetch_items_from_db(conn, "mutual_reverts", "revertant_rev_1 "
                                                      "IN (", list(reverts_ids_dict.keys()), in_clause=True)
 
         for mutual_revert in session_mutual_reverts:
@@ -1081,7 +1256,7 @@ class AppController(object):
             info.mutual_reverts_list.append(mutual_revert)
 
         # 7º Load data in users_info_dict from users' table
-        session_users = fetch_items_from_db(self.db_conn, "users", "id IN (", list(users_ids_set), in_clause=True)
+        session_users = fetch_items_from_db(conn, "users", "id IN (", list(users_ids_set), in_clause=True)
         users_ids_dict: dict[str, str] = {}
 
         for user in session_users:
@@ -1101,33 +1276,34 @@ class AppController(object):
             user_info = LocalUser(username, site, is_registered, is_blocked, registration_date, edit_count, asn,
                                   asn_description, network_address, network_name, network_country, registrants_info)
 
-            Singleton().users_info_dict[username] = user_info
+            # Users already loaded (from other articles of the session) may have been updated since then
+            Singleton().users_info_dict.setdefault(username, user_info)
             users_ids_dict[user[1]] = username
 
-        # 8º Update username field in revisions now that we have users info loaded
-        for info in articles_with_edit_war_info_dict.values():
-            for rev in info.revs_list:
+        # 8º Update username field in revisions now that we have users info loaded, and add them to the histories
+        # (users no longer stored, e.g. deleted by older versions while referenced only by packed revisions, are left
+        # unknown as hidden users are)
+        for article, local_revs_list in revs_by_article_dict.items():
+            for rev in local_revs_list:
                 if rev.user:
-                    rev.user = users_ids_dict[rev.user]
+                    rev.user = users_ids_dict.get(rev.user)
+
+            articles_with_edit_war_info_dict[article].revs_list.extend(local_revs_list)
 
         # 9º Load data in _articles_with_edit_war_info_dict from reverted_user_pairs' table
-        session_reverted_user_pairs = fetch_items_from_db(self.db_conn, "reverted_user_pairs",
+        session_reverted_user_pairs = fetch_items_from_db(conn, "reverted_user_pairs",
                                                           "revertant_rev IN (", list(reverts_ids_dict.keys()),
                                                           in_clause=True)
 
         for reverted_user_pair in session_reverted_user_pairs:
-            article, revertant_rev = revisions_ids_dict[reverted_user_pair[1]]
-            _, reverted_rev = revisions_ids_dict[reverted_user_pair[2]]
-            info = articles_with_edit_war_info_dict[article]
-            reverts_list = info.reverts_list
-            username = users_ids_dict[reverted_user_pair[3]]
+            username = users_ids_dict.get(reverted_user_pair[3])
+            revert = reverts_by_revs_ids_dict.get((reverted_user_pair[1], reverted_user_pair[2]))
 
-            for revert in reverts_list:
-                if revert[0].revid == revertant_rev.revid and revert[1].revid == reverted_rev.revid:
-                    revert[2].add(username)
+            if revert is not None and username is not None:
+                revert[2].add(username)
 
         # 10º Load data in _articles_with_edit_war_info_dict from mutual_reverters_activities' table
-        session_mutual_reverters_activities = fetch_items_from_db(self.db_conn, "mutual_reverters_activities",
+        session_mutual_reverters_activities = fetch_items_from_db(conn, "mutual_reverters_activities",
                                                                   "user IN (", list(users_ids_dict.keys()),
                                                                   in_clause=True,
                                                                   additional_where_clauses=["AND period IN ("],
@@ -1140,10 +1316,6 @@ class AppController(object):
 
             info.mutual_reverters_dict[username] = int(mutual_reverter_activity[3])
 
-        # Only use input if a terminal is being used (automatic execution does not and could get blocked)
-        if sys.stdin.isatty():
-            input("Session successfully loaded (Enter to continue) ")
-
 
     def __save_session_menu(self) -> int:
         # Show stored sessions and ask user a name to save the new session
@@ -1167,67 +1339,13 @@ class AppController(object):
 
             # 1º Save article's info for those that are not already in the table
             if article not in self.articles_set:
-                article_id = save_article_data(self.db_conn, article, session_id)
-                articles_ids_dict[article.pageid] = article_id
-            else:
-                article_id = articles_ids_dict[article.pageid]
-
-            # 2º Save period's info on edit_war_analysis_periods' table
-            period_id = save_period_data(self.db_conn, articles_ids_dict, article, info)
-
-            # 3º Save edit war over time values on edit_war_values' table
-            for (value, date) in info.edit_war_over_time_list:
-                save_edit_war_value(self.db_conn, period_id, date, value)
-
-            # 4º Save users info on users' table
-            users_ids_dict: dict[str, int] = dict[str, int]()
-
-            for username, user_info in Singleton().users_info_dict.items():
-                users_ids_dict[username] = save_user_data(self.db_conn, username, user_info)
-
-            # 5º Save revisions and missing users info on their tables simultaneously
-            revs_ids_dict: dict[int, int] = dict[int, int]()
-
-            for i, local_rev in enumerate(info.revs_list):
-                username = local_rev.user
+                articles_ids_dict[article.pageid] = save_article_data(self.db_conn, article, session_id)
 
-                # If the user is not stored, we create a new entry only with the username and save the id in the dict.
-                # (users_ids_dict is checked too, in order to not overwrite info stored in previous step and avoid
-                # unnecessary iterations)
-                if username and users_ids_dict.get(username) is None:
-                    users_ids_dict[username] = save_user_data(self.db_conn, username, LocalUser(username))
+            # 2º Save period, revisions, reverts, users and mutual reverters' info on their tables
+            save_article_edit_war_data(self.db_conn, articles_ids_dict, article, info, Singleton().users_info_dict)
 
-                # Save revisions info on revisions' table
-                rev_id = save_revision_data(self.db_conn, local_rev, users_ids_dict, article_id)
-                revs_ids_dict[local_rev.revid] = rev_id
-
-            # 6º Save reverts on reverts' table and its M:M relation with users (reverted_users) on
-            # reverted_user_pairs' table
-            for revertant_rev, reverted_rev, reverted_users_set in info.reverts_list:
-                # Save reverts info on reverts' table
-                revertant_rev_id = revs_ids_dict[revertant_rev.revid]
-                reverted_rev_id = revs_ids_dict[reverted_rev.revid]
-
-                save_revert_data(self.db_conn, revertant_rev_id, reverted_rev_id)
-
-                # Save reverted_user_pairs info on reverted_user_pairs' table
-                for username in reverted_users_set:
-                   if username and users_ids_dict.get(username) is None:
-                       users_ids_dict[username] = save_user_data(self.db_conn, username, LocalUser(username))
-
-                   user_id = users_ids_dict[username]
-                   save_reverted_user_pair_data(self.db_conn, revertant_rev_id, reverted_rev_id, user_id)
-
-            # 7º Save mutual reverts on mutual_reverts' table
-            for revert_1, revert_2 in info.mutual_reverts_list:
-                save_mutual_revert_data(self.db_conn, revs_ids_dict, revert_1, revert_2)
-
-            # 8º Save nº of mutual reverts of every user on this period for the analysed article on
-            # mutual_reverters_activities' table
-            for username, n_mutual_reverts in info.mutual_reverters_dict.items():
-                if username:
-                    user_id = users_ids_dict[username]
-                    save_mutual_reverters_activity(self.db_conn, user_id, period_id, n_mutual_reverts)
+        # Stores of the histories kept out of memory that were replaced by this save are deleted
+        RevisionStore.delete_unreferenced(self.db_conn)
 
         input("Session data successfully saved (Enter to continue) ")
 
@@ -1307,6 +1425,28 @@ class AppController(object):
         delete_non_referenced_users(self.db_conn)
 
 
+    def __rescore_menu(self, stored_sessions_ids_list: list[int]):
+        # Ask user about the sessions to re-score (0 for all of them), the threshold and the formula
+        session_id = validate_idx_in_list(input("\nSelect nº of the session you want to re-score (0 for all) "),
+                                          stored_sessions_ids_list)
+        msg = f"Edit war threshold (current one is {EditWarDetector.EDIT_WAR_THRESHOLD}) "
+        threshold = int(validate_idx(input(msg), 0, sys.maxsize))
+        drop_max_nr = ask_yes_or_no_question("Drop the greatest Nr value from the sum, as the original formula does? ")
+
+        # Values are computed in database from the raw components stored, so no article is analysed again
+        rows = fetch_rescored_edit_war_values(self.db_conn, drop_max_nr, session_id if session_id != '0' else None)
+        rows = [row + (row[5] > threshold,) for row in rows]
+
+        print()
+        if rows:
+            columns = ("session", "article", "start_date", "end_date", "stored_value", "new_value", "edit_war")
+            print_query_contents(tuple((column,) for column in columns), rows)
+        print(f'\nPeriods re-scored: {len(rows)}\nPeriods with edit war: {sum(row[6] for row in rows)} '
+              f'(analyses stored before score components were saved are not included)')
+
+        input("\nPress Enter to continue ")
+
+
     def __delete_session_menu(self, stored_sessions_ids_list: list[int]) -> str:
         # Show sessions in database
         clear_terminal()
@@ -1320,12 +1460,17 @@ class AppController(object):
                                                 "(0 to return) "), stored_sessions_ids_list)
 
         if session_id != '0':
+            # Details of the session loaded not accessed yet are loaded, as it may be the one deleted
+            self.__load_pending_articles_details()
+
             # Delete session from database
             delete_from_db_table(self.db_conn, "sessions", int(session_id))
             # Update stored_sessions_ids_list
             stored_sessions_ids_list.remove(int(session_id))
             # Delete remaining data about deleted session (data that is not deleted in cascade once session is deleted)
             self._delete_remaining_session_data_from_db(session_id)
+            # Delete the stores of the histories of the session kept out of memory
+            RevisionStore.delete_unreferenced(self.db_conn)
 
         clear_n_lines(5 + len(sessions) + 4 + Singleton().shared_dict["lines_to_remove"])
 
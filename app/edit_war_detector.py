@@ -1,53 +1,239 @@
-import pywikibot
-
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Any
+from sqlite3 import Connection
+from typing import Any, Callable
 from sortedcontainers import SortedSet
 
+from app.analysis_results_cache import AnalysisResultsCache
 from app.info_containers.local_revision import LocalRevision
+from app.info_containers.revision_history import RevisionHistory
+from app.revert_finder import RevertFinder
+from app.revision_store import RevisionStore
 from app.utils.helpers import clear_n_lines, generate_system_notification
 from app.utils.helpers import Singleton
+from app.utils.site_pool import SitePool
+from app.utils.user_registry import BotRegistry
+from app.utils.db_utils import (fetch_items_from_db, save_article_data, save_article_edit_war_data, save_user_data,
+                                delete_other_periods, fetch_monitoring_run, save_monitoring_run,
+                                delete_monitoring_run)
 from app.wiki_crawler import WikiCrawler
 from app.info_containers.article_edit_war_info import ArticleEditWarInfo
 from app.info_containers.local_page import LocalPage
 
 class EditWarDetector(object):
     EDIT_WAR_THRESHOLD = 100
+    TRIAGE_THRESHOLD = 25       # Value (estimated from revert tags) an article must surpass to be fully analysed
+    TRIAGE_MAX_WORKERS = 4      # Max nº of articles estimated simultaneously
+
+    # Horizon within which a revision identical to a previous one is a revert (None for no limit), so meaningless
+    # reverts to old contents are not counted and very long histories are analysed with a predictable cost
+    REVERT_HORIZON_REVS: int | None = None
+    REVERT_HORIZON_TIME: timedelta | None = None
+
+    # Nº of revisions from which the history page of an article is moved out of memory to a RevisionStore
+    OUT_OF_CORE_MIN_REVS = 200000
+
+    # Horizon (in nº of revisions) of the histories kept out of memory if no horizon is set, so the possible bases of
+    # reverts kept while analysing them do not grow with their length
+    OUT_OF_CORE_REVERT_HORIZON_REVS = 10000
 
     @classmethod
-    def detect_edit_wars_in_set(cls, articles_set: SortedSet[LocalPage], start_date: datetime, end_date: datetime):
+    def detect_edit_wars_in_set(cls, articles_set: SortedSet[LocalPage], start_date: datetime, end_date: datetime,
+                                on_article_analysed: Callable[[LocalPage, ArticleEditWarInfo], None] = None):
         print("\n===> Starting detection of edit wars...")
         articles_with_edit_war_info_dict = Singleton().articles_with_edit_war_info_dict
 
+        # Retrieve in batches the pages of the articles whose revisions are all going to be requested, instead of one
+        # by one when they are needed (those with revisions stored only need it if their time range changes)
+        WikiCrawler.load_pages(local_page for local_page in articles_set
+                               if cls.__needs_full_fetch(articles_with_edit_war_info_dict.get(local_page)))
+
         for local_page in articles_set:
             print(f"\nAnalyzing article {local_page.title}")
             info = articles_with_edit_war_info_dict.get(local_page)
 
-            if info is None or not info.revs_list:
-                # No previous data for this article, so all revisions have to be retrieved from Wikipedia
-                articles_with_edit_war_info_dict[local_page] = ArticleEditWarInfo(local_page, start_date, end_date)
+            if cls.__needs_full_fetch(info):
+                # No previous data for this article (or only the revisions of its reverts, if its history was too
+                # long to be kept in memory and its store no longer exists), so all revisions have to be retrieved
+                # from Wikipedia (keeping whether its edit war was already notified)
+                edit_war_notified = info.edit_war_notified if info is not None else None
+                articles_with_edit_war_info_dict[local_page] = ArticleEditWarInfo(local_page, start_date, end_date,
+                                                                                  edit_war_notified=edit_war_notified)
                 info = articles_with_edit_war_info_dict[local_page]
 
-                # Get revisions from Wikipedia
-                print("\tNo previous data stored for this article, requesting revisions to Wikipedia")
-                fam, code = local_page.site.split(":")
-                site = pywikibot.Site(code, fam)
-                info.revs_list = WikiCrawler.get_full_revisions_in_range(site, local_page.page, start_date, end_date)
-                print(f"\t\tRevisions received, number of revisions within time range: {len(info.revs_list)}")
+                # Get revisions from Wikipedia, looking for reverts in each page of revisions while the next one is
+                # being received
+                print("\tNo previous data stored for this article, requesting revisions to Wikipedia and analysing "
+                      "them as they are received\n")
+                site = SitePool.get_site(local_page.site)
+                revert_finder = RevertFinder(BotRegistry.get_is_bot(local_page.site), cls.REVERT_HORIZON_REVS,
+                                             cls.REVERT_HORIZON_TIME)
+
+                # A fetch interrupted once its history was moved to disk is resumed from its store
+                rvcontinue, revert_finder = cls.__resume_history_fetch(info) or (None, revert_finder)
+
+                def checkpoint_fetch(next_rvcontinue: str):
+                    # Only revisions persisted in a store can be resumed from
+                    if info.revision_store is not None:
+                        WikiCrawler.save_history_checkpoint(local_page.site, local_page.title, start_date, end_date,
+                                                            WikiCrawler.LEAN_RVPROP, next_rvcontinue,
+                                                            len(info.revision_store), info.revision_store.name)
+
+                for local_revs_page in WikiCrawler.iter_revisions_in_range(site, local_page.page, start_date,
+                                                                           end_date, rvprop=WikiCrawler.LEAN_RVPROP,
+                                                                           rvcontinue=rvcontinue,
+                                                                           on_page_processed=checkpoint_fetch):
+                    if info.revision_store is None:
+                        info.revs_list.extend(local_revs_page)
+                        revert_finder.add_revisions(local_revs_page)
+
+                        # Giant histories are moved to disk, and the revisions already received analysed again from
+                        # there (so no revision is kept in memory from now on)
+                        if len(info.revs_list) >= cls.OUT_OF_CORE_MIN_REVS:
+                            info.revision_store = RevisionStore.create(local_page.site, local_page.pageid,
+                                                                       start_date, end_date)
+                            info.revision_store.append(info.revs_list)
+                            info.revs_list = RevisionHistory()
+
+                            revert_finder = cls.__out_of_core_revert_finder(local_page.site)
+                            revert_finder.add_rows(info.revision_store.iter_rows())
+                    else:
+                        revert_finder.add_rows(info.revision_store.append(local_revs_page))
+
+                    clear_n_lines(1)
+                    print(f"\t\tRevisions received and analyzed: {revert_finder.n_revs}, total nº of reverts "
+                          f"detected: {revert_finder.n_reverts}")
+
+                # Fetch is finished, so its checkpoint is no longer needed
+                if info.revision_store is not None:
+                    WikiCrawler.delete_history_checkpoint(local_page.site, local_page.title, start_date,
+                                                          WikiCrawler.LEAN_RVPROP)
+
+                reverts_list = revert_finder.get_reverts() if info.revision_store is None else None
             else:
                 cls.update_revisions_to_new_time_range(local_page, start_date, end_date)
                 info: ArticleEditWarInfo = articles_with_edit_war_info_dict[local_page]
+                reverts_list = revert_finder = None
 
                 # Clear previous info about mutual reverts as their data do not correspond anymore to the time range
                 if info.mutual_reverters_dict:
                     info.mutual_reverters_dict.clear()
 
-            (info.reverts_list, info.mutual_reverts_list,
-                edit_war_value) = cls.is_article_in_edit_war(info.revs_list, True)
+                # Histories kept out of memory are analysed again from their store
+                if info.revision_store is not None:
+                    revert_finder = cls.__out_of_core_revert_finder(local_page.site)
+                    revert_finder.add_rows(info.revision_store.iter_rows())
+
+            if info.revision_store is not None:
+                (info.revs_list, info.reverts_list, info.mutual_reverts_list,
+                    edit_war_value) = cls.analyse_revision_store(info.revision_store, revert_finder, True)
+            else:
+                (info.reverts_list, info.mutual_reverts_list,
+                    edit_war_value) = cls.is_article_in_edit_war(info.revs_list, True, reverts_list, local_page.site)
 
             # List is populated with the value corresponding to the full time range
             info.edit_war_over_time_list = [(edit_war_value, end_date)]
 
+            if on_article_analysed is not None:
+                on_article_analysed(local_page, info)
+
+        # Retrieve metadata of all the mutual reverters of the session at once, so it is ready when inspected
+        cls.enrich_mutual_reverters_info()
+
+
+    @classmethod
+    def __resume_history_fetch(cls, info: ArticleEditWarInfo) -> tuple[str, RevertFinder] | None:
+        """
+        Function that resumes an interrupted fetch of the history of the article of the info given, if its store
+        still holds every revision processed until its checkpoint, analysing them again from there
+
+        :param info: info of the article, without revisions yet
+        :return: tuple[str, RevertFinder] | None --> token to continue the fetch and finder the revisions stored
+        have been added to, None if the fetch has to start from the beginning
+        """
+        local_page = info.article
+        checkpoint = WikiCrawler.fetch_history_checkpoint(local_page.site, local_page.title, info.start_date,
+                                                          info.end_date, WikiCrawler.LEAN_RVPROP)
+        if checkpoint is None:
+            return None
+
+        rvcontinue, n_revisions, revision_store_name, checkpoint_end_date = checkpoint
+        revision_store = RevisionStore.open(revision_store_name, info.start_date, checkpoint_end_date)
+        if revision_store is None or len(revision_store) < n_revisions:
+            return None
+
+        # Revisions appended after the checkpoint will be received again
+        revision_store.truncate(n_revisions)
+        revision_store.set_period(info.start_date, info.end_date)
+        info.revision_store = revision_store
+
+        revert_finder = cls.__out_of_core_revert_finder(local_page.site)
+        revert_finder.add_rows(revision_store.iter_rows())
+
+        print(f"\tResuming interrupted request of revisions after the first {n_revisions}\n")
+
+        return rvcontinue, revert_finder
+
+
+    @classmethod
+    def __out_of_core_revert_finder(cls, site: str | None) -> RevertFinder:
+        # Histories kept out of memory are always analysed within a horizon
+        if cls.REVERT_HORIZON_REVS is None and cls.REVERT_HORIZON_TIME is None:
+            return RevertFinder(BotRegistry.get_is_bot(site), cls.OUT_OF_CORE_REVERT_HORIZON_REVS)
+
+        return RevertFinder(BotRegistry.get_is_bot(site), cls.REVERT_HORIZON_REVS, cls.REVERT_HORIZON_TIME)
+
+
+    @staticmethod
+    def __needs_full_fetch(info: ArticleEditWarInfo | None) -> bool:
+        # No previous data for the article (or only the revisions of its reverts, if its history was too long to be
+        # kept in memory and its store no longer exists)
+        if info is None:
+            return True
+
+        return info.revision_store is None if info.out_of_core else not info.revs_list
+
+
+    @staticmethod
+    def enrich_mutual_reverters_info():
+        """
+        Function that retrieves in batches the metadata of every mutual reverter of the session whose info is not
+        stored yet, keeping any info already stored about them (e.g. Whois results)
+
+        :return: None
+        """
+        singleton = Singleton()
+        users_info_dict = singleton.users_info_dict
+
+        # Group users without metadata by the site of the article where they are mutual reverters
+        usernames_by_site_dict: dict[str, set[str]] = {}
+        for article, info in singleton.articles_with_edit_war_info_dict.items():
+            for username in info.count_mutual_reverters():
+                user_info = users_info_dict.get(username)
+
+                if username and (user_info is None or user_info.is_registered is None):
+                    usernames_by_site_dict.setdefault(article.site, set()).add(username)
+
+        for site_key, usernames_set in usernames_by_site_dict.items():
+            if not usernames_set:
+                continue
+
+            print(f"\nRequesting info of {len(usernames_set)} mutual reverters to Wikipedia...")
+            site = SitePool.get_site(site_key)
+
+            for username, new_user_info in WikiCrawler.get_users_info(site, sorted(usernames_set)).items():
+                user_info = users_info_dict.get(username)
+
+                if user_info is None:
+                    users_info_dict[username] = new_user_info
+                else:
+                    user_info.is_registered = new_user_info.is_registered
+                    user_info.is_blocked = new_user_info.is_blocked
+                    user_info.registration_date = new_user_info.registration_date
+                    user_info.edit_count = new_user_info.edit_count
+                    user_info.groups = new_user_info.groups
+
 
     @classmethod
     def update_revisions_to_new_time_range(cls, local_page: LocalPage, start_date: datetime, end_date: datetime):
@@ -62,54 +248,46 @@ class EditWarDetector(object):
                    "difference between start or end dates respect to previous ones), adjusting revisions to new "
                    "range... ")
 
+            site = SitePool.get_site(local_page.site)
+
             # Retrieve page from Wikipedia to be able to retrieve missing revisions
-            if not local_page.page:
-                fam, code = local_page.site.split(":", 1)
-                site = pywikibot.Site(code, fam)
-                local_page.page = next(site.load_pages_from_pageids([local_page.pageid]))
+            if not local_page.page_loaded:
+                WikiCrawler.load_pages([local_page])
 
             n_revs_received = 0
             n_revs_deleted = 0
 
-            if start_date < info.start_date:
-                fam, code = local_page.site.split(":")
-                site = pywikibot.Site(code, fam)
+            # Histories kept out of memory are adjusted in their store (revs_list only holds the revisions of reverts)
+            history = info.revision_store if info.revision_store is not None else info.revs_list
+
+            # Both dates are included in the range and revisions have a precision of seconds, so the revisions of the
+            # second before the range are the last ones out of it (and the ones of the second after, the first ones)
+            second = timedelta(seconds=1)
 
+            if start_date < info.start_date:
                 new_revs_list = WikiCrawler.get_full_revisions_in_range(site, local_page.page, start_date,
-                                                                        info.start_date)
+                                                                        info.start_date - second,
+                                                                        rvprop=WikiCrawler.LEAN_RVPROP)
                 n_revs_received += len(new_revs_list)
-                info.revs_list[:0] = new_revs_list
+                history.prepend(new_revs_list)
             else:
-                for rev in info.revs_list[:]:
-                    rev_date = rev.timestamp
-
-                    if datetime.strptime(rev_date, "%Y-%m-%dT%H:%M:%SZ") > start_date:
-                        break
-                    else:
-                        info.revs_list.pop(0)
-                        n_revs_deleted += 1
+                n_revs_deleted += history.trim_until(start_date - second)
 
             if info.end_date < end_date:
-                fam, code = local_page.site.split(":")
-                site = pywikibot.Site(code, fam)
-
-                new_revs_list = WikiCrawler.get_full_revisions_in_range(site, local_page.page, info.end_date,
-                                                                        end_date)
-                n_revs_received += len(new_revs_list)
-                info.revs_list.extend(new_revs_list)
-            else:
-                for rev in reversed(info.revs_list[:]):
-                    rev_date = rev.timestamp
-
-                    if datetime.strptime(rev_date, "%Y-%m-%dT%H:%M:%SZ") < end_date:
-                        break
+                # New revisions are appended to the store page by page, as they are received
+                for new_revs_list in WikiCrawler.iter_revisions_in_range(site, local_page.page, info.end_date + second,
+                                                                         end_date, rvprop=WikiCrawler.LEAN_RVPROP):
+                    n_revs_received += len(new_revs_list)
+                    if info.revision_store is not None:
+                        info.revision_store.append(new_revs_list)
                     else:
-                        info.revs_list.pop(-1)
-                        n_revs_deleted += 1
+                        info.revs_list.extend(new_revs_list)
+            else:
+                n_revs_deleted += history.trim_from(end_date + second)
 
             print(f"\t\tNew revisions received from Wikipedia: {n_revs_received} ")
             print(f"\t\tNon-necessary revisions deleted: {n_revs_deleted} ")
-            print(f"\t\tTotal number of revisions within new time range: {len(info.revs_list)}")
+            print(f"\t\tTotal number of revisions within new time range: {len(history)}")
 
         else:
             print("\tPrevious data stored for this article and time range has not changed (less than a day of "
@@ -119,14 +297,32 @@ class EditWarDetector(object):
         # Save new time range
         info.start_date = start_date
         info.end_date = end_date
+        if info.revision_store is not None:
+            info.revision_store.set_period(start_date, end_date)
 
 
     @classmethod
-    def is_article_in_edit_war(cls, revs_list: list[LocalRevision], print_info: bool = False):
+    def is_article_in_edit_war(cls, revs_list: list[LocalRevision], print_info: bool = False,
+                               reverts_list: list[tuple[LocalRevision, LocalRevision, set[str]]] = None,
+                               site: str = None):
         edit_war_tag = False
 
-        # Find and store all reverts
-        reverts_list = cls.__find_reverts(revs_list, print_info)
+        # Results of an analysis of the same revisions are reused, as long as none has been added or trimmed
+        fingerprint = AnalysisResultsCache.fingerprint(revs_list, cls.__analysis_params(site))
+        cached_result = AnalysisResultsCache.get(fingerprint, revs_list)
+
+        if cached_result is not None:
+            reverts_list, mutual_reverts_list, edit_war_value = cached_result
+
+            if print_info: print(f"\tSame revisions already analysed, reusing the results (reverts: "
+                                 f"{len(reverts_list)}, mutual reverts: {len(mutual_reverts_list)}, edit war value: "
+                                 f"{edit_war_value})")
+
+            return reverts_list, mutual_reverts_list, edit_war_value
+
+        # Find and store all reverts (unless they have already been found while revisions were received)
+        if reverts_list is None:
+            reverts_list = cls.__find_reverts(revs_list, print_info, site)
 
         # Filter reverts and keep only mutual ones
         mutual_reverts_list = cls.__find_mutual_reverts(reverts_list, print_info)
@@ -149,74 +345,241 @@ class EditWarDetector(object):
         if print_info: print(f"Analysis finished, article with edit war (value > {cls.EDIT_WAR_THRESHOLD})?: {edit_war_tag} "
                              f"(edit war value: {edit_war_value})")
 
+        AnalysisResultsCache.save(fingerprint, revs_list, reverts_list, mutual_reverts_list, edit_war_value)
+
         return reverts_list, mutual_reverts_list, edit_war_value
 
 
     @classmethod
-    def __find_reverts(cls, revs_list: list[LocalRevision], print_info: bool) \
-            -> list[tuple[LocalRevision, LocalRevision, set[str]]]:
-        if print_info: print("\tStarting to analyse each revision within time range for reverts\n")
+    def analyse_revision_store(cls, revision_store: RevisionStore, revert_finder: RevertFinder,
+                               print_info: bool = False) \
+            -> tuple[list[LocalRevision], list[tuple[LocalRevision, LocalRevision, set[str]]], list[tuple], int]:
+        """
+        Function that analyses the history page of an article kept in a RevisionStore from the reverts found over
+        its rows, building only the revisions involved in reverts (the ones displayed)
+
+        :param revision_store:
+        :param revert_finder: finder the rows of the store have been added to
+        :param print_info:
+        :return: (revisions of reverts, reverts list, mutual reverts list, edit war value)
+        """
+        revert_positions_list = revert_finder.get_revert_positions()
+
+        local_revs_dict = revision_store.get_revisions(position for revert in revert_positions_list
+                                                       for position in revert[:2])
+        reverts_list = [(local_revs_dict[i], local_revs_dict[j], revert_finder.get_usernames(reverted_users))
+                        for i, j, reverted_users in revert_positions_list]
 
-        reverted_users_set = set[str]()
-        reverts_list: list[tuple[pywikibot.page._revision, pywikibot.page._revision, set[str]]] = []
-        revs_with_revert_idxs_set = set[int]()
+        mutual_reverts_list = cls.__find_mutual_reverts(reverts_list, print_info)
 
-        # Traverse revisions list looking for reverts (skipping self-reverts) and store them when found
-        for i in range(0, len(revs_list)-2):
-            local_rev_i = revs_list[i]
-            rev_i_user = local_rev_i.user
+        # Nº of edits of each user is kept by the store, so the value is computed as for any other history
+        nr_values_list, mutual_reverters_edit_count_dict = cls.__calculate_raw_m_values(mutual_reverts_list,
+                                                                                        revision_store)
+        edit_war_value = cls.__calculate_edit_war_value(len(mutual_reverters_edit_count_dict) - 1, nr_values_list)
 
-            # Skip this revision if it has already been counted in a previous revert or is part of anti-vandalism bots'
-            # activity
-            if i in revs_with_revert_idxs_set or cls.__is_known_bot(rev_i_user):
-                continue
+        if print_info: print(f"Analysis finished, article with edit war (value > {cls.EDIT_WAR_THRESHOLD})?: "
+                             f"{edit_war_value > cls.EDIT_WAR_THRESHOLD} (edit war value: {edit_war_value})")
 
-            # Add next rev user as possibly reverted user (next rev cannot cause a revert as it is necessary at least
-            # an article in between to provoke one, otherwise, this and next revision would be identical)
-            next_rev_user = revs_list[i+1].user
-            if not cls.__is_known_bot(next_rev_user):
-                reverted_users_set.add(next_rev_user)
+        return list(local_revs_dict.values()), reverts_list, mutual_reverts_list, edit_war_value
 
-            for j in range(i+2, len(revs_list)-1):
-                local_rev_j = revs_list[j]
-                rev_j_user = local_rev_j.user
 
-                # Skip known antivandalism bots' activity
-                if cls.__is_known_bot(rev_j_user):
-                    continue
+    @classmethod
+    def score_revision_store(cls, revision_store: RevisionStore, end_dates: list[datetime], site: str = None) \
+            -> list[int]:
+        """
+        Function that computes the edit war value of the revisions published until each one of the dates given,
+        streaming the rows of the store once to find the reverts and once to count the edits of each user, so memory
+        does not grow with the length of the history
+
+        :param revision_store:
+        :param end_dates: in chronological order
+        :param site: "family:code" string of the site of the article, to skip its bots' activity
+        :return: list[int] --> value until each date
+        """
+        # 1º Reverts of the whole history, as the ones of each window are those whose revertant is within it (except
+        # the last revision of the window, which is not considered a revert)
+        revert_finder = cls.__out_of_core_revert_finder(site)
+        revert_finder.add_rows(revision_store.iter_rows())
+        reverts_list = sorted(revert_finder.get_revert_positions(), key=lambda revert: revert[1])
+
+        edit_war_values_list = []
+        edits_counter: Counter[int] = Counter()
+        n_reverts_dict: dict[tuple[int, int], int] = {}     # Reverts by (reverter, reverted user)
+        window_start = 0
+        k = 0
+
+        for end_date in end_dates:
+            window_end = revision_store.position_after(end_date)
+
+            # 2º Edits of each user until the end of the window
+            for _, _, user_id, _ in revision_store.iter_rows(window_start, window_end):
+                edits_counter[user_id] += 1
+            window_start = max(window_start, window_end)
+
+            # 3º Reverts of each user to each other until the end of the window
+            while k < len(reverts_list) and reverts_list[k][1] < window_end - 1:
+                _, revertant_position, reverted_users = reverts_list[k]
+                user_b = revert_finder.get_user_id(revertant_position)
+
+                for user_a in revert_finder.iter_user_ids(reverted_users):
+                    n_reverts_dict[(user_b, user_a)] = n_reverts_dict.get((user_b, user_a), 0) + 1
+
+                k += 1
+
+            # 4º Value of the window: every revert of user_a to user_b is mutual with every revert of user_b to user_a
+            mutual_reverters_set: set[int] = set()
+            nr_sum = 0
+            nr_max = 0
+
+            for (user_a, user_b), n_reverts in n_reverts_dict.items():
+                n_reverts_back = n_reverts_dict.get((user_b, user_a), 0)
+
+                if user_a < user_b and n_reverts_back > 0:
+                    nr_value = min(edits_counter[user_a], edits_counter[user_b])
+                    nr_sum += n_reverts * n_reverts_back * nr_value
+                    nr_max = max(nr_max, nr_value)
+                    mutual_reverters_set.update((user_a, user_b))
+
+            edit_war_values_list.append(max(len(mutual_reverters_set) - 1, 0) * (nr_sum - nr_max))
+
+        return edit_war_values_list
 
-                if local_rev_i.sha1 == local_rev_j.sha1:
-                    # (Exclude self reverts)
-                    if rev_j_user in reverted_users_set:
-                        reverted_users_set.remove(rev_j_user)
 
-                    # Store the revert detected and the idx of the reverting revision to avoid analyzing it later
-                    reverts_list.append((local_rev_i, local_rev_j, reverted_users_set.copy()))
-                    revs_with_revert_idxs_set.add(j)
-                    # The set is cleaned up since if a new revert is found later, the reverted users would be those
-                    # between this last detected revert and the new one.
-                    reverted_users_set.clear()
+    @classmethod
+    def __analysis_params(cls, site: str | None) -> tuple:
+        # Parameters changing the result of an analysis, so results obtained with other ones are not reused
+        return cls.REVERT_HORIZON_REVS, cls.REVERT_HORIZON_TIME, BotRegistry.get_version(site)
 
-                # Rev_j is a revert to rev_i, so user from rev_j has commited a revert against all users of
-                # revisions from i+1 to j-1, so we add all possibly reverted users to set
-                reverted_users_set.add(rev_j_user)
 
-            # Reset set after checking all possible reverts for revision i
-            reverted_users_set.clear()
+    @classmethod
+    def triage_edit_war_value(cls, revs_list: list[LocalRevision],
+                              reverts_list: list[tuple[LocalRevision, LocalRevision, set[str]]] = None,
+                              threshold: int = None, site: str = None) -> tuple[bool, int]:
+        """
+        Function that decides if the edit war value of an article surpasses a threshold without computing it exactly:
+        reverts are traversed keeping a lower and an upper bound of the value, stopping as soon as one of them makes
+        the decision certain
+
+        :param revs_list:
+        :param reverts_list: reverts already found (they are looked for if not given)
+        :param threshold: EDIT_WAR_THRESHOLD if not given
+        :param site: "family:code" string of the site of the article, to skip its bots' activity
+        :return: tuple[bool, int] --> (value surpasses the threshold?, lower bound of the value if it does or upper
+        bound if not)
+        """
+        threshold = cls.EDIT_WAR_THRESHOLD if threshold is None else threshold
+
+        if reverts_list is None:
+            reverts_list = cls.__find_reverts(revs_list, False, site)
+
+        # Nr value of any pair of reverters can not exceed the 2nd greatest nº of edits, as it is the min of both
+        edits_counter = Counter(local_rev.user for local_rev in revs_list)
+        top_edit_counts = [n_edits for _, n_edits in edits_counter.most_common(2)]
+        max_nr = top_edit_counts[1] if len(top_edit_counts) > 1 else 0
+
+        # Mutual reverts are counted per pair of users instead of being listed: a revert of user_b reverting user_a
+        # is mutual with every previous revert of user_a reverting user_b
+        n_reverts_dict: dict[tuple[str, str], int] = {}     # Reverts traversed by (reverter, reverted user)
+        mutual_reverters_set: set[str] = set()
+        nr_sum = 0
+        nr_max = 0
+
+        n_reverts = len(reverts_list)
+        for k in range(n_reverts + 1):
+            # Lower bound: value of the mutual reverts found so far (it can only grow with the remaining ones)
+            lower_bound = max(len(mutual_reverters_set) - 1, 0) * (nr_sum - nr_max)
+            if lower_bound > threshold:
+                return True, lower_bound
+
+            # Upper bound: each remaining revert can be mutual with, at most, every revert previous to it
+            max_remaining_mutual_reverts = (n_reverts - 1 + k) * (n_reverts - k) // 2
+            max_mutual_reverters = min(len(edits_counter), len(mutual_reverters_set) + 2 * max_remaining_mutual_reverts)
+            upper_bound = (max(max_mutual_reverters - 1, 0) *
+                           (nr_sum - nr_max + max_remaining_mutual_reverts * max_nr))
+            if upper_bound <= threshold:
+                return False, upper_bound
+
+            _, revertant_rev, reverted_users_set = reverts_list[k]
+            user_b = revertant_rev.user
+
+            for user_a in reverted_users_set:
+                n_mutual_reverts = n_reverts_dict.get((user_a, user_b), 0)
+
+                if n_mutual_reverts > 0:
+                    nr_value = min(edits_counter[user_a], edits_counter[user_b])
+                    nr_sum += n_mutual_reverts * nr_value
+                    nr_max = max(nr_max, nr_value)
+                    mutual_reverters_set.update((user_a, user_b))
+
+                n_reverts_dict[(user_b, user_a)] = n_reverts_dict.get((user_b, user_a), 0) + 1
+
+
+    @classmethod
+    def triage_article_by_tags(cls, revs_list: list[LocalRevision], site: str = None) -> tuple[bool, int]:
+        """
+        Function that decides if the edit war value of an article may surpass TRIAGE_THRESHOLD finding its reverts
+        from the revert tags added by MediaWiki (fast, but reverts not tagged may be missed)
+
+        :param revs_list: revisions with their tags
+        :param site: "family:code" string of the site of the article, to skip its bots' activity
+        :return: tuple[bool, int] --> (value surpasses TRIAGE_THRESHOLD?, bound of the value)
+        """
+        reverts_list = RevertFinder.find_reverts_by_tags(revs_list, BotRegistry.get_is_bot(site))
+
+        return cls.triage_edit_war_value(revs_list, reverts_list, cls.TRIAGE_THRESHOLD)
+
+
+    @classmethod
+    def triage_articles(cls, articles_set: SortedSet[LocalPage], start_date: datetime, end_date: datetime) \
+            -> dict[LocalPage, tuple[bool, int]]:
+        """
+        Function that triages simultaneously many articles from their revert tags, so only those that may be in an
+        edit war are fully analysed (revisions are not stored)
+
+        :param articles_set:
+        :param start_date:
+        :param end_date:
+        :return: dict[LocalPage, tuple[bool, int]] --> decision and bound of the value of each article
+        """
+        print("\n===> Triaging articles from revert tags...\n")
+
+        def triage_article(local_page: LocalPage) -> tuple[bool, int]:
+            # Title is enough to request revisions, so pages do not have to be loaded
+            site = SitePool.get_site(local_page.site)
+            revs_list = WikiCrawler.get_full_revisions_in_range(site, local_page.title, start_date, end_date,
+                                                                rvprop=WikiCrawler.TAGS_RVPROP)
+
+            return cls.triage_article_by_tags(revs_list, local_page.site)
+
+        triage_results_dict: dict[LocalPage, tuple[bool, int]] = {}
+        with ThreadPoolExecutor(max_workers=cls.TRIAGE_MAX_WORKERS) as executor:
+            futures_dict = {executor.submit(triage_article, local_page): local_page for local_page in articles_set}
+
+            for future in as_completed(futures_dict):
+                triage_results_dict[futures_dict[future]] = future.result()
 
-            if print_info:
                 clear_n_lines(1)
-                print(f"\t\tRevisions analyzed: {i+1}, total nº of reverts detected: {len(reverts_list)}")
+                print(f"\tArticles triaged: {len(triage_results_dict)}/{len(futures_dict)}")
 
-        return reverts_list
+        return triage_results_dict
 
 
-    @staticmethod
-    def __is_known_bot(user: str) -> bool:
-        known_bots = {"serobot", "patrubot", "avbot", "avdiscubot", "botarel", "cvbot", "cvnbot"}
-        is_known_bot = user.lower() in known_bots
+    @classmethod
+    def __find_reverts(cls, revs_list: list[LocalRevision], print_info: bool, site: str = None) \
+            -> list[tuple[LocalRevision, LocalRevision, set[str]]]:
+        if print_info: print("\tStarting to analyse each revision within time range for reverts\n")
+
+        # Revisions are grouped by sha1 as they are traversed, so each one is only compared with previous revisions
+        # with the same contents (skipping self-reverts and bots' activity)
+        revert_finder = RevertFinder(BotRegistry.get_is_bot(site), cls.REVERT_HORIZON_REVS, cls.REVERT_HORIZON_TIME)
+        revert_finder.add_revisions(revs_list)
+        reverts_list = revert_finder.get_reverts()
+
+        if print_info:
+            clear_n_lines(1)
+            print(f"\t\tRevisions analyzed: {len(revs_list)}, total nº of reverts detected: {len(reverts_list)}")
 
-        return is_known_bot
+        return reverts_list
 
 
     @staticmethod
@@ -251,7 +614,8 @@ class EditWarDetector(object):
 
     @classmethod
     def __calculate_raw_m_values(cls, mutual_reverts_list: list[tuple[tuple[LocalRevision, LocalRevision, set[str]],
-                              tuple[LocalRevision, LocalRevision, set[str]]]], revs_list: list[LocalRevision]) \
+                              tuple[LocalRevision, LocalRevision, set[str]]]],
+                              revs_list: list[LocalRevision] | RevisionStore) \
                               -> tuple[list[int], dict[str, int]]:
         # Traverse mutual reverts list calculating the Nr value for each pair of mutual reverters
         # Nr value is calculated as the minimum of the total edits of each reverter. While doing so,
@@ -291,7 +655,11 @@ class EditWarDetector(object):
 
 
     @staticmethod
-    def _count_user_edits(user: Any, revs_list: list[LocalRevision]) -> int:
+    def _count_user_edits(user: Any, revs_list: list[LocalRevision] | RevisionHistory | RevisionStore) -> int:
+        # Histories keep the revisions (or the nº of edits) of each user indexed
+        if isinstance(revs_list, (RevisionHistory, RevisionStore)):
+            return revs_list.count_user_edits(user)
+
         n_edits = 0
 
         for local_rev in revs_list:
@@ -338,27 +706,62 @@ class EditWarDetector(object):
 
 
     @classmethod
-    def detect_edit_wars_in_monitored_articles(cls, articles_set: SortedSet[LocalPage], start_date: datetime,
-                                               end_date: datetime, session_id: str) -> None:
-        # Detect edit wars in set
-        cls.detect_edit_wars_in_set(articles_set, start_date, end_date)
-
-        # Check if any article surpasses threshold
+    def detect_edit_wars_in_monitored_articles(cls, conn: Connection, articles_set: SortedSet[LocalPage],
+                                               start_date: datetime, end_date: datetime, session_id: str) -> None:
         singleton = Singleton()
-        edit_wars_to_notify = 0
 
-        for info in singleton.articles_with_edit_war_info_dict.values():
+        # If the previous run was interrupted, it is resumed at the first article not processed (with its end date,
+        # so all the articles of the session end up analysed over the same period)
+        monitoring_run = fetch_monitoring_run(conn, session_id)
+        if monitoring_run is not None:
+            end_date, processed_pageids_set, edit_wars_to_notify = monitoring_run
+        else:
+            processed_pageids_set, edit_wars_to_notify = set(), 0
+            save_monitoring_run(conn, session_id, end_date, processed_pageids_set, edit_wars_to_notify)
+
+        articles_ids_dict = {article[2]: article[0] for article in
+                             fetch_items_from_db(conn, "articles", "session = ?", [session_id])}
+
+        def save_analysed_article(local_page: LocalPage, info: ArticleEditWarInfo):
+            nonlocal edit_wars_to_notify
+
             # Update end_date info to the one of this automatic analysis (updated one)
             info.end_date = end_date
 
+            # Check if article surpasses threshold
             if info.edit_war_over_time_list[0][0] > cls.EDIT_WAR_THRESHOLD and info.edit_war_notified is False:
                 edit_wars_to_notify += 1
                 info.edit_war_notified = True
 
+            # Results of the article are saved as soon as it is analysed, along with the progress of the run
+            if local_page.pageid not in articles_ids_dict:
+                articles_ids_dict[local_page.pageid] = save_article_data(conn, local_page, session_id)
+
+            period_id = save_article_edit_war_data(conn, articles_ids_dict, local_page, info,
+                                                   singleton.users_info_dict)
+            delete_other_periods(conn, articles_ids_dict[local_page.pageid], period_id)
+
+            processed_pageids_set.add(local_page.pageid)
+            save_monitoring_run(conn, session_id, end_date, processed_pageids_set, edit_wars_to_notify)
+
+        # Detect edit wars in articles not processed yet
+        pending_articles_set = SortedSet(article for article in articles_set
+                                         if article.pageid not in processed_pageids_set)
+        cls.detect_edit_wars_in_set(pending_articles_set, start_date, end_date, save_analysed_article)
+
+        # Users' metadata is retrieved after all articles are analysed, so it is saved once the run is finished
+        for username, user_info in singleton.users_info_dict.items():
+            save_user_data(conn, username, user_info)
+
+        delete_monitoring_run(conn, session_id)
+
+        # Stores of the histories kept out of memory replaced by this run are deleted
+        RevisionStore.delete_unreferenced(conn)
+
         # Create notification if any edit war is detected
         if edit_wars_to_notify > 0:
             generate_system_notification(app="Conflict Watcher",
                                          title="Edit wars detected",
                                          msg = (f'New edit wars detected in {edit_wars_to_notify} monitored articles '
                                                 f'during last analysis. Check session {session_id} for further '
-                                                f'details.'))
\ No newline at end of file
+                                                f'details.'))
@@ -1,7 +1,13 @@
 from datetime import datetime, timedelta
+from typing import Callable, TYPE_CHECKING
 
 from app.info_containers.local_page import LocalPage
 from app.info_containers.local_revision import LocalRevision
+from app.info_containers.revision_history import RevisionHistory
+
+# Only needed for typing, the store depends on the users registry (which imports the database utils)
+if TYPE_CHECKING:
+    from app.revision_store import RevisionStore
 
 
 class ArticleEditWarInfo(object):
@@ -13,8 +19,14 @@ class ArticleEditWarInfo(object):
     # List with edit war values splitting the time range on equal-length intervals
     _edit_war_over_time_list: list[(int, datetime)]
 
-    # History page (list with all the revisions for the specified time range)
-    _revs_list: list[LocalRevision]
+    # History page (all the revisions for the specified time range, indexed by revid, user, sha1 and time)
+    _revs_list: RevisionHistory
+
+    # Full history page of the articles too long to be kept in memory (revs_list only holds the revisions of reverts)
+    _revision_store: 'RevisionStore | None'
+
+    # Name of the store of the history page, if it was kept out of memory (kept even if the store no longer exists)
+    _revision_store_name: str | None
 
     # List with all the reverts on the article for the specified time range
     _reverts_list: list[tuple[LocalRevision, LocalRevision, set[str]]]
@@ -26,6 +38,13 @@ class ArticleEditWarInfo(object):
     # Dictionary with the nº of mutual reverts made by each mutual reverter on this article and period
     _mutual_reverters_dict: dict[str, int]
 
+    # Reverts grouped by the revision they revert to, along with the reverts list (and its length) they come from
+    _reverts_by_base_cache: tuple[list, int, dict[int, list]] | None
+
+    # Function loading the revisions, reverts and mutual reverters of the article when they are first accessed (None if
+    # they are already loaded)
+    _loader: Callable[['ArticleEditWarInfo'], None] | None
+
     def __init__(self, article: LocalPage, start_date: datetime, end_date: datetime, edit_war_value: int = None,
                  edit_war_notified: bool = None, reverts_list: list = None,
                  mutual_reverts_list: list = None, mutual_reverters_dict: list = None):
@@ -34,10 +53,14 @@ class ArticleEditWarInfo(object):
         self._end_date = end_date
         self._edit_war_notified = edit_war_notified if edit_war_notified is not None else False
         self._edit_war_over_time_list = [(edit_war_value, end_date)] if edit_war_value is not None else []
-        self._revs_list = []
+        self._revs_list = RevisionHistory()
+        self._revision_store = None
+        self._revision_store_name = None
         self._reverts_list = reverts_list if reverts_list is not None else []
         self._mutual_reverts_list = mutual_reverts_list if mutual_reverts_list is not None else []
         self._mutual_reverters_dict = mutual_reverters_dict if mutual_reverters_dict is not None else {}
+        self._reverts_by_base_cache = None
+        self._loader = None
 
     @property
     def article(self):
@@ -61,18 +84,39 @@ class ArticleEditWarInfo(object):
 
     @property
     def revs_list(self):
+        self.load()
         return self._revs_list
 
+    @property
+    def is_loaded(self):
+        return self._loader is None
+
+    @property
+    def revision_store(self):
+        return self._revision_store
+
+    @property
+    def revision_store_name(self):
+        return self._revision_store_name
+
+    @property
+    def out_of_core(self):
+        # History page was too long to be kept in memory, so revs_list only holds the revisions of reverts
+        return self._revision_store_name is not None
+
     @property
     def reverts_list(self):
+        self.load()
         return self._reverts_list
 
     @property
     def mutual_reverts_list(self):
+        self.load()
         return self._mutual_reverts_list
 
     @property
     def mutual_reverters_dict(self):
+        self.load()
         return self._mutual_reverters_dict
 
     @start_date.setter
@@ -93,21 +137,119 @@ class ArticleEditWarInfo(object):
 
     @revs_list.setter
     def revs_list(self, value):
-        self._revs_list = value
+        self.load()
+        self._revs_list = value if isinstance(value, RevisionHistory) else RevisionHistory(value)
+
+    @revision_store.setter
+    def revision_store(self, value):
+        self._revision_store = value
+        if value is not None:
+            self._revision_store_name = value.name
+
+    @revision_store_name.setter
+    def revision_store_name(self, value):
+        self._revision_store_name = value
 
     @reverts_list.setter
     def reverts_list(self, value):
+        self.load()
         self._reverts_list = value
+        self._reverts_by_base_cache = None
 
     @mutual_reverts_list.setter
     def mutual_reverts_list(self, value):
+        self.load()
         self._mutual_reverts_list = value
 
     @mutual_reverters_dict.setter
     def mutual_reverters_dict(self, value):
+        self.load()
         self._mutual_reverters_dict = value
 
 
+    def set_loader(self, loader: Callable[['ArticleEditWarInfo'], None]):
+        """
+        Function that defers the load of the revisions, reverts and mutual reverters of the article until they are
+        first accessed
+
+        :param loader: function filling them
+        :return: None
+        """
+        self._loader = loader
+
+
+    def load(self):
+        # Loader is removed before running it, so it can fill the lists through their properties
+        loader = self._loader
+
+        if loader is not None:
+            self._loader = None
+            loader(self)
+
+
+    def count_mutual_reverters(self) -> dict[str, int]:
+        """
+        Function that fills (if it is empty) the dictionary with the nº of mutual reverts made by each mutual reverter
+        from the mutual reverts list
+
+        :return: dict[str, int]
+        """
+        self.load()
+
+        if not self._mutual_reverters_dict:
+            for mutual_reverts_tuple in self._mutual_reverts_list:
+                user_i = mutual_reverts_tuple[0][1].user
+                user_j = mutual_reverts_tuple[1][1].user
+                self._mutual_reverters_dict[user_i] = self._mutual_reverters_dict.get(user_i, 0) + 1
+                self._mutual_reverters_dict[user_j] = self._mutual_reverters_dict.get(user_j, 0) + 1
+
+        return self._mutual_reverters_dict
+
+
+    def group_reverts_by_base(self) -> dict[int, list]:
+        """
+        Function that groups the reverts by the revision they revert to, grouping them again only if the reverts list
+        has changed since the last time
+
+        :return: dict[int, list] --> [base revision, revertant revisions] by revid of the base revision
+        """
+        self.load()
+
+        # The list itself is kept (not its id, which may be reused by a new list once the old one is freed)
+        if (self._reverts_by_base_cache is None or self._reverts_by_base_cache[0] is not self._reverts_list
+                or self._reverts_by_base_cache[1] != len(self._reverts_list)):
+            reverts_by_base_dict = {}
+            for base_rev, revertant_rev, _ in self._reverts_list:
+                reverts_by_base_dict.setdefault(base_rev.revid, [base_rev, []])[1].append(revertant_rev)
+
+            self._reverts_by_base_cache = (self._reverts_list, len(self._reverts_list), reverts_by_base_dict)
+
+        return self._reverts_by_base_cache[2]
+
+
+    def count_mutual_reverter_pairs(self) -> dict[tuple[str, str], tuple[int, int]]:
+        """
+        Function that counts the mutual reverts made between each pair of mutual reverters, along with the Nr value
+        of the pair (min of the nº of edits of both users), the raw components of the edit war value
+
+        :return: dict[tuple[str, str], tuple[int, int]] --> (nº of mutual reverts, Nr value) by pair of usernames
+        """
+        self.load()
+
+        mutual_reverter_pairs_dict: dict[tuple[str, str], tuple[int, int]] = {}
+        history = self._revision_store if self._revision_store is not None else self._revs_list
+
+        for mutual_reverts_tuple in self._mutual_reverts_list:
+            # Users hidden by Wikipedia (None) are compared as strings, as they are counted in the value too
+            user_1, user_2 = sorted((mutual_reverts_tuple[0][1].user, mutual_reverts_tuple[1][1].user), key=str)
+            n_mutual_reverts, _ = mutual_reverter_pairs_dict.get((user_1, user_2), (0, 0))
+            nr_value = min(history.count_user_edits(user_1), history.count_user_edits(user_2))
+
+            mutual_reverter_pairs_dict[(user_1, user_2)] = (n_mutual_reverts + 1, nr_value)
+
+        return mutual_reverter_pairs_dict
+
+
     def is_in_edit_war(self, edit_war_threshold: int) -> bool:
         """
         Function that works as a tag indicating if there is an edit war in the article
@@ -1,10 +1,14 @@
-from typing import Iterable
+from typing import Iterable, TYPE_CHECKING
 
-import pywikibot
+# Only needed for typing, pywikibot is imported when a page is first requested as it is slow to import
+if TYPE_CHECKING:
+    import pywikibot
+
+from app.utils.site_pool import SitePool
 
 
 class LocalPage(object):
-    _page: pywikibot.Page       # Referenced article
+    _page: 'pywikibot.Page'     # Referenced article
     _pageid: int
     _title: str
     _site: str
@@ -19,7 +23,7 @@ class LocalPage(object):
     # Constructor to build class parameters from database
     def __init__(self, pageid: int, title: str, site: str, namespace: str, url: str, content_model: str,
                  discussion_page_title: str, discussion_page_url: str, text: str = None,
-                 discussion_page_text: str = None, page: pywikibot.Page = None):
+                 discussion_page_text: str = None, page: 'pywikibot.Page' = None):
         self._page = page
         self._pageid = pageid
         self._title = title
@@ -36,8 +40,8 @@ class LocalPage(object):
     @property
     def page(self):
         if self._page is None:
-            fam, code = self._site.split(":")
-            self._page = pywikibot.Page(pywikibot.Site(code, fam), self._title)
+            import pywikibot
+            self._page = pywikibot.Page(SitePool.get_site(self._site), self._title)
 
         return self._page
 
@@ -45,6 +49,10 @@ class LocalPage(object):
     def page(self, value):
         self._page = value
 
+    @property
+    def page_loaded(self):
+        return self._page is not None
+
     @property
     def content_model(self):
         return self._content_model
@@ -153,7 +161,7 @@ class LocalPage(object):
 
 
     @classmethod
-    def init_with_page(cls, page: pywikibot.Page):
+    def init_with_page(cls, page: 'pywikibot.Page'):
         """ Constructor to build class parameters from pywikibot.Page """
         discussion_page = page.toggleTalkPage()
 
@@ -161,6 +169,27 @@ class LocalPage(object):
                    discussion_page.title(), discussion_page.full_url(), page=page, text=None, discussion_page_text=None)
 
 
+    @classmethod
+    def init_with_page_info(cls, page_info: dict, site: 'pywikibot.site.APISite'):
+        """ Constructor to build class parameters from the page info returned by the API (prop=info with
+        inprop=url|talkid), without any additional request """
+        import pywikibot
+        from pywikibot.data.api import update_page
+
+        # Page is built with the info already received, so its attributes do not trigger new requests when accessed
+        page = pywikibot.Page(site, page_info["title"], ns=page_info["ns"])
+        update_page(page, page_info, ["info"])
+
+        # Title and url of the discussion page are built from the namespaces of the site (no request needed)
+        discussion_page = page.toggleTalkPage()
+        discussion_page_title = discussion_page.title() if discussion_page is not None else None
+        discussion_page_url = discussion_page.full_url() if discussion_page is not None else None
+
+        return cls(page_info["pageid"], page_info["title"], str(site), page_info["ns"], page_info.get("fullurl"),
+                   page_info.get("contentmodel"), discussion_page_title, discussion_page_url, page=page, text=None,
+                   discussion_page_text=None)
+
+
     def full_url(self):
         if self.url is None:
             full_url = self.page.full_url()
@@ -171,7 +200,7 @@ class LocalPage(object):
 
 
     def categories(self, with_sort_key: bool = False, total: int = None, content: bool = False) \
-            -> Iterable[pywikibot.Page]:
+            -> Iterable['pywikibot.Page']:
         categories = []
 
         if self.page is not None:
@@ -1,8 +1,12 @@
-import pywikibot
+from typing import TYPE_CHECKING
+
+# Only needed for typing, pywikibot is slow to import and revisions loaded from database do not need it
+if TYPE_CHECKING:
+    import pywikibot
 
 
 class LocalRevision(object):
-    _revision: pywikibot.page._revision     # Referenced revision
+    _revision: 'pywikibot.page._revision'   # Referenced revision
     _revid: int
     _article: int
     _timestamp: str
@@ -15,7 +19,7 @@ class LocalRevision(object):
 
     # Constructor to build class parameters from database
     def __init__(self, revid: int, timestamp: str, user: str, text: str, size: int, tags: str,
-                 comment: str, sha1: str, revision: pywikibot.page._revision = None):
+                 comment: str, sha1: str, revision: 'pywikibot.page._revision' = None):
         self._revision = revision
         self._revid = revid
         self._timestamp = timestamp
@@ -131,7 +135,7 @@ class LocalRevision(object):
 
 
     @classmethod
-    def init_with_revision(cls, revision: pywikibot.page._revision):
+    def init_with_revision(cls, revision: 'pywikibot.page._revision'):
         """ Constructor to build class parameters from pywikibot.page._revision"""
 
         return cls(revision.get("revid"), revision.get("timestamp"), cls.__extract_rev_user(revision),
@@ -140,7 +144,7 @@ class LocalRevision(object):
 
 
     @staticmethod
-    def __extract_rev_user(rev: pywikibot.page._revision) -> str:
+    def __extract_rev_user(rev: 'pywikibot.page._revision') -> str:
         if rev.get("user") is not None:
             user = rev.get("user")
         else:
@@ -14,11 +14,12 @@ class LocalUser(object):
     _network_name: str
     _network_country: str
     _registrants_info: str
+    _groups: list[str]                  # User groups (not stored in database)
 
     def __init__(self, username: str, site: str = None, is_registered: bool = None,
                  is_blocked: bool = None, registration_date: datetime = None, edit_count: int = None,
                  asn: str = None, asn_description: str = None, network_address: str = None, network_name: str = None,
-                 network_country: str = None, registrants_info: str = None):
+                 network_country: str = None, registrants_info: str = None, groups: list[str] = None):
 
         self._username = username
         self._site = site
@@ -32,6 +33,7 @@ class LocalUser(object):
         self._network_name = network_name
         self._network_country = network_country
         self._registrants_info = registrants_info
+        self._groups = groups
 
     @property
     def asn(self):
@@ -127,4 +129,12 @@ class LocalUser(object):
 
     @network_address.setter
     def network_address(self, value):
-        self._network_address = value
\ No newline at end of file
+        self._network_address = value
+
+    @property
+    def groups(self):
+        return self._groups
+
+    @groups.setter
+    def groups(self, value):
+        self._groups = value
@@ -0,0 +1,168 @@
+import bisect
+
+from collections import deque
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from app.info_containers.local_revision import LocalRevision
+from app.utils.helpers import datetime_to_iso
+
+
+class RevisionHistory(object):
+    """
+    History page of an article (revisions in chronological order) with indexes by revid, user and sha1 kept up to
+    date as revisions are added or trimmed at both ends, so no consumer has to scan it. Positions are found by time
+    with a binary search, as revisions are sorted by timestamp
+    """
+    _revs_list: list[LocalRevision]
+
+    # Indexes store slots, which do not change when revisions are added or trimmed at the start (position of a
+    # revision is its slot minus the slot of the first one)
+    _first_slot: int
+    _slots_by_revid_dict: dict[int, int]
+    _slots_by_user_dict: dict[str, deque[int]]
+    _slots_by_sha1_dict: dict[str, deque[int]]
+
+    def __init__(self, local_revs: Iterable[LocalRevision] = ()):
+        self._revs_list = []
+        self._first_slot = 0
+        self._slots_by_revid_dict = {}
+        self._slots_by_user_dict = {}
+        self._slots_by_sha1_dict = {}
+
+        self.extend(local_revs)
+
+    def __len__(self) -> int:
+        return len(self._revs_list)
+
+    def __iter__(self) -> Iterator[LocalRevision]:
+        return iter(self._revs_list)
+
+    def __reversed__(self) -> Iterator[LocalRevision]:
+        return reversed(self._revs_list)
+
+    def __getitem__(self, idx: int | slice) -> LocalRevision | list[LocalRevision]:
+        # Slices are plain lists, as they are not histories to be updated
+        return self._revs_list[idx]
+
+    def __repr__(self) -> str:
+        return f"RevisionHistory({len(self._revs_list)} revisions)"
+
+
+    def append(self, local_rev: LocalRevision):
+        slot = self._first_slot + len(self._revs_list)
+        self._revs_list.append(local_rev)
+
+        self._slots_by_revid_dict[local_rev.revid] = slot
+        self._slots_by_user_dict.setdefault(local_rev.user, deque()).append(slot)
+        self._slots_by_sha1_dict.setdefault(local_rev.sha1, deque()).append(slot)
+
+
+    def extend(self, local_revs: Iterable[LocalRevision]):
+        for local_rev in local_revs:
+            self.append(local_rev)
+
+
+    def prepend(self, local_revs: Iterable[LocalRevision]):
+        """
+        Function that adds revisions (older than the current ones) at the start of the history
+
+        :param local_revs: revisions in chronological order
+        :return: None
+        """
+        local_revs_list = list(local_revs)
+        self._revs_list[:0] = local_revs_list
+
+        # New revisions are indexed from the newest one, so each slot is added before the ones already indexed
+        for local_rev in reversed(local_revs_list):
+            self._first_slot -= 1
+
+            self._slots_by_revid_dict[local_rev.revid] = self._first_slot
+            self._slots_by_user_dict.setdefault(local_rev.user, deque()).appendleft(self._first_slot)
+            self._slots_by_sha1_dict.setdefault(local_rev.sha1, deque()).appendleft(self._first_slot)
+
+
+    def trim_until(self, date: datetime) -> int:
+        """
+        Function that removes the revisions published until the date given (included)
+
+        :param date:
+        :return: int --> nº of revisions removed
+        """
+        n_revs = self.position_after(date)
+
+        for local_rev in self._revs_list[:n_revs]:
+            self._unindex(local_rev, from_start=True)
+
+        del self._revs_list[:n_revs]
+        self._first_slot += n_revs
+
+        return n_revs
+
+
+    def trim_from(self, date: datetime) -> int:
+        """
+        Function that removes the revisions published from the date given (included)
+
+        :param date:
+        :return: int --> nº of revisions removed
+        """
+        position = bisect.bisect_left(self._revs_list, datetime_to_iso(date), key=lambda local_rev: local_rev.timestamp)
+        n_revs = len(self._revs_list) - position
+
+        for local_rev in self._revs_list[position:]:
+            self._unindex(local_rev, from_start=False)
+
+        del self._revs_list[position:]
+
+        return n_revs
+
+
+    def _unindex(self, local_rev: LocalRevision, from_start: bool):
+        self._slots_by_revid_dict.pop(local_rev.revid, None)
+
+        # Revisions are only trimmed at the ends, so their slots are always the first or the last ones of each index
+        for index_dict, key in ((self._slots_by_user_dict, local_rev.user), (self._slots_by_sha1_dict, local_rev.sha1)):
+            slots = index_dict[key]
+            if from_start:
+                slots.popleft()
+            else:
+                slots.pop()
+
+            if not slots:
+                del index_dict[key]
+
+
+    def get(self, revid: int) -> LocalRevision | None:
+        position = self.position_of(revid)
+
+        return self._revs_list[position] if position is not None else None
+
+
+    def position_of(self, revid: int) -> int | None:
+        slot = self._slots_by_revid_dict.get(revid)
+
+        return slot - self._first_slot if slot is not None else None
+
+
+    def positions_of_user(self, user: str) -> list[int]:
+        return [slot - self._first_slot for slot in self._slots_by_user_dict.get(user, ())]
+
+
+    def positions_of_sha1(self, sha1: str) -> list[int]:
+        return [slot - self._first_slot for slot in self._slots_by_sha1_dict.get(sha1, ())]
+
+
+    def count_user_edits(self, user: str) -> int:
+        return len(self._slots_by_user_dict.get(user, ()))
+
+
+    def position_after(self, date: datetime) -> int:
+        """
+        Function that returns the position of the first revision published after the date given (the nº of
+        revisions published until it)
+
+        :param date:
+        :return: int
+        """
+        return bisect.bisect_right(self._revs_list, datetime_to_iso(date), key=lambda local_rev: local_rev.timestamp)
@@ -0,0 +1,272 @@
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+from app.info_containers.local_revision import LocalRevision
+from app.utils.user_registry import UserRegistry
+
+
+class RevertFinder(object):
+    """
+    Incremental detection of reverts (revisions identical, by sha1, to a previous one with at least a revision in
+    between). Revisions are added in chronological order as they are received, and the reverts found are the same as
+    analysing the whole history at once: each revision not reverting to a previous one is a possible base, and the
+    users reverted by each revert are those of the revisions since the previous revert to the same base (or the
+    base itself), skipping bots' activity and self-reverts. Users are numbered by the finder in the order they appear
+    (so its ids only grow with the users of the article, not with the ones seen in the execution), and the users
+    reverted by each revert are handled as an int bitset of those ids until reverts are returned.
+
+    Optionally, a revision only reverts to bases within a horizon (a max nº of revisions and/or a max time before
+    it). Bases out of the horizon are discarded as revisions arrive, so the work done per revision is bounded no
+    matter the length of the history. Revisions can also be added as rows of a RevisionStore, which are not kept
+    """
+    REVERTANT_TAGS = {"mw-rollback", "mw-undo", "mw-manual-revert"}    # Tags MediaWiki adds to reverts
+    REVERTED_TAG = "mw-reverted"                                        # Tag MediaWiki adds to reverted revisions
+
+    __ISO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+    _is_bot: Callable[[int], bool]                          # Receives interned user ids
+    _max_revs: int | None                                   # Horizon in nº of revisions
+    _max_age: timedelta | None                              # Horizon in time
+    _revs_list: list[LocalRevision]                         # Empty if revisions are added as rows
+    _users_list: list[int]                                  # Id (within the finder) of the user of each revision
+    _user_ids_list: list[int]                               # Interned id of each user of the finder
+    _local_ids_dict: dict[int, int]                         # Id within the finder of each interned user
+    _bot_revs_list: bytearray                               # If each revision was made by a bot
+
+    # Possible bases by sha1, each one with its index and the start of the revisions reverted by its next revert
+    _bases_dict: dict[str | bytes, list[list[int]]]
+    # Bases (idx, sha1, date) from oldest to newest, to expire
+    _bases_queue: deque[tuple[int, str | bytes, datetime | None]]
+
+    # Reverts found as (base idx, revertant idx, reverted users bitset), those of the last revision received are kept
+    # apart until another one arrives, as the last revision of the time range is not considered a revert
+    _reverts_list: list[tuple[int, int, int]]
+    _last_rev_reverts_list: list[tuple[int, int, int]]
+
+    def __init__(self, is_bot: Callable[[int], bool], max_revs: int = None, max_age: timedelta = None):
+        self._is_bot = is_bot
+        self._max_revs = max_revs
+        self._max_age = max_age
+        self._revs_list = []
+        self._users_list = []
+        self._user_ids_list = []
+        self._local_ids_dict = {}
+        self._bot_revs_list = bytearray()
+        self._bases_dict = {}
+        self._bases_queue = deque()
+        self._reverts_list = []
+        self._last_rev_reverts_list = []
+
+    @property
+    def n_revs(self):
+        return len(self._users_list)
+
+    @property
+    def n_reverts(self):
+        return len(self._reverts_list)
+
+
+    def add_revisions(self, local_revs: Iterable[LocalRevision]):
+        for local_rev in local_revs:
+            self.__add_revision(local_rev)
+
+
+    def add_rows(self, rows: Iterable[tuple[int, int, int, bytes]]):
+        """
+        Function that adds revisions given as rows of a RevisionStore (revid, epoch timestamp, interned user id, raw
+        sha1), without keeping them: reverts found are then returned by get_revert_positions
+
+        :param rows:
+        :return: None
+        """
+        for _, epoch, user_id, sha1 in rows:
+            rev_date = None
+            if self._max_age is not None:
+                rev_date = datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+            self.__add(user_id, sha1, rev_date)
+
+
+    def __add_revision(self, local_rev: LocalRevision):
+        self._revs_list.append(local_rev)
+
+        rev_date = None
+        if self._max_age is not None:
+            rev_date = datetime.strptime(local_rev.timestamp, self.__ISO_DATE_FORMAT)
+
+        self.__add(UserRegistry.intern(local_rev.user), local_rev.sha1, rev_date)
+
+
+    def __add(self, user_id: int, sha1: str | bytes, rev_date: datetime | None):
+        # Previous revision is not the last one anymore, so its reverts are confirmed
+        self._reverts_list.extend(self._last_rev_reverts_list)
+        self._last_rev_reverts_list = []
+
+        j = len(self._users_list)
+        is_bot = self._is_bot(user_id)
+        local_id = self.__get_local_id(user_id)
+        self._users_list.append(local_id)
+        self._bot_revs_list.append(is_bot)
+
+        # Known antivandalism bots' activity is neither a revert nor a base for them
+        if is_bot:
+            return
+
+        if self._max_revs is not None or self._max_age is not None:
+            self.__expire_bases(j, rev_date)
+
+        # Look for a revert to each possible base with the same contents (consecutive identical revisions excluded)
+        bases_list = self._bases_dict.setdefault(sha1, [])
+        for base in bases_list:
+            i, reverted_start = base
+
+            if i <= j - 2:
+                reverted_users = 0
+                for k in range(reverted_start, j):
+                    if not self._bot_revs_list[k]:
+                        reverted_users |= 1 << self._users_list[k]
+                reverted_users &= ~(1 << local_id)     # Exclude self reverts
+
+                self._last_rev_reverts_list.append((i, j, reverted_users))
+
+                # Users reverted by the next revert to this base will be those from this revision onwards
+                base[1] = j
+
+        # A revision reverting to a previous one is not a base itself
+        if not self._last_rev_reverts_list:
+            bases_list.append([j, j + 1])
+
+            if self._max_revs is not None or self._max_age is not None:
+                self._bases_queue.append((j, sha1, rev_date))
+
+
+    def __expire_bases(self, j: int, rev_date: datetime | None):
+        # Bases are queued (and grouped by sha1) in the order they appear, so expired ones are always the first
+        while self._bases_queue:
+            i, sha1, base_date = self._bases_queue[0]
+            out_of_revs = self._max_revs is not None and j - i > self._max_revs
+            out_of_time = self._max_age is not None and rev_date - base_date > self._max_age
+
+            if not out_of_revs and not out_of_time:
+                break
+
+            self._bases_queue.popleft()
+            bases_list = self._bases_dict[sha1]
+            bases_list.pop(0)
+            if not bases_list:
+                del self._bases_dict[sha1]
+
+
+    def __get_local_id(self, user_id: int) -> int:
+        local_id = self._local_ids_dict.get(user_id)
+
+        if local_id is None:
+            local_id = len(self._user_ids_list)
+            self._user_ids_list.append(user_id)
+            self._local_ids_dict[user_id] = local_id
+
+        return local_id
+
+
+    def get_user_id(self, position: int) -> int:
+        return self._user_ids_list[self._users_list[position]]
+
+
+    def iter_user_ids(self, bitset: int) -> Iterator[int]:
+        """
+        Function that translates a set of users of the finder stored as an int bitset (bit i set if user i of the
+        finder is in it) to their interned ids
+
+        :param bitset:
+        :return: Iterator[int]
+        """
+        while bitset:
+            lowest_bit = bitset & -bitset
+            yield self._user_ids_list[lowest_bit.bit_length() - 1]
+            bitset ^= lowest_bit
+
+
+    def get_usernames(self, bitset: int) -> set[str]:
+        return {UserRegistry.get_username(user_id) for user_id in self.iter_user_ids(bitset)}
+
+
+    def get_revert_positions(self) -> list[tuple[int, int, int]]:
+        """
+        Function that returns the reverts found so far by position of their revisions, ordered by base and revertant
+        revision
+
+        :return: list[tuple[int, int, int]] --> (base position, revertant position, reverted users bitset)
+        """
+        return sorted(self._reverts_list, key=lambda revert: revert[:2])
+
+
+    def get_reverts(self) -> list[tuple[LocalRevision, LocalRevision, set[str]]]:
+        """
+        Function that returns the reverts found so far, ordered by base and revertant revision
+
+        :return: list[tuple[LocalRevision, LocalRevision, set[str]]] --> (base revision, revertant revision,
+        reverted users)
+        """
+        return [(self._revs_list[i], self._revs_list[j], self.get_usernames(reverted_users))
+                for i, j, reverted_users in sorted(self._reverts_list, key=lambda revert: revert[:2])]
+
+
+    @classmethod
+    def find_reverts_by_tags(cls, revs_list: list[LocalRevision], is_bot: Callable[[int], bool]) \
+            -> list[tuple[LocalRevision, LocalRevision, set[str]]]:
+        """
+        Function that finds reverts in a single pass using the revert tags added by MediaWiki: the base of each
+        tagged revert is the revision previous to the reverted revisions right before it (or, if they are not
+        tagged, the last revision with the same sha1). Revisions previous to the first tagged one (older than the
+        tags or from wikis without them) are analysed by contents
+
+        :param revs_list: revisions with their tags
+        :param is_bot: receives interned user ids
+        :return: list[tuple[LocalRevision, LocalRevision, set[str]]] --> (base revision, revertant revision,
+        reverted users)
+        """
+        revert_tags_set = cls.REVERTANT_TAGS | {cls.REVERTED_TAG}
+        first_tagged_idx = next((k for k, local_rev in enumerate(revs_list)
+                                 if revert_tags_set.intersection(local_rev.tags or ())), len(revs_list))
+
+        # 1º Untagged revisions are analysed by contents
+        revert_finder = cls(is_bot)
+        revert_finder.add_revisions(revs_list[:first_tagged_idx])
+        reverts_list = revert_finder._reverts_list + revert_finder._last_rev_reverts_list
+
+        # 2º Tagged revisions are analysed in a single pass
+        user_ids_list = [UserRegistry.intern(local_rev.user) for local_rev in revs_list]
+        bot_revs_list = [is_bot(user_id) for user_id in user_ids_list]
+        users_list = [revert_finder.__get_local_id(user_id) for user_id in user_ids_list]
+        last_sha1_idxs_dict = {local_rev.sha1: k for k, local_rev in enumerate(revs_list[:first_tagged_idx])}
+        reverted_start = None       # Start of the reverted revisions right before the current one
+
+        for j in range(first_tagged_idx, len(revs_list)):
+            local_rev = revs_list[j]
+            tags_set = set(local_rev.tags or ())
+            is_revert = False
+
+            if cls.REVERTANT_TAGS & tags_set and not bot_revs_list[j]:
+                i = reverted_start - 1 if reverted_start is not None else last_sha1_idxs_dict.get(local_rev.sha1)
+
+                if i is not None and 0 <= i <= j - 2:
+                    reverted_users = 0
+                    for k in range(i + 1, j):
+                        if not bot_revs_list[k]:
+                            reverted_users |= 1 << users_list[k]
+                    reverted_users &= ~(1 << users_list[j])     # Exclude self reverts
+
+                    reverts_list.append((i, j, reverted_users))
+                    is_revert = True
+
+            # A revert ends the reverted revisions before it (it may be reverted too, starting a new sequence)
+            if cls.REVERTED_TAG in tags_set:
+                reverted_start = j if reverted_start is None or is_revert else reverted_start
+            else:
+                reverted_start = None
+
+            last_sha1_idxs_dict[local_rev.sha1] = j
+
+        return [(revs_list[i], revs_list[j], revert_finder.get_usernames(reverted_users))
+                for i, j, reverted_users in sorted(reverts_list, key=lambda revert: revert[:2])]
@@ -0,0 +1,202 @@
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Iterable
+
+from app.utils.db_utils import (sqlite_connection, fetch_cached_revision_contents, save_cached_revision_contents,
+                                evict_cached_revision_contents, DB_PATH)
+from app.utils.site_pool import SitePool
+from app.utils.request_scheduler import RequestScheduler
+
+
+class RevisionContentCache(object):
+    """
+    Cache of revision contents, kept in memory (least recently used ones are discarded when the byte budget is
+    exceeded) and in the local database, so revisions inspected once are never requested again
+    """
+    MAX_MEMORY_BYTES = 64 * 1024 * 1024     # Max size of the contents kept in memory
+    MAX_DB_BYTES = 512 * 1024 * 1024        # Max size of the contents kept in database
+    MAX_REVISIONS_PER_REQUEST = 50          # Max nº of revisions whose content the API returns per request
+
+    _contents_dict: OrderedDict[tuple[str, int], str | None] = OrderedDict()    # From least to most recently used
+    _n_bytes = 0
+    _executor: ThreadPoolExecutor = None
+    _pending_prefetches_dict: dict[tuple[str, int], Future] = {}    # Prefetches in background, by (site, revid)
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def get(cls, site: str, revid: int) -> str | None:
+        """
+        Function that returns the content of a revision, waiting for its prefetch if it was requested
+
+        :param site: "family:code" string of the site of the revision
+        :param revid:
+        :return: str | None --> None if the content is not publicly available (deleted or hidden)
+        """
+        with cls._lock:
+            future = cls._pending_prefetches_dict.get((site, revid))
+
+        if future is not None:
+            try:
+                future.result()
+            except Exception:
+                pass    # Content is requested again below, so the error (if it persists) reaches the caller
+
+        return cls.get_many(site, [revid]).get(revid)
+
+
+    @classmethod
+    def get_cached(cls, site: str, revids: Iterable[int]) -> dict[int, str | None]:
+        """
+        Function that returns the contents of the revisions given that are kept in memory, without requesting them
+
+        :param site: "family:code" string of the site of the revisions
+        :param revids:
+        :return: dict[int, str | None]
+        """
+        with cls._lock:
+            return {revid: cls._contents_dict[(site, revid)] for revid in revids if (site, revid) in cls._contents_dict}
+
+
+    @classmethod
+    def get_many(cls, site: str, revids: Iterable[int]) -> dict[int, str | None]:
+        """
+        Function that returns the contents of many revisions, looking for them in memory, then in database and
+        requesting the remaining ones to Wikipedia in batches
+
+        :param site: "family:code" string of the site of the revisions
+        :param revids:
+        :return: dict[int, str | None]
+        """
+        contents_dict = {}
+        missing_revids_list = []
+
+        # 1º Contents kept in memory
+        with cls._lock:
+            for revid in dict.fromkeys(revids):
+                if (site, revid) in cls._contents_dict:
+                    cls._contents_dict.move_to_end((site, revid))
+                    contents_dict[revid] = cls._contents_dict[(site, revid)]
+                else:
+                    missing_revids_list.append(revid)
+
+        if not missing_revids_list:
+            return contents_dict
+
+        # 2º Contents stored in database (each call uses its own connection, as it can be made from the background)
+        with sqlite_connection(DB_PATH) as conn:
+            stored_contents_dict = fetch_cached_revision_contents(conn, site, missing_revids_list)
+
+        # 3º Contents requested to Wikipedia
+        missing_revids_list = [revid for revid in missing_revids_list if revid not in stored_contents_dict]
+        fetched_contents_dict = cls._fetch_contents(site, missing_revids_list) if missing_revids_list else {}
+
+        if fetched_contents_dict:
+            with sqlite_connection(DB_PATH) as conn:
+                save_cached_revision_contents(conn, site, fetched_contents_dict)
+                evict_cached_revision_contents(conn, cls.MAX_DB_BYTES)
+
+        for revid, content in (stored_contents_dict | fetched_contents_dict).items():
+            cls._remember(site, revid, content)
+            contents_dict[revid] = content
+
+        return contents_dict
+
+
+    @classmethod
+    def prefetch(cls, site: str, revids: Iterable[int]):
+        """
+        Function that starts retrieving in background the contents of the revisions given (those not already cached
+        or pending), so they are ready when requested
+
+        :param site: "family:code" string of the site of the revisions
+        :param revids:
+        :return: None
+        """
+        with cls._lock:
+            revids_list = [revid for revid in dict.fromkeys(revids)
+                           if (site, revid) not in cls._contents_dict and (site, revid) not in cls._pending_prefetches_dict]
+
+            if not revids_list:
+                return
+
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="revision_contents")
+
+            # All revisions are retrieved by the same task, so they are requested in as few batches as possible
+            future = cls._executor.submit(cls.get_many, site, revids_list)
+            for revid in revids_list:
+                cls._pending_prefetches_dict[(site, revid)] = future
+
+            future.add_done_callback(lambda _: cls._forget_prefetch(site, revids_list))
+
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Function that stops the background prefetches, cancelling the pending ones (only the one running is finished)
+
+        :return: None
+        """
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+
+
+    @classmethod
+    def _forget_prefetch(cls, site: str, revids_list: list[int]):
+        with cls._lock:
+            for revid in revids_list:
+                cls._pending_prefetches_dict.pop((site, revid), None)
+
+
+    @classmethod
+    def _remember(cls, site: str, revid: int, content: str | None):
+        n_bytes = len(content.encode()) if content is not None else 0
+
+        with cls._lock:
+            if (site, revid) in cls._contents_dict:
+                return
+
+            cls._contents_dict[(site, revid)] = content
+            cls._n_bytes += n_bytes
+
+            # Discard least recently used contents until the memory budget is met again
+            while cls._n_bytes > cls.MAX_MEMORY_BYTES and len(cls._contents_dict) > 1:
+                _, old_content = cls._contents_dict.popitem(last=False)
+                cls._n_bytes -= len(old_content.encode()) if old_content is not None else 0
+
+
+    @classmethod
+    def _fetch_contents(cls, site_key: str, revids_list: list[int]) -> dict[int, str | None]:
+        site = SitePool.get_site(site_key)
+        contents_dict = {}
+
+        for i in range(0, len(revids_list), cls.MAX_REVISIONS_PER_REQUEST):
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "revids": "|".join(str(revid) for revid in revids_list[i:i + cls.MAX_REVISIONS_PER_REQUEST]),
+                "rvslots": "main",
+                "rvprop": "ids|content",
+                "format": "json"
+            }
+
+            # Results exceeding the max size of a response are continued in further requests until the batch is done
+            while True:
+                # Create and send request
+                data = RequestScheduler.submit(site, params)
+
+                # Extract request data (content is missing from revisions deleted or hidden)
+                for page in data.get("query", {}).get("pages", {}).values():
+                    for rev in page.get("revisions", []):
+                        contents_dict[rev["revid"]] = rev.get("slots", {}).get("main", {}).get("*")
+
+                if "continue" not in data:
+                    break
+                params.update(data["continue"])
+
+        return contents_dict
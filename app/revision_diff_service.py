@@ -0,0 +1,95 @@
+import difflib
+
+from typing import Iterable
+
+from app.info_containers.article_edit_war_info import ArticleEditWarInfo
+from app.revision_content_cache import RevisionContentCache
+from app.utils.db_utils import sqlite_connection, fetch_cached_revision_diffs, save_cached_revision_diffs, DB_PATH
+from app.utils.site_pool import SitePool
+from app.wiki_crawler import WikiCrawler
+
+
+class RevisionDiffService(object):
+    """
+    Service that returns the changes made by revisions (with respect to their previous revision), as lines of text
+    starting by "+" (added) or "-" (removed). Changes are stored in the local database, so no revision is compared
+    twice no matter the session (those that could not be retrieved are not stored, so they are requested again)
+    """
+
+    @classmethod
+    def get_diffs(cls, site: str, revids: Iterable[int], prev_revids_dict: dict[int, int] = None) -> dict[int, str]:
+        """
+        Function that returns the changes made by the revisions given, looking for them in database, computing them
+        locally if the texts of both revisions are in memory and requesting the remaining ones to Wikipedia
+        simultaneously
+
+        :param site: "family:code" string of the site of the revisions
+        :param revids:
+        :param prev_revids_dict: id of the revision previous to each one, if known (needed to compute changes locally)
+        :return: dict[int, str] --> revisions whose changes could not be retrieved are left out
+        """
+        revids_list = list(dict.fromkeys(revids))
+        prev_revids_dict = prev_revids_dict or {}
+
+        # 1º Changes stored in database
+        with sqlite_connection(DB_PATH) as conn:
+            diffs_dict = fetch_cached_revision_diffs(conn, site, revids_list)
+
+        # 2º Changes computed from the texts already kept in memory
+        missing_revids_list = [revid for revid in revids_list if revid not in diffs_dict]
+        contents_dict = RevisionContentCache.get_cached(site, missing_revids_list + [
+            prev_revids_dict[revid] for revid in missing_revids_list if revid in prev_revids_dict])
+
+        new_diffs_dict = {}
+        for revid in missing_revids_list:
+            prev_revid = prev_revids_dict.get(revid)
+
+            if contents_dict.get(revid) is not None and contents_dict.get(prev_revid) is not None:
+                new_diffs_dict[revid] = cls._compute_diff(contents_dict[prev_revid], contents_dict[revid])
+
+        # 3º Changes requested to Wikipedia (action=compare)
+        missing_revids_list = [revid for revid in missing_revids_list if revid not in new_diffs_dict]
+        if missing_revids_list:
+            new_diffs_dict |= WikiCrawler.get_revision_diffs(SitePool.get_site(site), missing_revids_list)
+
+        if new_diffs_dict:
+            with sqlite_connection(DB_PATH) as conn:
+                save_cached_revision_diffs(conn, site, new_diffs_dict)
+
+        return diffs_dict | new_diffs_dict
+
+
+    @classmethod
+    def get_revert_diffs(cls, info: ArticleEditWarInfo) -> dict[int, str]:
+        """
+        Function that returns the changes made by every revertant revision of an article
+
+        :param info:
+        :return: dict[int, str] --> changes by id of the revertant revision
+        """
+        revertant_revids = [revertant_rev.revid for _, revertant_rev, _ in info.reverts_list]
+
+        # Previous revision of each one, so changes can be computed locally when both texts are cached (histories
+        # kept out of memory only hold the revisions of reverts, so previous ones are found in the store)
+        if info.out_of_core:
+            prev_revids_dict = info.revision_store.get_previous_revids(revertant_revids) \
+                if info.revision_store is not None else {}
+        else:
+            prev_revids_dict = {local_rev.revid: prev_local_rev.revid
+                                for prev_local_rev, local_rev in zip(info.revs_list, info.revs_list[1:])}
+
+        return cls.get_diffs(info.article.site, revertant_revids, prev_revids_dict)
+
+
+    @staticmethod
+    def _compute_diff(prev_text: str, text: str) -> str:
+        # Same format as the changes extracted from action=compare responses (only added and removed lines)
+        lines_list = []
+        diff_lines = difflib.unified_diff(prev_text.splitlines(), text.splitlines(), lineterm="", n=0)
+
+        # First two lines are the headers of the files compared, and those starting by "@@" the location of changes
+        for line in list(diff_lines)[2:]:
+            if not line.startswith("@@") and line[1:].strip():
+                lines_list.append(f"{line[0]} {line[1:].strip()}")
+
+        return "\n".join(lines_list)
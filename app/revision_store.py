@@ -0,0 +1,419 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import uuid
+
+from datetime import datetime, timedelta, timezone
+from sqlite3 import Connection
+from typing import Iterable, Iterator
+
+from app.info_containers.local_revision import LocalRevision
+from app.utils.db_utils import fetch_revision_store_names
+from app.utils.helpers import datetime_to_iso, Singleton
+from app.utils.user_registry import UserRegistry
+
+
+class RevisionStore(object):
+    """
+    Out-of-core history page of an article, for histories too long to be kept in memory: revisions are appended to
+    a binary file of fixed-width rows (revid, epoch timestamp, user code and raw sha1) which is read through a memory
+    map, so it is streamed in windows with bounded memory. Usernames (a user code is the position of the username)
+    and the nº of edits of each user are kept in a small JSON file next to it, along with the period stored.
+    LocalRevision objects are only built for the rows that are displayed. Each store has a unique name, saved along
+    with the analysis period it belongs to, so stores are never shared between sessions
+    """
+    STORE_DIR = "revision_store"
+    ROWS_PER_WINDOW = 65536                 # Nº of rows unpacked at once while streaming
+
+    _ROW = struct.Struct("<qqI20s")         # revid, epoch timestamp, user code, sha1 (raw bytes)
+    _NO_SHA1 = bytes(20)                    # sha1 of revisions whose contents are hidden
+    __ISO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+    _path: str
+    _start_date: datetime
+    _end_date: datetime
+    _usernames_list: list[str]              # Username of each user code
+    _codes_dict: dict[str, int]             # User code of each username
+    _user_ids_list: list[int]               # Interned id of each user code
+    _edit_counts_list: list[int]            # Nº of edits of each user code
+    _n_rows: int
+
+    # Position of the rows materialised, so their neighbours can be found
+    _positions_by_revid_dict: dict[int, int]
+
+    def __init__(self, path: str, start_date: datetime, end_date: datetime, usernames_list: list[str] = None,
+                 edit_counts_list: list[int] = None):
+        self._path = path
+        self._start_date = start_date
+        self._end_date = end_date
+        self._usernames_list = usernames_list if usernames_list is not None else []
+        self._codes_dict = {username: code for code, username in enumerate(self._usernames_list)}
+        self._user_ids_list = [UserRegistry.intern(username) for username in self._usernames_list]
+        self._edit_counts_list = edit_counts_list if edit_counts_list is not None else [0] * len(self._usernames_list)
+        self._n_rows = os.path.getsize(path) // self._ROW.size if os.path.exists(path) else 0
+        self._positions_by_revid_dict = {}
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def __repr__(self) -> str:
+        return f"RevisionStore({self._path}, {self._n_rows} revisions)"
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.basename(self._path))[0]
+
+    @property
+    def start_date(self):
+        return self._start_date
+
+    @property
+    def end_date(self):
+        return self._end_date
+
+
+    @classmethod
+    def create(cls, site: str, pageid: int, start_date: datetime, end_date: datetime) -> 'RevisionStore':
+        """
+        Function that creates an empty store (with a new name) for the revisions of an article within a period
+
+        :param site: "family:code" string of the site of the article
+        :param pageid:
+        :param start_date:
+        :param end_date:
+        :return: RevisionStore
+        """
+        os.makedirs(cls.STORE_DIR, exist_ok=True)
+        path = cls.__store_path(f"{site.replace(':', '_')}_{pageid}_{uuid.uuid4().hex}")
+
+        open(path, "wb").close()
+        revision_store = cls(path, start_date, end_date)
+        revision_store.__save_users()
+
+        return revision_store
+
+
+    @classmethod
+    def open(cls, name: str, start_date: datetime, end_date: datetime) -> 'RevisionStore | None':
+        """
+        Function that opens a store, if it still exists and was stored for the same period
+
+        :param name: name of the store, saved along with the analysis period
+        :param start_date:
+        :param end_date:
+        :return: RevisionStore | None
+        """
+        path = cls.__store_path(name)
+
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as file:
+                users_info = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if (not os.path.exists(path) or users_info["start_date"] != datetime_to_iso(start_date)
+                or users_info["end_date"] != datetime_to_iso(end_date)):
+            return None
+
+        return cls(path, start_date, end_date, users_info["usernames"], users_info["edit_counts"])
+
+
+    @classmethod
+    def delete_unreferenced(cls, conn: Connection):
+        """
+        Function that deletes the stores that no analysis period references anymore, neither in database nor in the
+        articles loaded (e.g. those of deleted sessions, or of analyses replaced or never saved)
+
+        :param conn:
+        :return: None
+        """
+        if not os.path.isdir(cls.STORE_DIR):
+            return
+
+        referenced_names_set = fetch_revision_store_names(conn)
+        referenced_names_set.update(info.revision_store_name
+                                    for info in Singleton().articles_with_edit_war_info_dict.values())
+
+        for file_name in os.listdir(cls.STORE_DIR):
+            if file_name.removesuffix(".json").removesuffix(".bin") not in referenced_names_set:
+                os.remove(os.path.join(cls.STORE_DIR, file_name))
+
+
+    @classmethod
+    def __store_path(cls, name: str) -> str:
+        return os.path.join(cls.STORE_DIR, f"{name}.bin")
+
+
+    def __save_users(self):
+        users_info = {
+            "start_date": datetime_to_iso(self._start_date),
+            "end_date": datetime_to_iso(self._end_date),
+            "usernames": self._usernames_list,
+            "edit_counts": self._edit_counts_list
+        }
+
+        with open(self._path + ".json", "w", encoding="utf-8") as file:
+            json.dump(users_info, file)
+
+
+    def set_period(self, start_date: datetime, end_date: datetime):
+        """
+        Function that updates the period stored, once the revisions of the store have been adjusted to it
+
+        :param start_date:
+        :param end_date:
+        :return: None
+        """
+        self._start_date = start_date
+        self._end_date = end_date
+        self.__save_users()
+
+
+    def append(self, local_revs: Iterable[LocalRevision]) -> list[tuple[int, int, int, bytes]]:
+        """
+        Function that appends revisions (newer than the ones stored) at the end of the store
+
+        :param local_revs: revisions in chronological order
+        :return: list[tuple[int, int, int, bytes]] --> rows appended, as returned by iter_rows
+        """
+        buffer, rows_list = self.__pack(local_revs)
+
+        with open(self._path, "ab") as file:
+            file.write(buffer)
+
+        self._n_rows += len(rows_list)
+        self.__save_users()
+
+        return rows_list
+
+
+    def prepend(self, local_revs: Iterable[LocalRevision]):
+        """
+        Function that adds revisions (older than the ones stored) at the start of the store, rewriting its file with
+        the rows stored copied after the new ones
+
+        :param local_revs: revisions in chronological order
+        :return: None
+        """
+        buffer, rows_list = self.__pack(local_revs)
+        if not rows_list:
+            return
+
+        self.__rewrite(buffer, 0)
+
+        self._n_rows += len(rows_list)
+        self.__save_users()
+
+
+    def trim_until(self, date: datetime) -> int:
+        """
+        Function that removes the revisions published until the date given (included), rewriting the file with the
+        rows after them
+
+        :param date:
+        :return: int --> nº of revisions removed
+        """
+        n_rows = self.position_after(date)
+
+        if n_rows > 0:
+            self.__discount_edits(0, n_rows)
+            self.__rewrite(bytes(), n_rows)
+
+            self._n_rows -= n_rows
+            self.__save_users()
+
+        return n_rows
+
+
+    def trim_from(self, date: datetime) -> int:
+        """
+        Function that removes the revisions published from the date given (included)
+
+        :param date:
+        :return: int --> nº of revisions removed
+        """
+        # Revisions are stored with a precision of seconds, so those until the previous second are kept
+        n_rows = self._n_rows - self.position_after(date - timedelta(seconds=1))
+        self.truncate(self._n_rows - n_rows)
+
+        return n_rows
+
+
+    def __pack(self, local_revs: Iterable[LocalRevision]) -> tuple[bytearray, list[tuple[int, int, int, bytes]]]:
+        # Rows of the revisions given, registering their users
+        rows_list = []
+        buffer = bytearray()
+
+        for local_rev in local_revs:
+            code = self._codes_dict.get(local_rev.user)
+
+            if code is None:
+                code = len(self._usernames_list)
+                self._usernames_list.append(local_rev.user)
+                self._codes_dict[local_rev.user] = code
+                self._user_ids_list.append(UserRegistry.intern(local_rev.user))
+                self._edit_counts_list.append(0)
+
+            epoch = int(datetime.strptime(local_rev.timestamp, self.__ISO_DATE_FORMAT)
+                        .replace(tzinfo=timezone.utc).timestamp())
+            sha1 = bytes.fromhex(local_rev.sha1) if local_rev.sha1 else self._NO_SHA1
+
+            buffer += self._ROW.pack(local_rev.revid, epoch, code, sha1)
+            rows_list.append((local_rev.revid, epoch, self._user_ids_list[code], sha1))
+            self._edit_counts_list[code] += 1
+
+        return buffer, rows_list
+
+
+    def __rewrite(self, prefix: bytes, start: int):
+        # File is replaced by the prefix given followed by the rows stored from the position given (copied in
+        # windows), and the positions of the rows materialised are not valid anymore
+        new_path = self._path + ".tmp"
+
+        with open(self._path, "rb") as file, open(new_path, "wb") as new_file:
+            new_file.write(prefix)
+            file.seek(start * self._ROW.size)
+            shutil.copyfileobj(file, new_file, self.ROWS_PER_WINDOW * self._ROW.size)
+
+        os.replace(new_path, self._path)
+        self._positions_by_revid_dict.clear()
+
+
+    def __discount_edits(self, start: int, stop: int):
+        # Edits of the revisions between both positions are discounted from their users
+        with open(self._path, "rb") as file:
+            file.seek(start * self._ROW.size)
+            for _, _, code, _ in self._ROW.iter_unpack(file.read((stop - start) * self._ROW.size)):
+                self._edit_counts_list[code] -= 1
+
+
+    def truncate(self, n_rows: int):
+        """
+        Function that drops the revisions stored after the first n_rows (e.g. those appended after the last
+        checkpoint of an interrupted fetch), along with any incomplete row left by an interrupted append
+
+        :param n_rows:
+        :return: None
+        """
+        n_rows = min(n_rows, self._n_rows)
+
+        if n_rows < self._n_rows:
+            self.__discount_edits(n_rows, self._n_rows)
+
+            self._n_rows = n_rows
+            self.__save_users()
+
+        with open(self._path, "r+b") as file:
+            file.truncate(n_rows * self._ROW.size)
+
+
+    def iter_rows(self, start: int = 0, stop: int = None) -> Iterator[tuple[int, int, int, bytes]]:
+        """
+        Function that streams the rows between two positions, unpacking ROWS_PER_WINDOW rows at a time from the
+        memory map (the file is never read into memory as a whole)
+
+        :param start:
+        :param stop: end of the store if not given
+        :return: Iterator[tuple[int, int, int, bytes]] --> (revid, epoch timestamp, interned user id, sha1)
+        """
+        stop = self._n_rows if stop is None else min(stop, self._n_rows)
+        if start >= stop:
+            return
+
+        with open(self._path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            row_size = self._ROW.size
+
+            for window_start in range(start, stop, self.ROWS_PER_WINDOW):
+                window_stop = min(window_start + self.ROWS_PER_WINDOW, stop)
+
+                for revid, epoch, code, sha1 in self._ROW.iter_unpack(
+                        mapped_file[window_start * row_size:window_stop * row_size]):
+                    yield revid, epoch, self._user_ids_list[code], sha1
+
+
+    def position_after(self, date: datetime) -> int:
+        """
+        Function that returns the position of the first revision published after the date given (the nº of
+        revisions published until it), with a binary search over the timestamps of the memory map
+
+        :param date:
+        :return: int
+        """
+        if self._n_rows == 0:
+            return 0
+
+        # Revisions are stored with a precision of seconds
+        epoch_limit = int(datetime.strptime(datetime_to_iso(date), self.__ISO_DATE_FORMAT)
+                          .replace(tzinfo=timezone.utc).timestamp())
+        low, high = 0, self._n_rows
+
+        with open(self._path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            while low < high:
+                middle = (low + high) // 2
+                _, epoch, _, _ = self._ROW.unpack_from(mapped_file, middle * self._ROW.size)
+
+                if epoch <= epoch_limit:
+                    low = middle + 1
+                else:
+                    high = middle
+
+        return low
+
+
+    def get_revisions(self, positions: Iterable[int]) -> dict[int, LocalRevision]:
+        """
+        Function that builds the revisions of the positions given (only the fields stored are filled, the rest can
+        be backfilled as with any revision analysed)
+
+        :param positions:
+        :return: dict[int, LocalRevision] --> revision by position
+        """
+        local_revs_dict: dict[int, LocalRevision] = {}
+
+        positions_list = sorted(set(positions))
+        if not positions_list:
+            return local_revs_dict
+
+        with open(self._path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            for position in positions_list:
+                revid, epoch, code, sha1 = self._ROW.unpack_from(mapped_file, position * self._ROW.size)
+                timestamp = datetime.fromtimestamp(epoch, timezone.utc).strftime(self.__ISO_DATE_FORMAT)
+
+                local_revs_dict[position] = LocalRevision(revid, timestamp, self._usernames_list[code], None, None,
+                                                          None, None, sha1.hex() if sha1 != self._NO_SHA1 else None)
+                self._positions_by_revid_dict[revid] = position
+
+        return local_revs_dict
+
+
+    def get_previous_revids(self, revids: Iterable[int]) -> dict[int, int]:
+        """
+        Function that returns the id of the revision previous to each one of the revisions given (they must have been
+        built by the store)
+
+        :param revids:
+        :return: dict[int, int]
+        """
+        prev_positions_dict = {revid: self._positions_by_revid_dict[revid] - 1 for revid in revids
+                               if self._positions_by_revid_dict.get(revid, 0) > 0}
+        prev_local_revs_dict = self.get_revisions(prev_positions_dict.values())
+
+        return {revid: prev_local_revs_dict[position].revid for revid, position in prev_positions_dict.items()}
+
+
+    def count_user_edits(self, user: str) -> int:
+        code = self._codes_dict.get(user)
+
+        return self._edit_counts_list[code] if code is not None else 0
+
+
+    def delete(self):
+        for path in (self._path, self._path + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,10 +1,11 @@
+import json
 import os
 import re
 import sqlite3
-import sys
+import zlib
 
 from contextlib import contextmanager
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from sqlite3 import Connection
 from typing import Any, Tuple
 
@@ -12,7 +13,15 @@ from app.info_containers.article_edit_war_info import ArticleEditWarInfo
 from app.info_containers.local_page import LocalPage
 from app.info_containers.local_revision import LocalRevision
 from app.info_containers.local_user import LocalUser
-from app.utils.helpers import print_delim_line, clear_terminal, clear_n_lines, datetime_to_iso, ask_yes_or_no_question
+from app.utils.helpers import (print_delim_line, clear_terminal, clear_n_lines, datetime_to_iso,
+                               ask_yes_or_no_question, is_interactive_terminal)
+
+DB_PATH: str = "conflict_watcher.db"
+
+# Revisions of each article are saved packed in compressed chunks (revisions' table then only holds those of reverts,
+# the rest of rows are derived from the chunks when ad-hoc queries are made)
+PACK_REVISIONS: bool = True
+REVISIONS_PER_CHUNK: int = 1000
 
 CREATE_TABLE_SQL_DICT: dict[str, str] = {
     "sessions" : """CREATE TABLE IF NOT EXISTS sessions (
@@ -69,12 +78,34 @@ CREATE_TABLE_SQL_DICT: dict[str, str] = {
                             FOREIGN KEY (user) REFERENCES users(id)
                      );
     """,
+    "revision_chunks" : """CREATE TABLE IF NOT EXISTS revision_chunks (
+                                  article INTEGER NOT NULL,
+                                  chunk INTEGER NOT NULL,
+                                  first_revid INTEGER NOT NULL,
+                                  last_revid INTEGER NOT NULL,
+                                  first_timestamp TEXT NOT NULL,
+                                  last_timestamp TEXT NOT NULL,
+                                  n_revisions INTEGER NOT NULL,
+                                  revisions BLOB NOT NULL,
+                                  PRIMARY KEY (article, chunk),
+                                  FOREIGN KEY (article) REFERENCES articles(id) ON DELETE CASCADE
+                           ); 
+    """,
+    "revision_chunk_users" : """CREATE TABLE IF NOT EXISTS revision_chunk_users (
+                                       article INTEGER NOT NULL,
+                                       user INTEGER NOT NULL,
+                                       PRIMARY KEY (article, user),
+                                       FOREIGN KEY (article) REFERENCES articles(id) ON DELETE CASCADE,
+                                       FOREIGN KEY (user) REFERENCES users(id)
+                                ); 
+    """,
     "edit_war_analysis_periods" : """CREATE TABLE IF NOT EXISTS edit_war_analysis_periods (
                                           id INTEGER PRIMARY KEY AUTOINCREMENT,
                                           article INTEGER NOT NULL,
                                           start_date TEXT NOT NULL,
                                           end_date TEXT NOT NULL,
                                           edit_war_notified INTEGER,
+                                          revision_store TEXT,
                                           FOREIGN KEY (article) REFERENCES articles(id) ON DELETE CASCADE
                                     ); 
     """,
@@ -122,6 +153,98 @@ CREATE_TABLE_SQL_DICT: dict[str, str] = {
                                        FOREIGN KEY (period) REFERENCES edit_war_analysis_periods(id) ON DELETE CASCADE
                                        ); 
     """,
+    "edit_war_score_components" : """CREATE TABLE IF NOT EXISTS edit_war_score_components (
+                                            period INTEGER PRIMARY KEY,
+                                            n_mutual_reverters INTEGER NOT NULL,
+                                            n_mutual_reverts INTEGER NOT NULL,
+                                            nr_sum INTEGER NOT NULL,
+                                            max_nr INTEGER NOT NULL,
+                                            FOREIGN KEY (period) REFERENCES edit_war_analysis_periods(id) ON DELETE CASCADE
+                                     ); 
+    """,
+    "mutual_reverter_pairs" : """CREATE TABLE IF NOT EXISTS mutual_reverter_pairs (
+                                        period INTEGER,
+                                        user_1 INTEGER,
+                                        user_2 INTEGER,
+                                        n_mutual_reverts INTEGER NOT NULL,
+                                        nr_value INTEGER NOT NULL,
+                                        PRIMARY KEY (period, user_1, user_2),
+                                        FOREIGN KEY (period) REFERENCES edit_war_analysis_periods(id) ON DELETE CASCADE,
+                                        FOREIGN KEY (user_1) REFERENCES users(id) ON DELETE CASCADE,
+                                        FOREIGN KEY (user_2) REFERENCES users(id) ON DELETE CASCADE
+                                 ); 
+    """,
+    "search_cache" : """CREATE TABLE IF NOT EXISTS search_cache (
+                               id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               language TEXT NOT NULL,
+                               search_type INTEGER NOT NULL,
+                               query TEXT NOT NULL,
+                               search_limit INTEGER NOT NULL,
+                               fetched TEXT NOT NULL,
+                               last_used TEXT NOT NULL,
+                               complete INTEGER NOT NULL,
+                               results TEXT NOT NULL,
+                               UNIQUE (language, search_type, query, search_limit)
+                        ); 
+    """,
+    "rdap_cache" : """CREATE TABLE IF NOT EXISTS rdap_cache (
+                             cidr TEXT PRIMARY KEY,
+                             ip_version INTEGER NOT NULL,
+                             start_address TEXT NOT NULL,
+                             end_address TEXT NOT NULL,
+                             fetched TEXT NOT NULL,
+                             result TEXT NOT NULL
+                      ); 
+    """,
+    "bot_users_cache" : """CREATE TABLE IF NOT EXISTS bot_users_cache (
+                                  site TEXT PRIMARY KEY,
+                                  fetched TEXT NOT NULL,
+                                  usernames TEXT NOT NULL
+                           ); 
+    """,
+    "revision_contents_cache" : """CREATE TABLE IF NOT EXISTS revision_contents_cache (
+                                          site TEXT NOT NULL,
+                                          revid INTEGER NOT NULL,
+                                          content TEXT,
+                                          n_bytes INTEGER NOT NULL,
+                                          last_used TEXT NOT NULL,
+                                          PRIMARY KEY (site, revid)
+                                   ); 
+    """,
+    "revision_diffs_cache" : """CREATE TABLE IF NOT EXISTS revision_diffs_cache (
+                                       site TEXT NOT NULL,
+                                       revid INTEGER NOT NULL,
+                                       diff TEXT NOT NULL,
+                                       PRIMARY KEY (site, revid)
+                                ); 
+    """,
+    "analysis_results_cache" : """CREATE TABLE IF NOT EXISTS analysis_results_cache (
+                                         fingerprint TEXT PRIMARY KEY,
+                                         result TEXT NOT NULL,
+                                         last_used TEXT NOT NULL
+                                  ); 
+    """,
+    "history_fetch_checkpoints" : """CREATE TABLE IF NOT EXISTS history_fetch_checkpoints (
+                                            site TEXT NOT NULL,
+                                            title TEXT NOT NULL,
+                                            start_date TEXT NOT NULL,
+                                            end_date TEXT NOT NULL,
+                                            rvprop TEXT NOT NULL,
+                                            rvcontinue TEXT NOT NULL,
+                                            n_revisions INTEGER NOT NULL,
+                                            revision_store TEXT NOT NULL,
+                                            updated TEXT NOT NULL,
+                                            PRIMARY KEY (site, title, start_date, rvprop)
+                                     ); 
+    """,
+    "monitoring_runs" : """CREATE TABLE IF NOT EXISTS monitoring_runs (
+                                  session INTEGER PRIMARY KEY,
+                                  end_date TEXT NOT NULL,
+                                  processed_pageids TEXT NOT NULL,
+                                  edit_wars_to_notify INTEGER NOT NULL,
+                                  FOREIGN KEY (session) REFERENCES sessions(id) ON DELETE CASCADE
+                           ); 
+    """,
 }
 
 DELETE_SEQUENCES: str = "DELETE FROM sqlite_sequence WHERE name = (?);"
@@ -142,22 +265,36 @@ def sqlite_connection(db: str, uri: bool = False):
 
 
 def init_db(conn: Connection):
-    clear_terminal()
-    print_delim_line("#")
-    print("Mounting database...\n")
+    # Terminal UI is only shown if a terminal is being used (automatic executions do not need it)
+    show_info = is_interactive_terminal()
+
+    if show_info:
+        clear_terminal()
+        print_delim_line("#")
+        print("Mounting database...\n")
 
     # Activate foreign keys as they are disabled by default
     conn.execute("PRAGMA foreign_keys = ON")
 
     # Iterate over dict executing sentences to create db tables
     for table, sql_statement in CREATE_TABLE_SQL_DICT.items():
-        create_table_if_not_exists(conn, table, sql_statement)
+        create_table_if_not_exists(conn, table, sql_statement, show_info)
+
+    # Add columns introduced after the tables of databases already created
+    add_column_if_not_exists(conn, "edit_war_analysis_periods", "revision_store", "TEXT", show_info)
+
+    # Remove tables no longer used from databases already created
+    for table in ("history_fetch_pages", "history_fetch_journal", "session_snapshots"):
+        drop_table_if_exists(conn, table, show_info)
 
     # Create and index over user reference, since no cascade deletion occurs in user
     conn.execute("CREATE INDEX IF NOT EXISTS revision_user_idx ON revisions(user);")
 
+    # Create an index over network ranges to find cached RDAP results of any address within them
+    conn.execute("CREATE INDEX IF NOT EXISTS rdap_cache_range_idx ON rdap_cache(ip_version, start_address);")
+
     # Only use input if a terminal is being used (automatic execution does not and could get blocked)
-    if sys.stdin.isatty():
+    if show_info:
         input("\nDatabase mounted, press Enter to continue ")
 
 
@@ -210,6 +347,49 @@ def create_table_if_not_exists(conn: Connection, table: str, create_table_sql_st
         cursor.close()
 
 
+def drop_table_if_exists(conn: Connection, table: str, show_info: bool = True):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Check if table exists and inform of the action depending on show_info value
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (table,))
+
+        if cursor.fetchone():
+            if show_info:
+                print(f"\t==> Table '{table}' no longer used, deleting it...")
+            cursor.execute(f"DROP TABLE {table};")
+
+            # Commit changes
+            conn.commit()
+
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def add_column_if_not_exists(conn: Connection, table: str, column: str, column_definition: str,
+                             show_info: bool = True):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Check if column exists and inform of the action depending on show_info value
+        cursor.execute(f"PRAGMA table_info({table});")
+
+        if column not in (column_info[1] for column_info in cursor.fetchall()):
+            if show_info:
+                print(f"\t==> Column '{column}' of table '{table}' not found, creating it...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_definition};")
+
+            # Commit changes
+            conn.commit()
+
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
 def add_to_db_table(conn: Connection, table: str, column_names: str, item: tuple) -> int | None:
     # Create cursor to the db using the provided connection
     cursor = conn.cursor()
@@ -586,7 +766,7 @@ def is_safe_select(query: str) -> bool:
 
 def delete_non_referenced_users(conn: Connection):
     """
-    Function to delete users that are not referenced by any revision after deletions
+    Function to delete users that are not referenced by any revision (neither by the ones packed) after deletions
 
     :param conn:
     :return: None
@@ -597,6 +777,10 @@ def delete_non_referenced_users(conn: Connection):
                             SELECT 1
                             FROM revisions
                             WHERE revisions.user = users.id
+                        ) AND NOT EXISTS (
+                            SELECT 1
+                            FROM revision_chunk_users
+                            WHERE revision_chunk_users.user = users.id
                         );
             """
 
@@ -631,7 +815,8 @@ def create_temp_session_db(orig_db_conn: Connection, temp_db_conn, session: list
     try:
         # Database tables list
         tables = ("sessions", "articles", "edit_war_analysis_periods", "edit_war_values", "revisions", "reverts",
-                  "mutual_reverts", "users", "reverted_user_pairs", "mutual_reverters_activities")
+                  "mutual_reverts", "users", "reverted_user_pairs", "mutual_reverters_activities",
+                  "edit_war_score_components", "mutual_reverter_pairs")
 
         # Create tables in temporal database from original schema
         orig_db_cursor.execute(f'SELECT sql FROM sqlite_master WHERE type=? AND name IN {tables}',
@@ -692,6 +877,16 @@ def create_temp_session_db(orig_db_conn: Connection, temp_db_conn, session: list
                 for value in values:
                     add_to_db_table(temp_db_conn, "edit_war_values", column_names, tuple(value))
 
+            # Edit_war_score_components and mutual_reverter_pairs tables
+            for table in ("edit_war_score_components", "mutual_reverter_pairs"):
+                query = f'SELECT * FROM {table} WHERE period IN ({placeholders})'
+                orig_db_cursor.execute(query, periods_ids)
+
+                column_names = ','.join(str(column[0]) for column in orig_db_cursor.description
+                                        if column[0] is not None)
+                for row in orig_db_cursor.fetchall():
+                    add_to_db_table(temp_db_conn, table, column_names, tuple(row))
+
         # 5º Revisions table
         placeholders = ','.join('?' for _ in articles_ids)
         query = f'SELECT * FROM revisions WHERE article IN ({placeholders})'
@@ -700,13 +895,23 @@ def create_temp_session_db(orig_db_conn: Connection, temp_db_conn, session: list
         column_names = ','.join(str(column[0]) for column in orig_db_cursor.description if column[0] is not None)
         revs = orig_db_cursor.fetchall()
 
-        if revs:
+        # Revisions packed in chunks (all but those of reverts) are unpacked, so they can be queried as the rest
+        saved_revs_set = {(rev[1], rev[2]) for rev in revs}
+        packed_revs = [(revid, article_id, *row)
+                       for article_id, rows_list in fetch_revision_chunks(orig_db_conn, articles_ids).items()
+                       for revid, *row in rows_list if (revid, article_id) not in saved_revs_set]
+
+        if revs or packed_revs:
             revs_ids = [row[0] for row in revs]
-            users_ids = [row[4] for row in revs]
+            users_ids = [row[4] for row in revs] + [row[3] for row in packed_revs]
 
             for rev in revs:
                 add_to_db_table(temp_db_conn, "revisions", column_names, tuple(rev))
 
+            temp_db_cursor.executemany("INSERT INTO revisions (revid, article, timestamp, user, text, size, tags, "
+                                       "comment, sha1) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);", packed_revs)
+            temp_db_conn.commit()
+
             # 6º Reverts table
             placeholders = ','.join('?' for _ in revs_ids)
             query = f'SELECT * FROM reverts WHERE revertant_rev IN ({placeholders})'
@@ -849,13 +1054,14 @@ def save_period_data(conn: Connection, articles_ids_dict: dict[int, int], articl
     start_date_str = datetime_to_iso(info.start_date)
     end_date_str = datetime_to_iso(info.end_date)
     edit_war_notified = info.edit_war_notified
+    revision_store = info.revision_store_name
 
-    column_names = "article, start_date, end_date, edit_war_notified"
+    column_names = "article, start_date, end_date, edit_war_notified, revision_store"
     where_clause = "article=? AND end_date=?"
     where_values = [article_id, end_date_str]
-    set_clause = "article=?, start_date=?, end_date=?, edit_war_notified=?"
-    set_values = [article_id, start_date_str, end_date_str, edit_war_notified]
-    item = (article_id, start_date_str, end_date_str, edit_war_notified)
+    set_clause = "article=?, start_date=?, end_date=?, edit_war_notified=?, revision_store=?"
+    set_values = [article_id, start_date_str, end_date_str, edit_war_notified, revision_store]
+    item = (article_id, start_date_str, end_date_str, edit_war_notified, revision_store)
 
     period_id = add_or_update_if_exists(conn, "edit_war_analysis_periods", column_names, where_clause, where_values,
                                         set_clause, set_values, item)
@@ -906,7 +1112,7 @@ def save_revision_data(conn: Connection, local_rev: LocalRevision, users_ids_dic
                        article_id: int) -> int:
     user_id = users_ids_dict[local_rev.user] if local_rev.user else None
     revid = local_rev.revid
-    tags_str = ", ".join(local_rev.tags)
+    tags_str = ", ".join(local_rev.tags) if isinstance(local_rev.tags, list) else local_rev.tags
 
     column_names = "revid, article, timestamp, user, text, size, tags, comment, sha1"
     where_clause = "revid=? AND article=?"
@@ -923,6 +1129,106 @@ def save_revision_data(conn: Connection, local_rev: LocalRevision, users_ids_dic
     return rev_id
 
 
+def save_revision_chunks(conn: Connection, article_id: int, revs_list: list[LocalRevision],
+                         users_ids_dict: dict[str, int]):
+    """
+    Function to save the revisions of an article packed in compressed chunks of REVISIONS_PER_CHUNK revisions (rows
+    with the same columns as revisions' table), along with the range of revids and timestamps of each chunk, all in a
+    single transaction that replaces the chunks previously saved. Users of the revisions packed are saved too, as
+    they are not referenced from revisions' table
+
+    :param conn:
+    :param article_id:
+    :param revs_list: revisions in chronological order
+    :param users_ids_dict: ids of the saved users, by username
+    :return: None
+    """
+    chunks_list = []
+    users_ids_set = set()
+
+    for chunk, start in enumerate(range(0, len(revs_list), REVISIONS_PER_CHUNK)):
+        chunk_revs_list = revs_list[start:start + REVISIONS_PER_CHUNK]
+        rows_list = [(local_rev.revid, local_rev.timestamp, users_ids_dict[local_rev.user] if local_rev.user else None,
+                      local_rev.text, local_rev.size,
+                      ", ".join(local_rev.tags) if isinstance(local_rev.tags, list) else local_rev.tags,
+                      local_rev.comment, local_rev.sha1) for local_rev in chunk_revs_list]
+        users_ids_set.update(row[2] for row in rows_list if row[2] is not None)
+
+        chunks_list.append((article_id, chunk, chunk_revs_list[0].revid, chunk_revs_list[-1].revid,
+                            chunk_revs_list[0].timestamp, chunk_revs_list[-1].timestamp, len(rows_list),
+                            zlib.compress(json.dumps(rows_list).encode())))
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM revision_chunks WHERE article = ?;", (article_id,))
+        cursor.executemany("INSERT INTO revision_chunks (article, chunk, first_revid, last_revid, first_timestamp, "
+                           "last_timestamp, n_revisions, revisions) VALUES (?, ?, ?, ?, ?, ?, ?, ?);", chunks_list)
+
+        cursor.execute("DELETE FROM revision_chunk_users WHERE article = ?;", (article_id,))
+        cursor.executemany("INSERT INTO revision_chunk_users (article, user) VALUES (?, ?);",
+                           [(article_id, user_id) for user_id in users_ids_set])
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def fetch_revision_chunks(conn: Connection, articles_ids: list[int], start_date: datetime = None,
+                          end_date: datetime = None) -> dict[int, list[tuple]]:
+    """
+    Function to retrieve the revisions packed of some articles, reading only the chunks overlapping the dates given
+
+    :param conn:
+    :param articles_ids:
+    :param start_date:
+    :param end_date:
+    :return: dict[int, list[tuple]] --> rows (revid, timestamp, user, text, size, tags, comment, sha1) in
+    chronological order by article id
+    """
+    rows_by_article_dict: dict[int, list[tuple]] = {}
+    if not articles_ids:
+        return rows_by_article_dict
+
+    placeholders = ", ".join(["?"] * len(articles_ids))
+    where_values = list(articles_ids)
+    where_clause = f"article IN ({placeholders})"
+
+    if start_date is not None:
+        where_clause += " AND last_timestamp >= ?"
+        where_values.append(datetime_to_iso(start_date))
+    if end_date is not None:
+        where_clause += " AND first_timestamp <= ?"
+        where_values.append(datetime_to_iso(end_date))
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f"SELECT article, revisions FROM revision_chunks WHERE {where_clause} ORDER BY article, chunk;",
+                       where_values)
+
+        for article_id, revisions in cursor.fetchall():
+            rows_by_article_dict.setdefault(article_id, []).extend(
+                tuple(row) for row in json.loads(zlib.decompress(revisions)))
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    # Chunks at the edges may hold revisions out of the dates given
+    if start_date is not None or end_date is not None:
+        start_str = datetime_to_iso(start_date) if start_date is not None else ""
+        end_str = datetime_to_iso(end_date) if end_date is not None else "~"
+
+        for article_id, rows_list in rows_by_article_dict.items():
+            rows_by_article_dict[article_id] = [row for row in rows_list if start_str <= row[1] <= end_str]
+
+    return rows_by_article_dict
+
+
 def save_revert_data(conn: Connection, revertant_rev_id: int, reverted_rev_id: int) -> int:
     revertant_rev_id_str = str(revertant_rev_id)
     reverted_rev_id_str = str(reverted_rev_id)
@@ -996,3 +1302,724 @@ def save_mutual_reverters_activity(conn: Connection, user_id: int, period_id: in
 
     return mutual_reverters_activity_id
 
+
+def save_edit_war_score_components(conn: Connection, period_id: int, users_ids_dict: dict[str, int],
+                                   mutual_reverter_pairs_dict: dict[tuple[str, str], tuple[int, int]]):
+    """
+    Function to save the raw components of the edit war value of a period (those of its final value), so it can be
+    re-scored with other thresholds or formulas without analysing the article again
+
+    :param conn:
+    :param period_id:
+    :param users_ids_dict: ids of the saved users, by username
+    :param mutual_reverter_pairs_dict: (nº of mutual reverts, Nr value) of each pair of mutual reverters
+    :return: None
+    """
+    mutual_reverters_set = {username for pair in mutual_reverter_pairs_dict for username in pair}
+    n_mutual_reverts = sum(n_pair_reverts for n_pair_reverts, _ in mutual_reverter_pairs_dict.values())
+    nr_sum = sum(n_pair_reverts * nr_value for n_pair_reverts, nr_value in mutual_reverter_pairs_dict.values())
+    max_nr = max((nr_value for _, nr_value in mutual_reverter_pairs_dict.values()), default=0)
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Pairs of a previous analysis of the period are replaced, as some of them may not be mutual reverters anymore
+        cursor.execute("DELETE FROM mutual_reverter_pairs WHERE period = ?;", (period_id,))
+        cursor.execute("INSERT OR REPLACE INTO edit_war_score_components (period, n_mutual_reverters, "
+                       "n_mutual_reverts, nr_sum, max_nr) VALUES (?, ?, ?, ?, ?);",
+                       (period_id, len(mutual_reverters_set), n_mutual_reverts, nr_sum, max_nr))
+        cursor.executemany("INSERT INTO mutual_reverter_pairs (period, user_1, user_2, n_mutual_reverts, nr_value) "
+                           "VALUES (?, ?, ?, ?, ?);",
+                           [(period_id, users_ids_dict[user_1] if user_1 else None,
+                             users_ids_dict[user_2] if user_2 else None, n_pair_reverts, nr_value)
+                            for (user_1, user_2), (n_pair_reverts, nr_value) in mutual_reverter_pairs_dict.items()])
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def fetch_rescored_edit_war_values(conn: Connection, drop_max_nr: bool = True, session_id: str = None) -> list:
+    """
+    Function to re-score the edit war values stored from their raw components in a single query (periods analysed
+    before components were stored are skipped)
+
+    :param conn:
+    :param drop_max_nr: if the greatest Nr value is dropped from the sum, as the original formula does
+    :param session_id: only periods of this session if given
+    :return: list --> (session name, article title, period start date, period end date, stored value, new value)
+    rows, ordered by new value (descending)
+    """
+    nr_sum_expr = "(c.nr_sum - c.max_nr)" if drop_max_nr else "c.nr_sum"
+
+    query = f"""SELECT s.name, a.title, p.start_date, p.end_date, v.value,
+                       MAX(c.n_mutual_reverters - 1, 0) * {nr_sum_expr} AS new_value
+                FROM edit_war_score_components c
+                JOIN edit_war_analysis_periods p ON p.id = c.period
+                JOIN articles a ON a.id = p.article
+                JOIN sessions s ON s.id = a.session
+                LEFT JOIN edit_war_values v ON v.period = p.id AND v.date = p.end_date
+                WHERE ? IS NULL OR s.id = ?
+                ORDER BY new_value DESC;"""
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(query, (session_id, session_id))
+
+        return cursor.fetchall()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def save_article_edit_war_data(conn: Connection, articles_ids_dict: dict[int, int], article: LocalPage,
+                               info: ArticleEditWarInfo, users_info_dict: dict[str, LocalUser]) -> int:
+    """
+    Function to save all the edit war info of an analysed article (its article entry must be already saved)
+
+    :param conn:
+    :param articles_ids_dict: ids of the saved articles, by pageid
+    :param article:
+    :param info:
+    :param users_info_dict:
+    :return: int --> id of the period saved
+    """
+    article_id = articles_ids_dict[article.pageid]
+
+    # 1º Save period's info on edit_war_analysis_periods' table
+    period_id = save_period_data(conn, articles_ids_dict, article, info)
+
+    # 2º Save edit war over time values on edit_war_values' table
+    for (value, date) in info.edit_war_over_time_list:
+        save_edit_war_value(conn, period_id, date, value)
+
+    # 3º Save users info on users' table
+    users_ids_dict: dict[str, int] = dict[str, int]()
+
+    for username, user_info in users_info_dict.items():
+        users_ids_dict[username] = save_user_data(conn, username, user_info)
+
+    # 4º Save revisions and missing users info on their tables simultaneously
+    revs_ids_dict: dict[int, int] = dict[int, int]()
+
+    for i, local_rev in enumerate(info.revs_list):
+        username = local_rev.user
+
+        # If the user is not stored, we create a new entry only with the username and save the id in the dict.
+        # (users_ids_dict is checked too, in order to not overwrite info stored in previous step and avoid
+        # unnecessary iterations)
+        if username and users_ids_dict.get(username) is None:
+            users_ids_dict[username] = save_user_data(conn, username, LocalUser(username))
+
+        # Save revisions info on revisions' table (if packed, only those of reverts, as they are referenced by them)
+        if not PACK_REVISIONS:
+            rev_id = save_revision_data(conn, local_rev, users_ids_dict, article_id)
+            revs_ids_dict[local_rev.revid] = rev_id
+
+    if PACK_REVISIONS:
+        save_revision_chunks(conn, article_id, info.revs_list, users_ids_dict)
+
+        for revert in info.reverts_list:
+            for local_rev in revert[:2]:
+                if local_rev.revid not in revs_ids_dict:
+                    revs_ids_dict[local_rev.revid] = save_revision_data(conn, local_rev, users_ids_dict, article_id)
+
+    # 5º Save reverts on reverts' table and its M:M relation with users (reverted_users) on
+    # reverted_user_pairs' table
+    for revertant_rev, reverted_rev, reverted_users_set in info.reverts_list:
+        # Save reverts info on reverts' table
+        revertant_rev_id = revs_ids_dict[revertant_rev.revid]
+        reverted_rev_id = revs_ids_dict[reverted_rev.revid]
+
+        save_revert_data(conn, revertant_rev_id, reverted_rev_id)
+
+        # Save reverted_user_pairs info on reverted_user_pairs' table
+        for username in reverted_users_set:
+           if username and users_ids_dict.get(username) is None:
+               users_ids_dict[username] = save_user_data(conn, username, LocalUser(username))
+
+           user_id = users_ids_dict[username]
+           save_reverted_user_pair_data(conn, revertant_rev_id, reverted_rev_id, user_id)
+
+    # 6º Save mutual reverts on mutual_reverts' table
+    for revert_1, revert_2 in info.mutual_reverts_list:
+        save_mutual_revert_data(conn, revs_ids_dict, revert_1, revert_2)
+
+    # 7º Save nº of mutual reverts of every user on this period for the analysed article on
+    # mutual_reverters_activities' table
+    for username, n_mutual_reverts in info.mutual_reverters_dict.items():
+        if username:
+            user_id = users_ids_dict[username]
+            save_mutual_reverters_activity(conn, user_id, period_id, n_mutual_reverts)
+
+    # 8º Save raw components of the edit war value on edit_war_score_components' and mutual_reverter_pairs' tables
+    # (those already stored are kept if the history page was kept out of memory and its store no longer exists, as
+    # the nº of edits of each user can not be counted)
+    if info.revision_store_name is None or info.revision_store is not None:
+        save_edit_war_score_components(conn, period_id, users_ids_dict, info.count_mutual_reverter_pairs())
+
+    return period_id
+
+
+def fetch_revision_store_names(conn: Connection) -> set[str]:
+    """
+    Function to retrieve the names of the stores of the histories kept out of memory of every period stored, and of
+    those being fetched when they were interrupted
+
+    :param conn:
+    :return: set[str]
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT revision_store FROM edit_war_analysis_periods WHERE revision_store IS NOT NULL "
+                       "UNION SELECT revision_store FROM history_fetch_checkpoints;")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def delete_other_periods(conn: Connection, article_id: int, period_id: int):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Foreign keys must be active for the period's values and activities to be deleted along with it
+        cursor.execute("PRAGMA foreign_keys = ON;")
+        cursor.execute("DELETE FROM edit_war_analysis_periods WHERE article = ? AND id != ?;", (article_id, period_id))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to resume interrupted monitoring runs """
+
+def fetch_monitoring_run(conn: Connection, session_id: str) -> tuple[datetime, set[int], int] | None:
+    """
+    Function to retrieve the progress of an unfinished monitoring run of a session
+
+    :param conn:
+    :param session_id:
+    :return: (datetime, set[int], int) | None --> (end date of the run, pageids of the articles already processed,
+    nº of edit wars detected and not notified yet)
+    """
+    monitoring_run = None
+
+    stored = fetch_items_from_db(conn, "monitoring_runs", where_clause="session=?", where_values=[session_id])
+
+    if stored:
+        _, _, end_date, processed_pageids, edit_wars_to_notify = stored[0]
+        monitoring_run = (datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%SZ"), set(json.loads(processed_pageids)),
+                          edit_wars_to_notify)
+
+    return monitoring_run
+
+
+def save_monitoring_run(conn: Connection, session_id: str, end_date: datetime, processed_pageids: set[int],
+                        edit_wars_to_notify: int):
+    end_date_str = datetime_to_iso(end_date)
+    processed_pageids_str = json.dumps(sorted(processed_pageids))
+
+    column_names = "session, end_date, processed_pageids, edit_wars_to_notify"
+    where_clause = "session=?"
+    where_values = [session_id]
+    set_clause = "end_date=?, processed_pageids=?, edit_wars_to_notify=?"
+    set_values = [end_date_str, processed_pageids_str, edit_wars_to_notify]
+    item = (session_id, end_date_str, processed_pageids_str, edit_wars_to_notify)
+
+    add_or_update_if_exists(conn, "monitoring_runs", column_names, where_clause, where_values, set_clause,
+                            set_values, item)
+
+
+def delete_monitoring_run(conn: Connection, session_id: str):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM monitoring_runs WHERE session = ?;", (session_id,))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to cache search results (shared by all sessions) """
+
+def fetch_cached_search(conn: Connection, language: str, search_type: int, query: str, search_limit: int) \
+        -> tuple[datetime, bool, list[dict]] | None:
+    """
+    Function to retrieve the results cached for a search, marking them as recently used
+
+    :param conn:
+    :param language:
+    :param search_type:
+    :param query:
+    :param search_limit: 0 for searches without limit
+    :return: (datetime, bool, list[dict]) | None --> (date of the fetch, if all results were fetched, pages info)
+    """
+    cached_search = None
+
+    where_clause = "language=? AND search_type=? AND query=? AND search_limit=?"
+    stored = fetch_items_from_db(conn, "search_cache", where_clause=where_clause,
+                                 where_values=[language, search_type, query, search_limit])
+
+    if stored:
+        rowid, _, _, _, _, _, fetched, _, complete, results = stored[0]
+        update_db_table(conn, "search_cache", "last_used=?", [datetime_to_iso(datetime.now(timezone.utc))], rowid)
+
+        cached_search = (datetime.strptime(fetched, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc),
+                         bool(complete), json.loads(results))
+
+    return cached_search
+
+
+def save_cached_search(conn: Connection, language: str, search_type: int, query: str, search_limit: int,
+                       fetched: datetime, complete: bool, pages_info_list: list[dict]) -> int:
+    fetched_str = datetime_to_iso(fetched)
+    last_used_str = datetime_to_iso(datetime.now(timezone.utc))
+    results_str = json.dumps(pages_info_list)
+
+    column_names = "language, search_type, query, search_limit, fetched, last_used, complete, results"
+    where_clause = "language=? AND search_type=? AND query=? AND search_limit=?"
+    where_values = [language, search_type, query, search_limit]
+    set_clause = "fetched=?, last_used=?, complete=?, results=?"
+    set_values = [fetched_str, last_used_str, int(complete), results_str]
+    item = (language, search_type, query, search_limit, fetched_str, last_used_str, int(complete), results_str)
+
+    cached_search_id = add_or_update_if_exists(conn, "search_cache", column_names, where_clause, where_values,
+                                               set_clause, set_values, item)
+
+    return cached_search_id
+
+
+def evict_cached_searches(conn: Connection, max_age: timedelta, max_entries: int):
+    """
+    Function to delete cached searches not used for longer than max_age and, if there are still more than
+    max_entries, the least recently used ones
+
+    :param conn:
+    :param max_age:
+    :param max_entries:
+    :return: None
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM search_cache WHERE last_used < ?;",
+                       (datetime_to_iso(datetime.now(timezone.utc) - max_age),))
+        cursor.execute("""DELETE FROM search_cache WHERE id NOT IN (
+                              SELECT id FROM search_cache ORDER BY last_used DESC LIMIT ?
+                          );""", (max_entries,))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to cache RDAP (whois) results of networks (shared by all sessions) """
+
+def fetch_cached_rdap(conn: Connection, ip_version: int, address_key: str, min_fetched: datetime) -> dict | None:
+    """
+    Function to retrieve the cached RDAP result of the most specific network containing an address
+
+    :param conn:
+    :param ip_version:
+    :param address_key: address as a fixed-width hexadecimal string
+    :param min_fetched: results fetched before this date are considered expired
+    :return: dict | None
+    """
+    result = None
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""SELECT result FROM rdap_cache
+                          WHERE ip_version = ? AND start_address <= ? AND end_address >= ? AND fetched >= ?
+                          ORDER BY start_address DESC, end_address ASC LIMIT 1;""",
+                       (ip_version, address_key, address_key, datetime_to_iso(min_fetched)))
+        row = cursor.fetchone()
+
+        if row:
+            result = json.loads(row[0])
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return result
+
+
+def save_cached_rdap(conn: Connection, cidr: str, ip_version: int, start_address_key: str, end_address_key: str,
+                     fetched: datetime, result: dict) -> int:
+    fetched_str = datetime_to_iso(fetched)
+    result_str = json.dumps(result, default=str)
+
+    column_names = "cidr, ip_version, start_address, end_address, fetched, result"
+    where_clause = "cidr=?"
+    where_values = [cidr]
+    set_clause = "ip_version=?, start_address=?, end_address=?, fetched=?, result=?"
+    set_values = [ip_version, start_address_key, end_address_key, fetched_str, result_str]
+    item = (cidr, ip_version, start_address_key, end_address_key, fetched_str, result_str)
+
+    cached_rdap_id = add_or_update_if_exists(conn, "rdap_cache", column_names, where_clause, where_values,
+                                             set_clause, set_values, item)
+
+    return cached_rdap_id
+
+
+""" Functions to cache the bot accounts of each wiki (shared by all sessions) """
+
+def fetch_cached_bot_users(conn: Connection, site: str, min_fetched: datetime) -> list[str] | None:
+    """
+    Function to retrieve the usernames of the bot accounts of a wiki, if they were cached recently
+
+    :param conn:
+    :param site: "family:code" string of the wiki
+    :param min_fetched: usernames fetched before this date are considered expired
+    :return: list[str] | None
+    """
+    usernames = None
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT usernames FROM bot_users_cache WHERE site = ? AND fetched >= ?;",
+                       (site, datetime_to_iso(min_fetched)))
+        row = cursor.fetchone()
+
+        if row:
+            usernames = json.loads(row[0])
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return usernames
+
+
+def save_cached_bot_users(conn: Connection, site: str, fetched: datetime, usernames: list[str]):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("INSERT OR REPLACE INTO bot_users_cache (site, fetched, usernames) VALUES (?, ?, ?);",
+                       (site, datetime_to_iso(fetched), json.dumps(sorted(usernames))))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to cache contents of revisions (shared by all sessions) """
+
+def fetch_cached_revision_contents(conn: Connection, site: str, revids: list[int]) -> dict[int, str | None]:
+    """
+    Function to retrieve the cached contents of the revisions given, marking them as recently used
+
+    :param conn:
+    :param site:
+    :param revids:
+    :return: dict[int, str | None] --> contents by revision id (None if they are not publicly available), only
+    cached revisions are included
+    """
+    contents_dict = {}
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Revisions are requested in chunks, as the nº of variables in a query is limited
+        for i in range(0, len(revids), 500):
+            chunk = revids[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT revid, content FROM revision_contents_cache "
+                           f"WHERE site = ? AND revid IN ({placeholders});", (site, *chunk))
+            contents_dict.update(cursor.fetchall())
+
+            cursor.execute(f"UPDATE revision_contents_cache SET last_used = ? "
+                           f"WHERE site = ? AND revid IN ({placeholders});",
+                           (datetime_to_iso(datetime.now()), site, *chunk))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return contents_dict
+
+
+def save_cached_revision_contents(conn: Connection, site: str, contents_dict: dict[int, str | None]):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        last_used_str = datetime_to_iso(datetime.now())
+        cursor.executemany("INSERT OR REPLACE INTO revision_contents_cache (site, revid, content, n_bytes, last_used) "
+                           "VALUES (?, ?, ?, ?, ?);",
+                           [(site, revid, content, len(content.encode()) if content is not None else 0, last_used_str)
+                            for revid, content in contents_dict.items()])
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def evict_cached_revision_contents(conn: Connection, max_bytes: int):
+    """
+    Function to delete the least recently used cached revision contents until their total size fits in max_bytes
+
+    :param conn:
+    :param max_bytes:
+    :return: None
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""DELETE FROM revision_contents_cache WHERE rowid IN (
+                              SELECT rowid FROM (
+                                  SELECT rowid, SUM(n_bytes) OVER (ORDER BY last_used DESC, rowid DESC) AS total_bytes
+                                  FROM revision_contents_cache
+                              ) WHERE total_bytes > ?
+                          );""", (max_bytes,))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+
+""" Functions to cache changes made by revisions (shared by all sessions) """
+
+def fetch_cached_revision_diffs(conn: Connection, site: str, revids: list[int]) -> dict[int, str]:
+    """
+    Function to retrieve the cached changes made by the revisions given (with respect to their previous revision)
+
+    :param conn:
+    :param site:
+    :param revids:
+    :return: dict[int, str] --> changes by revision id, only cached revisions are included
+    """
+    diffs_dict = {}
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        # Revisions are requested in chunks, as the nº of variables in a query is limited
+        for i in range(0, len(revids), 500):
+            chunk = revids[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT revid, diff FROM revision_diffs_cache WHERE site = ? AND revid IN ({placeholders});",
+                           (site, *chunk))
+            diffs_dict.update(cursor.fetchall())
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return diffs_dict
+
+
+def save_cached_revision_diffs(conn: Connection, site: str, diffs_dict: dict[int, str]):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.executemany("INSERT OR REPLACE INTO revision_diffs_cache (site, revid, diff) VALUES (?, ?, ?);",
+                           [(site, revid, diff) for revid, diff in diffs_dict.items()])
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to cache results of edit war analyses by revisions analysed (shared by all sessions) """
+
+def fetch_cached_analysis_result(conn: Connection, fingerprint: str) -> dict | None:
+    """
+    Function to retrieve the result cached for an analysis, marking it as recently used
+
+    :param conn:
+    :param fingerprint: fingerprint of the revisions analysed
+    :return: dict | None --> reverts, mutual reverts (by indexes) and edit war value
+    """
+    cached_result = None
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT result FROM analysis_results_cache WHERE fingerprint = ?;", (fingerprint,))
+        row = cursor.fetchone()
+
+        if row is not None:
+            cursor.execute("UPDATE analysis_results_cache SET last_used = ? WHERE fingerprint = ?;",
+                           (datetime_to_iso(datetime.now()), fingerprint))
+            conn.commit()
+
+            cached_result = json.loads(row[0])
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return cached_result
+
+
+def save_cached_analysis_result(conn: Connection, fingerprint: str, result: dict, max_entries: int):
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("INSERT OR REPLACE INTO analysis_results_cache (fingerprint, result, last_used) "
+                       "VALUES (?, ?, ?);", (fingerprint, json.dumps(result), datetime_to_iso(datetime.now())))
+
+        # Least recently used results are deleted if there are more than max_entries
+        cursor.execute("""DELETE FROM analysis_results_cache WHERE fingerprint NOT IN (
+                              SELECT fingerprint FROM analysis_results_cache ORDER BY last_used DESC LIMIT ?
+                          );""", (max_entries,))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+""" Functions to checkpoint history fetches, so interrupted ones can be resumed (shared by all sessions) """
+
+def fetch_history_checkpoint(conn: Connection, site: str, title: str, start_date: datetime, rvprop: str) \
+        -> tuple[datetime, str, int, str] | None:
+    """
+    Function to retrieve the checkpoint of an interrupted history fetch
+
+    :param conn:
+    :param site:
+    :param title:
+    :param start_date:
+    :param rvprop: revision properties requested
+    :return: (datetime, str, int, str) | None --> (end date of the fetch, continuation token, nº of revisions
+    processed, name of the store holding them)
+    """
+    checkpoint = None
+
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT end_date, rvcontinue, n_revisions, revision_store FROM history_fetch_checkpoints "
+                       "WHERE site = ? AND title = ? AND start_date = ? AND rvprop = ?;",
+                       (site, title, datetime_to_iso(start_date), rvprop))
+        row = cursor.fetchone()
+
+        if row:
+            end_date, rvcontinue, n_revisions, revision_store = row
+            checkpoint = (datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%SZ"), rvcontinue, n_revisions, revision_store)
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+    return checkpoint
+
+
+def save_history_checkpoint(conn: Connection, site: str, title: str, start_date: datetime, end_date: datetime,
+                            rvprop: str, rvcontinue: str, n_revisions: int, revision_store: str):
+    """
+    Function to save the token to continue a history fetch, along with the nº of revisions processed until it (the
+    revisions themselves are kept by the store)
+
+    :param conn:
+    :param site:
+    :param title:
+    :param start_date:
+    :param end_date:
+    :param rvprop: revision properties requested
+    :param rvcontinue:
+    :param n_revisions:
+    :param revision_store: name of the store holding the revisions processed
+    :return: None
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("INSERT OR REPLACE INTO history_fetch_checkpoints (site, title, start_date, end_date, rvprop, "
+                       "rvcontinue, n_revisions, revision_store, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                       (site, title, datetime_to_iso(start_date), datetime_to_iso(end_date), rvprop, rvcontinue,
+                        n_revisions, revision_store, datetime_to_iso(datetime.now())))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def delete_history_checkpoint(conn: Connection, site: str, title: str, start_date: datetime, rvprop: str):
+    """
+    Function to delete the checkpoint of a finished history fetch
+
+    :param conn:
+    :param site:
+    :param title:
+    :param start_date:
+    :param rvprop: revision properties requested
+    :return: None
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM history_fetch_checkpoints WHERE site = ? AND title = ? AND start_date = ? "
+                       "AND rvprop = ?;", (site, title, datetime_to_iso(start_date), rvprop))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
+
+
+def delete_old_history_checkpoints(conn: Connection, max_age: timedelta):
+    """
+    Function to delete the checkpoints not updated for longer than max_age
+
+    :param conn:
+    :param max_age:
+    :return: None
+    """
+    # Create cursor to the db using the provided connection
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM history_fetch_checkpoints WHERE updated < ?;",
+                       (datetime_to_iso(datetime.now() - max_age),))
+
+        # Commit changes
+        conn.commit()
+    finally:
+        # No matter what, we ensure cursor end up closing
+        cursor.close()
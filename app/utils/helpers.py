@@ -1,7 +1,6 @@
 import re
 import os
-import plotext as plt
-import numpy as np
+import sys
 import getpass
 import subprocess
 
@@ -10,11 +9,20 @@ from datetime import datetime, timezone, timedelta
 from os import system as os_system
 from platform import system as platform_system
 from sys import stdout
-from ctypes import windll
 
 from app.utils.common import Singleton
 
 
+def is_interactive_terminal() -> bool:
+    """
+    Function that checks if the program is attached to a terminal (automatic executions from the task scheduler are
+    not, so any terminal UI work can be skipped)
+
+    :return: bool
+    """
+    return sys.stdin.isatty() and stdout.isatty()
+
+
 def ask_valid_date(msg: str, default_value: datetime, date_format: str) -> datetime:
     date = input(msg)
 
@@ -81,6 +89,9 @@ def validate_idx_in_list(idx: str, valid_values_list: list[int]) -> str:
 
 
 def print_delim_line(delim: str):
+    if not is_interactive_terminal():
+        return
+
     width = get_terminal_size().columns
     print("\n" + delim * width + "\n")
 
@@ -91,6 +102,9 @@ def clear_n_lines(n: int):
 
     :param n: number of lines
     """
+    if not is_interactive_terminal():
+        return
+
     for _ in range(n):
         stdout.write("\033[F")
         stdout.write("\033[K")
@@ -98,6 +112,10 @@ def clear_n_lines(n: int):
 
 
 def clear_terminal():
+    # Nothing to clear if there is no terminal attached (avoids spawning a subprocess on automatic executions)
+    if not is_interactive_terminal():
+        return
+
     if platform_system() == "Windows":
         os_system("cls")
     else:
@@ -123,6 +141,10 @@ def ask_yes_or_no_question(question: str) -> bool:
 
 
 def plot_graph(title: str, x_label: str, y_label: str, x_vals: list[str], y_vals: list[int]):
+    # Import only when a graph is plotted, as both libraries are slow to import and not needed on automatic executions
+    import plotext as plt
+    import numpy as np
+
     # Clear previous graph configuration
     plt.clear_figure()
 
@@ -214,6 +236,7 @@ def create_scheduled_task(task_name: str, frequency: int, execution_path: str, s
 
         # Ask user to confirm task creation (UAC confirmation)
         input("Now, a confirmation screen will appear to allow the creation of the scheduled task, please confirm. ")
+        from ctypes import windll   # Import only if system is Windows to avoid errors
         windll.shell32.ShellExecuteW(None, "runas", "schtasks.exe", cmd, None, 1)
 
     else:
@@ -272,6 +295,7 @@ def delete_scheduled_task(session_id: str):
         cmd = f'schtasks /Delete /TN "{task_name}" /F'
 
         # Delete task from Windows Task Scheduler
+        from ctypes import windll   # Import only if system is Windows to avoid errors
         windll.shell32.ShellExecuteW(None, "runas", "cmd.exe", f'/c {cmd}', None, 1)
 
         # Delete XML if exists
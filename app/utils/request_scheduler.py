@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+# Only needed for typing, pywikibot is imported when the first site is requested as it is slow to import
+if TYPE_CHECKING:
+    import pywikibot
+
+
+class _HostState(object):
+    """ Request budget of a host: token bucket (requests per second) and nº of requests allowed simultaneously """
+
+    def __init__(self, rate: float, concurrency: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0         # Set when the host asks to wait (lag, Retry-After...)
+        self.condition = threading.Condition()
+
+
+class _HostBusyError(Exception):
+    """ Lag or throttling signal of a host: seconds it asks to wait, and error raised if it does not recover """
+
+    def __init__(self, wait: float, error: Exception):
+        super().__init__(str(error))
+        self.wait = wait
+        self.error = error
+
+
+class RequestScheduler(object):
+    """
+    Scheduler shared by every request made to the API, so all of them respect a common budget per host. The budget
+    grows additively while requests succeed and is halved when the host reports lag or throttling (AIMD), so
+    requests run at the highest throughput tolerated by each wiki without manual tuning
+    """
+    INITIAL_RATE = 5.0              # Requests per second allowed at first
+    MIN_RATE = 0.2
+    MAX_RATE = 50.0
+    RATE_INCREASE = 0.5             # Requests per second added after each successful request
+    INITIAL_CONCURRENCY = 2.0       # Requests made simultaneously allowed at first
+    MAX_CONCURRENCY = 8.0
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 1.0              # Seconds, doubled after each retry (a random part of it is waited)
+    BACKOFF_CAP = 60.0
+
+    __THROTTLING_CODES = {"maxlag", "ratelimited", "readonly"}
+
+    _hosts_dict: dict[str, _HostState] = {}
+    _lock = threading.Lock()
+    _request_class: type = None     # Request of pywikibot reporting throttling to the scheduler (built on first use)
+
+
+    @classmethod
+    def submit(cls, site: 'pywikibot.site.APISite', params: dict) -> dict:
+        """
+        Function that sends a request to the API of a site when the budget of its host allows it, retrying it
+        (after a random wait that grows with each retry) if the host is lagged, throttling or unavailable
+
+        :param site:
+        :param params:
+        :return: dict --> data received
+        """
+        state = cls._get_host_state(site.hostname())
+        retries = 0
+
+        while True:
+            cls._acquire(state)
+
+            try:
+                data = cls._send(site, params)
+            except _HostBusyError as busy:
+                cls._release(state)
+
+                if retries >= cls.MAX_RETRIES:
+                    raise busy.error from None  # The host does not recover, so the caller handles it
+
+                retries += 1
+                backoff = random.uniform(0, min(cls.BACKOFF_CAP, cls.BACKOFF_BASE * 2 ** retries))
+                cls._decrease(state, max(busy.wait, backoff))
+            except Exception:
+                cls._release(state)
+                raise   # Not a throttling signal, so the caller handles it
+            else:
+                cls._release(state)
+                cls._increase(state)
+
+                return data
+
+
+    @classmethod
+    def _get_host_state(cls, host: str) -> _HostState:
+        state = cls._hosts_dict.get(host)
+
+        if state is None:
+            with cls._lock:
+                state = cls._hosts_dict.setdefault(host, _HostState(cls.INITIAL_RATE, cls.INITIAL_CONCURRENCY))
+
+        return state
+
+
+    @classmethod
+    def _acquire(cls, state: _HostState):
+        with state.condition:
+            while True:
+                now = time.monotonic()
+
+                # Refill tokens according to the time elapsed (at most 1 second of burst)
+                state.tokens = min(max(state.rate, 1.0), state.tokens + (now - state.last_refill) * state.rate)
+                state.last_refill = now
+
+                if now < state.paused_until:
+                    state.condition.wait(state.paused_until - now)
+                elif state.in_flight >= int(state.concurrency):
+                    state.condition.wait()
+                elif state.tokens < 1:
+                    state.condition.wait((1 - state.tokens) / state.rate)
+                else:
+                    state.tokens -= 1
+                    state.in_flight += 1
+                    return
+
+
+    @staticmethod
+    def _release(state: _HostState):
+        with state.condition:
+            state.in_flight -= 1
+            state.condition.notify_all()
+
+
+    @classmethod
+    def _increase(cls, state: _HostState):
+        # Additive increase, concurrency grows by 1 after as many successes as requests allowed simultaneously
+        with state.condition:
+            state.rate = min(cls.MAX_RATE, state.rate + cls.RATE_INCREASE)
+            state.concurrency = min(cls.MAX_CONCURRENCY, state.concurrency + 1 / state.concurrency)
+            state.condition.notify_all()
+
+
+    @classmethod
+    def _decrease(cls, state: _HostState, wait: float):
+        # Multiplicative decrease, and every request to the host waits the time requested
+        with state.condition:
+            state.rate = max(cls.MIN_RATE, state.rate / 2)
+            state.concurrency = max(1.0, state.concurrency / 2)
+            state.paused_until = max(state.paused_until, time.monotonic() + wait)
+            state.tokens = min(state.tokens, 1.0)
+
+
+    @classmethod
+    def _send(cls, site: 'pywikibot.site.APISite', params: dict) -> dict:
+        """
+        Function that sends a request to the API of a site through pywikibot (so its handling of login, tokens, GET
+        for read-only queries and API errors is kept), but the lag, throttling and server errors that pywikibot would
+        wait for and retry on its own are reported to the scheduler instead
+
+        :param site:
+        :param params:
+        :return: dict --> data received
+        """
+        request = cls._get_request_class()(site=site, parameters=params, throttle=False)
+
+        return request.submit()
+
+
+    @classmethod
+    def _get_request_class(cls) -> type['pywikibot.data.api.Request']:
+        # Built on first use, as pywikibot is slow to import
+        if cls._request_class is None:
+            from pywikibot.data import api
+            from pywikibot.exceptions import APIError, ServerError
+
+            throttling_codes_set = cls.__THROTTLING_CODES
+
+            class ScheduledRequest(api.Request):
+                def _http_request(self, use_get: bool, uri: str, data, headers, paramstring) -> tuple:
+                    response, use_get = super()._http_request(use_get, uri, data, headers, paramstring)
+
+                    if response is not None:
+                        # Time the host asks to wait (0 if not indicated), sent along with throttling and lag responses
+                        retry_after = response.headers.get("Retry-After", "")
+                        wait = float(retry_after) if retry_after.isdigit() else 0.0
+
+                        # Lag of the replicas (maxlag errors, the time they need to catch up) or throttling, whose
+                        # code is also sent in the headers of the response
+                        if response.headers.get("MediaWiki-API-Error") in throttling_codes_set:
+                            error = response.json().get("error", {})
+                            api_error = APIError(error.pop("code", "unknown"), error.pop("info", ""), **error)
+
+                            raise _HostBusyError(max(wait, float(error.get("lag", 0.0))), api_error)
+
+                        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                            raise _HostBusyError(wait, ServerError(f"{response.status_code} Client Error: "
+                                                                   f"{response.reason}"))
+
+                    return response, use_get
+
+                def wait(self, delay: int = None):
+                    # Called by pywikibot to wait before retrying failed requests (server errors, connection problems,
+                    # invalid responses...), which are retried by the scheduler instead
+                    raise _HostBusyError(float(delay or 0.0), ServerError("Request failed, the host may be busy or "
+                                                                          "unavailable"))
+
+            cls._request_class = ScheduledRequest
+
+        return cls._request_class
@@ -0,0 +1,69 @@
+import threading
+
+from typing import TYPE_CHECKING
+
+# Only needed for typing, pywikibot is imported when the first site is requested as it is slow to import
+if TYPE_CHECKING:
+    import pywikibot
+
+
+class SitePool(object):
+    """
+    Registry of shared pywikibot sites, so each site is built (and its site info loaded) only once per execution no
+    matter how many articles, users or fetch workers reference it
+    """
+    DEFAULT_FAMILY = 'wikipedia'
+
+    # Sites already built, keyed by the "family:code" string stored in LocalPage.site (and by (family, code))
+    _sites_dict: dict[str | tuple[str, str], 'pywikibot.site.APISite'] = {}
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def get_site(cls, site_key: str) -> 'pywikibot.site.APISite':
+        """
+        Function that returns the shared site referenced by a "family:code" string (format of str(pywikibot.Site))
+
+        :param site_key:
+        :return: pywikibot.site.APISite
+        """
+        # Fast path, no lock needed to read an already built site
+        site = cls._sites_dict.get(site_key)
+
+        if site is None:
+            fam, code = site_key.split(":", 1)
+            site = cls.get_site_by_code(code, fam)
+
+            # Save the string key too, so it does not have to be parsed again
+            cls._sites_dict[site_key] = site
+
+        return site
+
+
+    @classmethod
+    def get_site_by_code(cls, code: str, fam: str = DEFAULT_FAMILY) -> 'pywikibot.site.APISite':
+        """
+        Function that returns the shared site of a family and language code, building it if it is the first time
+        it is requested
+
+        :param code:
+        :param fam:
+        :return: pywikibot.site.APISite
+        """
+        site = cls._sites_dict.get((fam, code))
+
+        if site is None:
+            with cls._lock:
+                # Check again, another worker may have built it while waiting for the lock
+                site = cls._sites_dict.get((fam, code))
+
+                if site is None:
+                    import pywikibot
+                    site = pywikibot.Site(code, fam)
+
+                    # Load site info before sharing the site, so concurrent workers do not request it simultaneously
+                    site.namespaces
+
+                    cls._sites_dict[(fam, code)] = site
+
+        return site
@@ -0,0 +1,149 @@
+import hashlib
+import threading
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from app.utils.db_utils import sqlite_connection, fetch_cached_bot_users, save_cached_bot_users, DB_PATH
+from app.utils.request_scheduler import RequestScheduler
+from app.utils.site_pool import SitePool
+
+
+class UserRegistry(object):
+    """
+    Interning table of the usernames seen during the execution, so users are handled as ints while detecting
+    reverts, and only translated back to usernames at the end
+    """
+    _ids_dict: dict[str, int] = {}
+    _usernames_list: list[str] = []
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def intern(cls, username: str) -> int:
+        # Fast path, no lock needed to read an already interned username
+        user_id = cls._ids_dict.get(username)
+
+        if user_id is None:
+            with cls._lock:
+                user_id = cls._ids_dict.get(username)
+
+                if user_id is None:
+                    user_id = len(cls._usernames_list)
+                    cls._usernames_list.append(username)
+                    cls._ids_dict[username] = user_id
+
+        return user_id
+
+
+    @classmethod
+    def get_username(cls, user_id: int) -> str:
+        return cls._usernames_list[user_id]
+
+
+class BotRegistry(object):
+    """
+    Registry of the bot accounts of each wiki, whose activity is neither a revert nor a base for them: those in a
+    configurable list (known anti-vandalism bots) plus the accounts of the bot group of the wiki, requested once
+    and cached in database. Bot status of each interned user is computed once per wiki
+    """
+    KNOWN_BOTS = {"serobot", "patrubot", "avbot", "avdiscubot", "botarel", "cvbot", "cvnbot"}    # Lowercase
+    CACHE_TTL = timedelta(days=7)       # Time the bot accounts of a wiki are kept in database
+
+    _bots_by_site_dict: dict[str | None, frozenset[str]] = {}     # Lowercase usernames of the bots of each wiki
+    _flags_by_site_dict: dict[str | None, bytearray] = {}          # Bot status of each interned user in each wiki
+    _versions_by_site_dict: dict[str | None, str] = {}
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def get_is_bot(cls, site: str | None) -> Callable[[int], bool]:
+        """
+        Function that returns the function to check if an interned user is a bot in a wiki
+
+        :param site: "family:code" string of the wiki (None to check only the configured list)
+        :return: Callable[[int], bool]
+        """
+        bots_set = cls.get_bots(site)
+        flags = cls._flags_by_site_dict[site]
+
+        def is_bot(user_id: int) -> bool:
+            # Status of users interned since the last check is computed now, only once
+            if user_id >= len(flags):
+                with cls._lock:
+                    for new_user_id in range(len(flags), user_id + 1):
+                        username = UserRegistry.get_username(new_user_id)
+                        flags.append(username.lower() in bots_set)
+
+            return bool(flags[user_id])
+
+        return is_bot
+
+
+    @classmethod
+    def get_bots(cls, site: str | None) -> frozenset[str]:
+        """
+        Function that returns the lowercase usernames of the bots of a wiki, loading them the first time
+
+        :param site: "family:code" string of the wiki (None to get only the configured list)
+        :return: frozenset[str]
+        """
+        bots_set = cls._bots_by_site_dict.get(site)
+
+        if bots_set is None:
+            bot_group_usernames = cls._load_bot_group(site) if site is not None else []
+
+            with cls._lock:
+                bots_set = cls._bots_by_site_dict.setdefault(
+                    site, frozenset(cls.KNOWN_BOTS | {username.lower() for username in bot_group_usernames}))
+                cls._flags_by_site_dict.setdefault(site, bytearray())
+
+        return bots_set
+
+
+    @classmethod
+    def get_version(cls, site: str | None) -> str:
+        # Short digest of the bots of a wiki, so results depending on them are not reused if they change
+        version = cls._versions_by_site_dict.get(site)
+
+        if version is None:
+            version = hashlib.sha1("|".join(sorted(cls.get_bots(site))).encode()).hexdigest()
+            cls._versions_by_site_dict[site] = version
+
+        return version
+
+
+    @classmethod
+    def _load_bot_group(cls, site_key: str) -> list[str]:
+        with sqlite_connection(DB_PATH) as conn:
+            usernames = fetch_cached_bot_users(conn, site_key, datetime.now(timezone.utc) - cls.CACHE_TTL)
+
+        if usernames is not None:
+            return usernames
+
+        site = SitePool.get_site(site_key)
+        usernames = []
+        params = {
+            "action": "query",
+            "list": "allusers",
+            "augroup": "bot",
+            "aulimit": "max",
+            "format": "json"
+        }
+
+        while True:
+            # Create and send request
+            data = RequestScheduler.submit(site, params)
+
+            # Extract request data
+            usernames.extend(user["name"] for user in data["query"]["allusers"])
+
+            if "continue" not in data:
+                break
+
+            params.update(data["continue"])
+
+        with sqlite_connection(DB_PATH) as conn:
+            save_cached_bot_users(conn, site_key, datetime.now(timezone.utc), usernames)
+
+        return usernames
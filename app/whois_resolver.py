@@ -0,0 +1,123 @@
+import ipaddress
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from app.utils.db_utils import sqlite_connection, fetch_cached_rdap, save_cached_rdap, DB_PATH
+
+
+class WhoisResolver(object):
+    CACHE_TTL = timedelta(days=30)      # Time during which cached RDAP results are reused
+    MAX_WORKERS = 4                     # Max nº of RDAP lookups made simultaneously when prefetching
+
+    __IPV4_PATTERN = r'^((25[0-5]|2[0-4]\d|1\d{2}|[1-9]?\d)(\.|$)){4}$'
+    __IPV6_PATTERN = r'^([0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$'
+
+    _executor: ThreadPoolExecutor = None
+    _pending_lookups_dict: dict[str, Future] = {}      # Lookups prefetched in background, keyed by IP address
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def is_ip_address(cls, username: str) -> bool:
+        # Anonymous editors are identified by the IP address they edited from
+        return (re.fullmatch(cls.__IPV4_PATTERN, username) is not None or
+                re.fullmatch(cls.__IPV6_PATTERN, username) is not None)
+
+
+    @classmethod
+    def lookup(cls, ip: str) -> dict:
+        """
+        Function that returns the RDAP result of an IP address, waiting for its prefetch if it was requested or
+        reusing the cached result of the network containing it if there is any
+
+        :param ip:
+        :return: dict
+        """
+        with cls._lock:
+            future = cls._pending_lookups_dict.pop(ip, None)
+
+        result = None
+        if future is not None:
+            try:
+                result = future.result()
+            except Exception:
+                result = None   # Lookup is retried below, so the error (if it persists) reaches the caller
+
+        if result is None:
+            result = cls._lookup_with_cache(ip)
+
+        return result
+
+
+    @classmethod
+    def prefetch(cls, ips: Iterable[str]):
+        """
+        Function that starts background lookups of the IP addresses given (those not already pending), so their
+        results are ready when requested
+
+        :param ips:
+        :return: None
+        """
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS, thread_name_prefix="whois")
+
+            for ip in ips:
+                if ip not in cls._pending_lookups_dict:
+                    cls._pending_lookups_dict[ip] = cls._executor.submit(cls._lookup_with_cache, ip)
+
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Function that stops the background lookups, cancelling the pending ones (only the ones running are finished)
+
+        :return: None
+        """
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+            cls._pending_lookups_dict.clear()
+
+
+    @classmethod
+    def _lookup_with_cache(cls, ip: str) -> dict:
+        address = ipaddress.ip_address(ip)
+        min_fetched = datetime.now(timezone.utc) - cls.CACHE_TTL
+
+        # Each call uses its own connection, as lookups can be made from background threads
+        with sqlite_connection(DB_PATH) as conn:
+            result = fetch_cached_rdap(conn, address.version, cls._address_to_key(address), min_fetched)
+
+        if result is None:
+            from ipwhois import IPWhois     # Imported only when a lookup is needed, as it is slow to import
+
+            result = IPWhois(ip).lookup_rdap()
+
+            # Result is cached for the whole network the address belongs to, so any address within it is answered
+            # locally (if the network range is not available, it is cached only for this address)
+            network = result.get("network") or {}
+            try:
+                start_address = ipaddress.ip_address(network["start_address"])
+                end_address = ipaddress.ip_address(network["end_address"])
+                cidr = network.get("cidr") or f"{start_address}-{end_address}"
+            except (KeyError, TypeError, ValueError):
+                start_address = end_address = address
+                cidr = str(ipaddress.ip_network(address))
+
+            with sqlite_connection(DB_PATH) as conn:
+                save_cached_rdap(conn, cidr, address.version, cls._address_to_key(start_address),
+                                 cls._address_to_key(end_address), datetime.now(timezone.utc), result)
+
+        return result
+
+
+    @staticmethod
+    def _address_to_key(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> str:
+        # Fixed-width hexadecimal representation, so addresses can be compared as strings in database
+        return f"{int(address):032x}"
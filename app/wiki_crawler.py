@@ -1,43 +1,423 @@
 import math
-import pywikibot
 
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Iterable, Iterator, Callable
 from sortedcontainers import SortedSet
 from os import get_terminal_size
 from urllib.parse import quote
 
 from app.info_containers.local_page import LocalPage
 from app.info_containers.local_revision import LocalRevision
+from app.info_containers.local_user import LocalUser
 from app.utils.helpers import datetime_to_iso, clear_n_lines
+from app.utils.db_utils import (sqlite_connection, fetch_cached_search, save_cached_search, evict_cached_searches,
+                                fetch_history_checkpoint, save_history_checkpoint, delete_history_checkpoint,
+                                delete_old_history_checkpoints, DB_PATH)
 from app.utils.common import Singleton
+from app.utils.site_pool import SitePool
+from app.utils.request_scheduler import RequestScheduler
+
+# Only needed for typing, pywikibot is imported when the first request is made as it is slow to import
+if TYPE_CHECKING:
+    import pywikibot
 
 
 class WikiCrawler(object):
     language_code = 'en'
-    site = pywikibot.Site('en', 'wikipedia')
+    SEARCH_CACHE_TTL = timedelta(days=1)            # Time during which cached search results are considered fresh
+    SEARCH_CACHE_MAX_AGE = timedelta(days=30)       # Time after which unused cached search results are deleted
+    SEARCH_CACHE_MAX_ENTRIES = 200                  # Max nº of searches kept in cache
+    EXPANSION_MAX_WORKERS = 4                       # Max nº of pages expanded simultaneously on related searches
+    EXPANSION_MAX_FRONTIER = 1000                   # Max nº of pages pending to be expanded on related searches
+    HISTORY_CHECKPOINT_MAX_AGE = timedelta(days=7)  # Time after which interrupted history fetches are not resumed
+    FULL_RVPROP = "ids|timestamp|user|comment|sha1|size|tags"      # Revision fields shown to the user
+    LEAN_RVPROP = "ids|timestamp|user|sha1"                         # Revision fields needed to detect edit wars
+    TAGS_RVPROP = "ids|timestamp|user|sha1|tags"                    # Revision fields needed to estimate them by tags
+    ARTICLE_NAMESPACE = 0
+    CATEGORY_NAMESPACE = 14
+
+
+    @classmethod
+    def get_site(cls) -> 'pywikibot.site.APISite':
+        # Site is built on first use (shared with the rest of the program), as its construction may require requests
+        return SitePool.get_site_by_code(cls.language_code)
 
 
     @classmethod
     def set_language_code(cls, language_code: str):
         cls.language_code = language_code
-        cls.site = pywikibot.Site(language_code, 'wikipedia')
 
 
     @classmethod
-    def crawl_articles(cls, search: str, search_limit: int, search_type: int):
+    def crawl_articles(cls, search: str, search_limit: int, search_type: int) -> list[LocalPage]:
+        """
+        Function that searches articles by title or category. Results are cached in database, so repeated searches
+        are served without requests to Wikipedia while they are fresh, and stale category searches only list the ids
+        of the members of the category, requesting the info of those added since they were fetched
+
+        :param search:
+        :param search_limit:
+        :param search_type: 1 for search by category, any other value for search by title
+        :return: list[LocalPage]
+        """
+        import pywikibot
+
+        site = cls.get_site()
+        search_limit_key = search_limit if search_limit is not None else 0  # 0 represents no limit in cache
+        now = datetime.now(timezone.utc)
+
         match search_type:
             case 1:  # Search articles by category
-                pages = pywikibot.Category(cls.site, search).articles(total=search_limit)
+                generator_params = {"generator": "categorymembers",
+                                    "gcmtitle": pywikibot.Category(site, search).title(),
+                                    "gcmtype": "page|file"}
+                limit_param = "gcmlimit"
             case _:  # Search articles by title
-                pages = cls.site.search(search, total=search_limit, namespaces=0)
+                generator_params = {"generator": "search", "gsrsearch": search, "gsrnamespace": 0}
+                limit_param = "gsrlimit"
+
+        with sqlite_connection(DB_PATH) as conn:
+            cached_search = fetch_cached_search(conn, cls.language_code, search_type, search, search_limit_key)
+
+            # Fresh results in cache, no requests needed
+            if cached_search is not None and now - cached_search[0] < cls.SEARCH_CACHE_TTL:
+                _, complete, pages_info_list = cached_search
+
+            # Stale results of a category fully enumerated, only the ids of its current members are listed: members
+            # that left the category are dropped and info is only requested for the ones added since last fetch
+            elif cached_search is not None and search_type == 1 and cached_search[1]:
+                _, _, cached_pages_info_list = cached_search
+                cached_pages_info_dict = {page_info["pageid"]: page_info for page_info in cached_pages_info_list}
+
+                # Same members as a full request would return (also within the search limit)
+                member_pageids_list = cls.query_category_member_ids(site, generator_params["gcmtitle"], search_limit)
+                complete = search_limit is None or len(member_pageids_list) < search_limit
+
+                pages_info_dict = {pageid: cached_pages_info_dict[pageid] for pageid in member_pageids_list
+                                   if pageid in cached_pages_info_dict}
+                new_pageids_list = [pageid for pageid in member_pageids_list if pageid not in pages_info_dict]
+                batch_limit = cls.get_api_batch_limit(site)
+
+                for i in range(0, len(new_pageids_list), batch_limit):
+                    pageids = "|".join(str(pageid) for pageid in new_pageids_list[i:i + batch_limit])
+                    pages_info_dict.update((page_info["pageid"], page_info)
+                                           for page_info in cls.query_pages_info(site, {"pageids": pageids}))
+
+                pages_info_list = [pages_info_dict[pageid] for pageid in member_pageids_list
+                                   if pageid in pages_info_dict]
+
+                save_cached_search(conn, cls.language_code, search_type, search, search_limit_key, now, complete,
+                                   pages_info_list)
+
+            # No usable results in cache, all of them are requested
+            else:
+                pages_info_list = cls.query_pages_info(site, generator_params, limit_param, search_limit)
+                complete = search_limit is None or len(pages_info_list) < search_limit
+
+                save_cached_search(conn, cls.language_code, search_type, search, search_limit_key, now, complete,
+                                   pages_info_list)
+
+            evict_cached_searches(conn, cls.SEARCH_CACHE_MAX_AGE, cls.SEARCH_CACHE_MAX_ENTRIES)
+
+        return [LocalPage.init_with_page_info(page_info, site) for page_info in pages_info_list]
+
+
+    @classmethod
+    def crawl_categories(cls, local_page: LocalPage) -> list[LocalPage]:
+        site = SitePool.get_site(local_page.site)
+        generator_params = {"generator": "categories", "titles": local_page.title}
+
+        return [LocalPage.init_with_page_info(page_info, site)
+                for page_info in cls.query_pages_info(site, generator_params, "gcllimit")]
+
+
+    @classmethod
+    def expand_related_articles(cls, seed_pages: Iterable[LocalPage], max_depth: int, page_budget: int,
+                                on_article_found: Callable[[LocalPage], None],
+                                max_workers: int = None) -> int:
+        """
+        Function that walks breadth-first the graph of categories and links starting from the seed pages, up to
+        max_depth levels, expanding at most max_workers pages concurrently and keeping at most EXPANSION_MAX_FRONTIER
+        pages pending. Articles found (deduplicated by pageid) are passed to on_article_found as they arrive, and the
+        walk stops once page_budget articles have been found. Pages whose expansion fails are skipped
+
+        :param seed_pages:
+        :param max_depth: nº of levels to expand (1 for the categories and links of the seed pages only)
+        :param page_budget: max nº of articles to find
+        :param on_article_found: function called (from the calling thread) with each new article found
+        :param max_workers: max nº of pages expanded simultaneously (EXPANSION_MAX_WORKERS by default)
+        :return: int --> nº of articles found
+        """
+        max_workers = max_workers if max_workers is not None else cls.EXPANSION_MAX_WORKERS
+        n_articles_found = 0
+        seen_pageids_set = set[int]()
+        frontier: deque[tuple[LocalPage, int]] = deque()     # Pages pending to be expanded along with their level
+
+        for local_page in seed_pages:
+            seen_pageids_set.add(local_page.pageid)
+            if max_depth > 0:
+                frontier.append((local_page, 0))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        running_futures_dict: dict[Future, int] = {}
+
+        try:
+            while (frontier or running_futures_dict) and n_articles_found < page_budget:
+                # Keep workers busy with pages of the frontier (pages at the last level are not expanded)
+                while frontier and len(running_futures_dict) < max_workers:
+                    local_page, depth = frontier.popleft()
+                    future = executor.submit(cls._expand_page, local_page, page_budget - n_articles_found)
+                    running_futures_dict[future] = depth
+
+                if not running_futures_dict:
+                    break
+
+                # Process results as soon as any expansion finishes
+                done_futures, _ = wait(running_futures_dict, return_when=FIRST_COMPLETED)
+
+                for future in done_futures:
+                    depth = running_futures_dict.pop(future)
+
+                    try:
+                        neighbour_pages_list = future.result()
+                    except Exception as e:
+                        print(f"Related pages could not be retrieved: {e}")
+                        continue
+
+                    for neighbour_page in neighbour_pages_list:
+                        if neighbour_page.pageid in seen_pageids_set:
+                            continue
+                        seen_pageids_set.add(neighbour_page.pageid)
+
+                        # Articles are streamed to the caller, both articles and categories are expanded later
+                        if int(neighbour_page.namespace) == cls.ARTICLE_NAMESPACE:
+                            if n_articles_found >= page_budget:
+                                continue
+                            n_articles_found += 1
+                            on_article_found(neighbour_page)
+
+                        # Pages at the last level are not expanded, and once the frontier is full the walk keeps only
+                        # the pages already pending (the closest ones)
+                        if depth + 1 < max_depth and len(frontier) < cls.EXPANSION_MAX_FRONTIER:
+                            frontier.append((neighbour_page, depth + 1))
+        finally:
+            # Expansions still pending are not needed anymore, so the ones running are not waited for either
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return n_articles_found
+
+
+    @classmethod
+    def _expand_page(cls, local_page: LocalPage, limit: int) -> list[LocalPage]:
+        site = SitePool.get_site(local_page.site)
+
+        # Categories are expanded to their articles and subcategories
+        if int(local_page.namespace) == cls.CATEGORY_NAMESPACE:
+            generator_params = {"generator": "categorymembers", "gcmtitle": local_page.title,
+                                "gcmnamespace": f"{cls.ARTICLE_NAMESPACE}|{cls.CATEGORY_NAMESPACE}"}
+            pages_info_list = cls.query_pages_info(site, generator_params, "gcmlimit", limit)
+
+        # Articles are expanded to their (non-hidden) categories and the articles they link to
+        else:
+            generator_params = {"generator": "categories", "titles": local_page.title, "gclshow": "!hidden"}
+            pages_info_list = cls.query_pages_info(site, generator_params, "gcllimit")
+
+            generator_params = {"generator": "links", "titles": local_page.title,
+                                "gplnamespace": cls.ARTICLE_NAMESPACE}
+            pages_info_list += cls.query_pages_info(site, generator_params, "gpllimit", limit)
+
+        return [LocalPage.init_with_page_info(page_info, site) for page_info in pages_info_list]
+
+
+    @classmethod
+    def query_pages_info(cls, site: 'pywikibot.site.APISite', generator_params: dict, limit_param: str = None,
+                         total: int = None) -> list[dict]:
+        """
+        Function that requests the pages yielded by an API generator along with their info (prop=info with
+        inprop=url|talkid), so each request returns a full batch of pages ready to build LocalPages instead of
+        loading them one by one
+
+        :param site:
+        :param generator_params: generator and its parameters (e.g. {"generator": "search", "gsrsearch": ...}), or
+        the ids of the pages (e.g. {"pageids": "1|2"})
+        :param limit_param: name of the generator parameter that limits the nº of pages per request (not needed for
+        pages requested by id)
+        :param total: max nº of pages to retrieve (None for no limit)
+        :return: list[dict]
+        """
+        pages_info_list = []
+        batch_limit = cls.get_api_batch_limit(site)
+        continue_params = {}
+
+        while total is None or len(pages_info_list) < total:
+            params = {
+                "action": "query",
+                "prop": "info",
+                "inprop": "url|talkid",
+                "format": "json",
+                **generator_params,
+                **continue_params
+            }
+            # Do not request more pages than needed
+            if limit_param is not None:
+                params[limit_param] = batch_limit if total is None else min(batch_limit, total - len(pages_info_list))
+
+            # Create and send request
+            data = RequestScheduler.submit(site, params)
+
+            # Extract request data (generators do not keep the order of the results, but search ones include it)
+            pages = data.get("query", {}).get("pages", {})
+            pages = pages.values() if isinstance(pages, dict) else pages
+
+            for page_info in sorted(pages, key=lambda item: item.get("index", 0)):
+                if "missing" not in page_info and "invalid" not in page_info:
+                    pages_info_list.append(page_info)
+
+            # If there are still pages that must be retrieved
+            if "continue" in data:
+                continue_params = data["continue"]
+            else: # Otherwise exit since all pages have been extracted
+                break
+
+        return pages_info_list[:total]
+
+
+    @classmethod
+    def query_category_member_ids(cls, site: 'pywikibot.site.APISite', category_title: str,
+                                  total: int = None) -> list[int]:
+        """
+        Function that lists the ids of the pages of a category (in the same order as the categorymembers generator,
+        so the first total ones are the same pages it would return), without requesting their info
+
+        :param site:
+        :param category_title:
+        :param total: max nº of ids to retrieve (None for no limit)
+        :return: list[int]
+        """
+        pageids_list = []
+        batch_limit = cls.get_api_batch_limit(site)
+        continue_params = {}
+
+        while total is None or len(pageids_list) < total:
+            params = {
+                "action": "query",
+                "list": "categorymembers",
+                "cmtitle": category_title,
+                "cmtype": "page|file",
+                "cmprop": "ids",
+                "cmlimit": batch_limit if total is None else min(batch_limit, total - len(pageids_list)),
+                "format": "json",
+                **continue_params
+            }
+
+            data = RequestScheduler.submit(site, params)
+            pageids_list.extend(member["pageid"] for member in data.get("query", {}).get("categorymembers", []))
+
+            # If there are still members that must be retrieved
+            if "continue" in data:
+                continue_params = data["continue"]
+            else:
+                break
+
+        return pageids_list[:total]
+
+
+    @classmethod
+    def load_pages(cls, local_pages: Iterable[LocalPage]):
+        """
+        Function that attaches their pywikibot.Page to the LocalPages that do not have it yet (e.g. loaded from
+        database), requesting them by pageid in batches instead of one by one
+
+        :param local_pages:
+        :return: None
+        """
+        # Group pages to load by site, as each site requires its own requests
+        pages_to_load_dict: dict[str, dict[int, LocalPage]] = {}
+        for local_page in local_pages:
+            if not local_page.page_loaded:
+                pages_to_load_dict.setdefault(local_page.site, {})[local_page.pageid] = local_page
+
+        for site_key, local_pages_dict in pages_to_load_dict.items():
+            site = SitePool.get_site(site_key)
+
+            # Pywikibot splits pageids in batches of the max size allowed by the API
+            for page in site.load_pages_from_pageids(list(local_pages_dict.keys())):
+                local_pages_dict[page.pageid].page = page
+
 
-        return pages
+    @classmethod
+    def get_users_info(cls, site: 'pywikibot.site.APISite', usernames: Iterable[str]) -> dict[str, LocalUser]:
+        """
+        Function that retrieves the metadata (registration, blocks, edit count and groups) of many users, requesting
+        them in batches of the max size allowed by the API instead of one by one
+
+        :param site:
+        :param usernames:
+        :return: dict[str, LocalUser]
+        """
+        users_info_dict: dict[str, LocalUser] = {}
+        usernames_list = list(dict.fromkeys(usernames))     # Remove duplicates keeping order
+        batch_limit = cls.get_api_batch_limit(site)
+        anonymous_usernames_list = []
+
+        for i in range(0, len(usernames_list), batch_limit):
+            params = {
+                "action": "query",
+                "list": "users",
+                "ususers": "|".join(usernames_list[i:i + batch_limit]),
+                "usprop": "blockinfo|editcount|registration|groups",
+                "format": "json"
+            }
+
+            # Create and send request
+            data = RequestScheduler.submit(site, params)
+
+            # Extract request data (IP addresses are returned as invalid users, as they cannot be registered)
+            for user_data in data["query"]["users"]:
+                username = user_data["name"]
+                is_registered = "missing" not in user_data and "invalid" not in user_data
+                registration = user_data.get("registration")
+                registration_date = datetime.strptime(registration, "%Y-%m-%dT%H:%M:%SZ") if registration else None
+
+                users_info_dict[username] = LocalUser(username, str(site), is_registered, "blockid" in user_data,
+                                                      registration_date, user_data.get("editcount", 0),
+                                                      groups=user_data.get("groups", []))
+
+                if not is_registered:
+                    anonymous_usernames_list.append(username)
+
+        # Blocks of unregistered users (IP addresses) are not returned with their info, so they are requested apart
+        for i in range(0, len(anonymous_usernames_list), batch_limit):
+            params = {
+                "action": "query",
+                "list": "blocks",
+                "bkusers": "|".join(anonymous_usernames_list[i:i + batch_limit]),
+                "bkprop": "user",
+                "bklimit": "max",
+                "format": "json"
+            }
+
+            data = RequestScheduler.submit(site, params)
+
+            for block_data in data["query"]["blocks"]:
+                if block_data.get("user") in users_info_dict:
+                    users_info_dict[block_data["user"]].is_blocked = True
+
+        return users_info_dict
+
+
+    @staticmethod
+    def get_api_batch_limit(site: 'pywikibot.site.APISite') -> int:
+        # Max nº of pages per request allowed by the API (higher for accounts with the apihighlimits right)
+        return 500 if site.has_right("apihighlimits") else 50
 
 
     @classmethod
     def print_pages(cls, local_pages: SortedSet[LocalPage], time_range: tuple[datetime, datetime] = None,
-                    history_changes: bool = False, discussion_changes: bool = False, will_remove_lines: bool = False) \
-                    -> bool:
+                    history_changes: bool = False, discussion_changes: bool = False, will_remove_lines: bool = False,
+                    discussion_diffs: bool = False) -> bool:
         new_data_to_save = False
 
         # If history of discussion page contents will be displayed, time range is needed (provided or default)
@@ -49,6 +429,26 @@ class WikiCrawler(object):
                 start_date = datetime.now().replace(microsecond=0) - timedelta(days=30)
                 end_date = datetime.now().replace(microsecond=0)
 
+        # Activity of discussion pages without stored info for this time range is requested for all of them at once
+        if discussion_changes:
+            header = cls._talk_page_activity_header(start_date, end_date, discussion_diffs)
+            pages_to_fetch_list = [local_page for local_page in local_pages
+                                   if local_page.discussion_page_text is None
+                                   or not local_page.discussion_page_text.startswith(header)]
+
+            if pages_to_fetch_list:
+                print("\tRequesting discussion page changes to Wikipedia...")
+                activity_dict = cls.get_talk_pages_activity(pages_to_fetch_list, start_date, end_date,
+                                                            include_diffs=discussion_diffs)
+                clear_n_lines(1)
+
+                for local_page, (talk_revs_list, diffs_dict) in activity_dict.items():
+                    local_page.discussion_page_text = cls._render_talk_page_activity(header, talk_revs_list,
+                                                                                     diffs_dict)
+
+                # Indicate that new data should be saved in database
+                new_data_to_save = True
+
         # Print pages
         print("[ID] PAGE TITLE --> URL")
         idx = 0
@@ -79,13 +479,25 @@ class WikiCrawler(object):
                 info_dict = Singleton().articles_with_edit_war_info_dict
 
                 # History revisions page changes within time range
-                # If info is stored it is directly accessed
-                if local_page in info_dict and info_dict[local_page].revs_list is not None:
+                # If info is stored it is directly accessed (histories kept out of memory only hold the revisions of
+                # reverts, so they are requested)
+                if (local_page in info_dict and info_dict[local_page].revs_list is not None
+                        and not info_dict[local_page].out_of_core):
                     history_page_revs = info_dict[local_page].revs_list
 
+                    # Revisions analysed only have the fields needed for the detection, the rest are retrieved now
+                    if any(local_rev.tags is None for local_rev in history_page_revs):
+                        print("\tRequesting history page details to Wikipedia...")
+                        cls.backfill_revisions(SitePool.get_site(local_page.site), history_page_revs)
+                        clear_n_lines(1)
+
+                        # Indicate that new data should be saved in database
+                        new_data_to_save = True
+
                 else: # Otherwise it is requested to Wikipedia
                     print("\tRequesting history page contents to Wikipedia...")
-                    history_page_revs = cls.get_full_revisions_in_range(cls.site, local_page.page, start_date, end_date)
+                    history_page_revs = cls.get_full_revisions_in_range(cls.get_site(), local_page.page, start_date,
+                                                                        end_date)
                     clear_n_lines(1)
 
                     # Indicate that new data should be saved in database
@@ -97,77 +509,354 @@ class WikiCrawler(object):
                 cls.print_revs(history_page_revs)
 
             if discussion_changes:
-                # Discussion page changes within time range
-                # If info is stored it is directly accessed
-                if (local_page.discussion_page_title is not None and local_page.discussion_page_url is not None
-                        and local_page.discussion_page_text is not None):
-                    print(f'{local_page.discussion_page_title} --> {local_page.discussion_page_url}')
-                    print("\n" + local_page.discussion_page_text)
+                # Discussion page changes within time range (already retrieved above if they were not stored)
+                print(f'{local_page.discussion_page_title} --> {local_page.discussion_page_url}')
+                print("\n" + (local_page.discussion_page_text or ""))
 
-                else: # Otherwise it is requested to Wikipedia
-                    discussion_page = local_page.page.toggleTalkPage()
-                    local_page.discussion_page_title = discussion_page.title()
-                    local_page.discussion_page_url = discussion_page.full_url()
-                    local_page.discussion_page_text = discussion_page.text
+        return new_data_to_save
 
-                    print(f'{discussion_page.title()} --> {discussion_page.full_url()}')
-                    print("\n" + discussion_page.text)
 
-                    # Indicate that new data should be saved in database
-                    new_data_to_save = True
+    @classmethod
+    def get_full_revisions_in_range(cls, site: 'pywikibot.site.APISite', article: 'pywikibot.Page | str',
+                                    start: datetime, end: datetime,
+                                    include_text: bool = False, rvprop: str = None) -> list[LocalRevision]:
+        local_revs_list = []
 
-        return new_data_to_save
+        for local_revs_page in cls.iter_revisions_in_range(site, article, start, end, include_text, rvprop):
+            local_revs_list.extend(local_revs_page)
+
+        return local_revs_list
 
 
     @classmethod
-    def get_full_revisions_in_range(cls, site: pywikibot.site, article: pywikibot.Page, start: datetime, end: datetime,
-                                    include_text: bool = False) -> list[LocalRevision]:
-        # Make sure both datetimes are in UTC and with the right format
-        start_str = datetime_to_iso(start)
-        end_str = datetime_to_iso(end)
+    def iter_revisions_in_range(cls, site: 'pywikibot.site.APISite', article: 'pywikibot.Page | str',
+                                start: datetime, end: datetime, include_text: bool = False, rvprop: str = None,
+                                rvcontinue: str = None,
+                                on_page_processed: Callable[[str], None] = None) -> Iterator[list[LocalRevision]]:
+        """
+        Generator that yields the revisions within a time range (in chronological order) page by page as they are
+        received, requesting the next page in background while the current one is processed
+
+        :param site:
+        :param article:
+        :param start:
+        :param end:
+        :param include_text:
+        :param rvprop: revision fields requested, all of them shown to the user by default (with LEAN_RVPROP, the
+        comments, sizes and tags not needed to detect edit wars can be retrieved later with backfill_revisions)
+        :param rvcontinue: token to resume the fetch from, as saved by a checkpoint
+        :param on_page_processed: function called with the token to continue the fetch once each page (but the last
+        one) has been processed by the consumer, so it can checkpoint it
+        :return: Iterator[list[LocalRevision]]
+        """
+        # Title can be given directly, so pages that are not loaded (e.g. discussion pages) need no previous request
+        title = article if isinstance(article, str) else article.title()
 
         # Ensure rvstart goes before rvend
         if start > end:
-            start_str, end_str = end_str, start_str
+            start, end = end, start
+
+        # Make sure both datetimes are in UTC and with the right format
+        start_str = datetime_to_iso(start)
+        end_str = datetime_to_iso(end)
 
         # Set request params
-        local_revs_list = []
-        rvcontinue = None
+        rvprop = rvprop or cls.FULL_RVPROP
+        if include_text: # If revision text wants to be retrieved too
+            rvprop += "|content"
 
-        while True:
+        def request_page(page_rvcontinue: str | None) -> dict:
             params = {
                 "action": "query",
                 "prop": "revisions",
-                "titles": article.title(),
+                "titles": title,
                 "rvstart": start_str,
                 "rvend": end_str,
                 "rvdir": "newer",
                 "rvlimit": "max",
                 "rvslots": "main",
-                "rvprop": "ids|timestamp|user|comment|sha1|size|tags",
+                "rvprop": rvprop,
                 "format": "json"
             }
-            if rvcontinue: # If contents were too large for a unique msg and further info must be collected
-                params["rvcontinue"] = rvcontinue
-            if include_text: # If revision text wants to be retrieved too
-                params["rvprop"] += "|content"
+            if page_rvcontinue: # If contents were too large for a unique msg and further info must be collected
+                params["rvcontinue"] = page_rvcontinue
 
             # Create and send request
-            request = site._request(**params)
-            data = request.submit()
+            return RequestScheduler.submit(site, params)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history_fetch")
+        try:
+            future = executor.submit(request_page, rvcontinue)
+
+            while future is not None:
+                data = future.result()
+
+                # If there is still data that must be retrieved, next page is requested before processing this one
+                if "continue" in data:
+                    rvcontinue = data["continue"]["rvcontinue"]
+                    future = executor.submit(request_page, rvcontinue)
+                else: # Otherwise this is the last page, since all info has been extracted
+                    future = None
+
+                # Extract request data
+                page_id = next(iter(data["query"]["pages"]))
+                revs_list = data["query"]["pages"][page_id].get("revisions", [])
+
+                yield [LocalRevision.init_with_revision(rev) for rev in revs_list]
+
+                # Consumer has processed the page, so the fetch could be resumed from the next one
+                if future is not None and on_page_processed is not None:
+                    on_page_processed(rvcontinue)
+        finally:
+            # Pending request is discarded if the consumer stops before the end
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    @classmethod
+    def fetch_history_checkpoint(cls, site_key: str, title: str, start: datetime, end: datetime,
+                                 rvprop: str) -> tuple[str, int, str, datetime] | None:
+        """
+        Function that retrieves the checkpoint of an interrupted fetch of the same history, if it can be resumed to
+        reach the end date given (the continuation token does not depend on it), deleting first the checkpoints too
+        old to be resumed
+
+        :param site_key: "family:code" string of the site
+        :param title:
+        :param start:
+        :param end:
+        :param rvprop:
+        :return: tuple[str, int, str, datetime] | None --> (continuation token, nº of revisions processed, name of
+        the store holding them, end date of the interrupted fetch)
+        """
+        with sqlite_connection(DB_PATH) as conn:
+            delete_old_history_checkpoints(conn, cls.HISTORY_CHECKPOINT_MAX_AGE)
+            checkpoint = fetch_history_checkpoint(conn, site_key, title, start, rvprop)
+
+        if checkpoint is None or datetime_to_iso(checkpoint[0]) > datetime_to_iso(end):
+            return None
+
+        checkpoint_end, rvcontinue, n_revisions, revision_store_name = checkpoint
+
+        return rvcontinue, n_revisions, revision_store_name, checkpoint_end
+
+
+    @classmethod
+    def save_history_checkpoint(cls, site_key: str, title: str, start: datetime, end: datetime, rvprop: str,
+                                rvcontinue: str, n_revisions: int, revision_store_name: str):
+        with sqlite_connection(DB_PATH) as conn:
+            save_history_checkpoint(conn, site_key, title, start, end, rvprop, rvcontinue, n_revisions,
+                                    revision_store_name)
+
+
+    @classmethod
+    def delete_history_checkpoint(cls, site_key: str, title: str, start: datetime, rvprop: str):
+        with sqlite_connection(DB_PATH) as conn:
+            delete_history_checkpoint(conn, site_key, title, start, rvprop)
+
+
+    @classmethod
+    def backfill_revisions(cls, site: 'pywikibot.site.APISite', local_revs: Iterable[LocalRevision]):
+        """
+        Function that retrieves in batches the comments, sizes and tags of the revisions received with the lean
+        profile (those without tags), only when they are going to be shown
+
+        :param site:
+        :param local_revs:
+        :return: None
+        """
+        local_revs_dict = {local_rev.revid: local_rev for local_rev in local_revs if local_rev.tags is None}
+        revids_list = list(local_revs_dict)
+        batch_limit = cls.get_api_batch_limit(site)
+
+        for i in range(0, len(revids_list), batch_limit):
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "revids": "|".join(str(revid) for revid in revids_list[i:i + batch_limit]),
+                "rvprop": "ids|comment|size|tags",
+                "format": "json"
+            }
+
+            # Create and send request
+            data = RequestScheduler.submit(site, params)
 
             # Extract request data
-            page_id = next(iter(data["query"]["pages"]))
-            for rev in data["query"]["pages"][page_id].get("revisions", []):
-                local_revs_list.append(LocalRevision.init_with_revision(rev))
+            for page in data["query"].get("pages", {}).values():
+                for rev in page.get("revisions", []):
+                    local_rev = local_revs_dict[rev["revid"]]
+                    local_rev.comment = rev.get("comment")
+                    local_rev.size = rev.get("size")
+                    local_rev.tags = rev.get("tags", [])
 
-            # If there is still data that must be retrieved
-            if "continue" in data:
-                rvcontinue = data["continue"]["rvcontinue"]
-            else: # Otherwise exit since all info has been extracted
-                break
 
-        return local_revs_list
+    @classmethod
+    def get_talk_pages_activity(cls, local_pages: Iterable[LocalPage], start: datetime, end: datetime,
+                                include_diffs: bool = False) \
+                                -> dict[LocalPage, tuple[list[LocalRevision], dict[int, str]]]:
+        """
+        Function that retrieves the revisions (metadata and optionally their diffs) made to the discussion pages of
+        the articles given within a time range, without downloading the contents of those pages. Pages whose
+        revisions can not be retrieved are returned with no activity
+
+        :param local_pages:
+        :param start:
+        :param end:
+        :param include_diffs:
+        :return: dict[LocalPage, tuple[list[LocalRevision], dict[int, str]]]
+        """
+        if start > end:
+            start, end = end, start
+        start_str = datetime_to_iso(start)
+
+        # 1º Group discussion pages by site (articles loaded from database may not have the title stored)
+        talk_pages_by_site_dict: dict[str, dict[str, LocalPage]] = {}
+        for local_page in local_pages:
+            if local_page.discussion_page_title is None:
+                discussion_page = local_page.page.toggleTalkPage()
+                local_page.discussion_page_title = discussion_page.title()
+                local_page.discussion_page_url = discussion_page.full_url()
+
+            talk_pages_by_site_dict.setdefault(local_page.site, {})[local_page.discussion_page_title] = local_page
+
+        # 2º Discard in batched requests discussion pages whose last revision is older than the start of the time
+        # range (the time of last change of a page is not used, as purges and changes of templates update it), as
+        # the API only allows limiting revisions to a time range when they are requested page by page
+        activity_dict = {}
+        active_pages_list = []
+        for site_key, talk_pages_dict in talk_pages_by_site_dict.items():
+            site = SitePool.get_site(site_key)
+            titles_list = list(talk_pages_dict)
+            batch_limit = cls.get_api_batch_limit(site)
+
+            for i in range(0, len(titles_list), batch_limit):
+                # Only the last revision of each page is returned when several pages are requested at once
+                params = {
+                    "action": "query",
+                    "prop": "revisions",
+                    "rvprop": "ids|timestamp",
+                    "titles": "|".join(titles_list[i:i + batch_limit]),
+                    "format": "json"
+                }
+
+                data = RequestScheduler.submit(site, params)
+
+                # Titles may be returned normalized, so they are mapped back to the ones requested
+                normalized_dict = {item["to"]: item["from"] for item in data["query"].get("normalized", [])}
+                for page_info in data["query"]["pages"].values():
+                    title = normalized_dict.get(page_info["title"], page_info["title"])
+                    local_page = talk_pages_dict.get(title)
+
+                    if local_page is None:
+                        continue
+
+                    # Timestamps are in the same ISO format, so they can be compared as strings
+                    last_revs_list = page_info.get("revisions", [])
+                    if "missing" in page_info or not last_revs_list or last_revs_list[0]["timestamp"] < start_str:
+                        activity_dict[local_page] = ([], {})
+                    else:
+                        active_pages_list.append((site, local_page))
+
+        # 3º Request revisions within the time range of the remaining pages simultaneously (pages whose revisions
+        # can not be retrieved are returned with no activity, instead of aborting the rest)
+        with ThreadPoolExecutor(max_workers=cls.EXPANSION_MAX_WORKERS) as executor:
+            futures_dict = {executor.submit(cls.get_full_revisions_in_range, site, local_page.discussion_page_title,
+                                            start, end): (site, local_page)
+                            for site, local_page in active_pages_list}
+
+            for future, (site, local_page) in futures_dict.items():
+                try:
+                    talk_revs_list = future.result()
+                    diffs_dict = cls.get_revision_diffs(site, [rev.revid for rev in talk_revs_list]) \
+                        if include_diffs else {}
+                except Exception as e:
+                    print(f"Changes of {local_page.discussion_page_title} could not be retrieved: {e}")
+                    talk_revs_list, diffs_dict = [], {}
+
+                activity_dict[local_page] = (talk_revs_list, diffs_dict)
+
+        return activity_dict
+
+
+    @classmethod
+    def get_revision_diffs(cls, site: 'pywikibot.site.APISite', revids: Iterable[int]) -> dict[int, str]:
+        """
+        Function that retrieves simultaneously the changes made by each revision given (with respect to the previous
+        one), as lines of text starting by "+" (added) or "-" (removed). Revisions that can not be compared (deleted
+        or suppressed, or requests that keep failing) are left out
+
+        :param site:
+        :param revids:
+        :return: dict[int, str]
+        """
+        def get_diff(revid: int) -> str | None:
+            params = {
+                "action": "compare",
+                "fromrev": revid,
+                "torelative": "prev",
+                "prop": "diff|ids",
+                "format": "json"
+            }
+
+            try:
+                data = RequestScheduler.submit(site, params)
+            except Exception as e:
+                print(f"Changes of revision {revid} could not be retrieved: {e}")
+                return None
+
+            # First revision of a page has no previous one to compare with (it is compared with an empty page)
+            if "fromrevid" not in data["compare"]:
+                return ""
+
+            return cls._diff_table_to_text(data["compare"].get("*", ""))
+
+        revids_list = list(revids)
+        with ThreadPoolExecutor(max_workers=cls.EXPANSION_MAX_WORKERS) as executor:
+            return {revid: diff for revid, diff in zip(revids_list, executor.map(get_diff, revids_list))
+                    if diff is not None}
+
+
+    @staticmethod
+    def _diff_table_to_text(diff_html: str) -> str:
+        # Diffs are returned as rows of an HTML table, only added and removed lines are kept
+        import html
+        import re
+
+        lines_list = []
+        for cell_class, content in re.findall(r'<td class="diff-(addedline|deletedline)[^"]*"[^>]*>(.*?)</td>',
+                                              diff_html, re.DOTALL):
+            text = html.unescape(re.sub(r"<[^>]+>", "", content)).strip()
+            if text:
+                lines_list.append(("+ " if cell_class == "addedline" else "- ") + text)
+
+        return "\n".join(lines_list)
+
+
+    @staticmethod
+    def _talk_page_activity_header(start: datetime, end: datetime, include_diffs: bool = False) -> str:
+        # Time range is included, so stored activity is only reused when it corresponds to the same range (activity
+        # stored with diffs is also valid when they are not requested, as its header starts the same way)
+        return (f'Discussion page changes from {start.strftime("%d/%m/%Y %H:%M:%S")} to '
+                f'{end.strftime("%d/%m/%Y %H:%M:%S")}' + (' (with changes)' if include_diffs else ''))
+
+
+    @staticmethod
+    def _render_talk_page_activity(header: str, talk_revs_list: list[LocalRevision], diffs_dict: dict[int, str]) \
+            -> str:
+        lines_list = [f"{header}: {len(talk_revs_list)}", "", "REV ID, TIMESTAMP, USER, SIZE CHANGE, COMMENT"]
+
+        # Size of the revision previous to the time range is unknown, so the first change is not computed
+        prev_size = None
+        for local_rev in talk_revs_list:
+            size_change = local_rev.size - prev_size if prev_size is not None else 0
+            prev_size = local_rev.size
+            size_change = f'+{size_change}' if size_change > 0 else f'{size_change}'
+            lines_list.append(f'{local_rev.revid}, {local_rev.timestamp}, {local_rev.user}, {size_change}, '
+                              f'"{local_rev.comment}"')
+
+            if diffs_dict.get(local_rev.revid):
+                lines_list.append("\t" + diffs_dict[local_rev.revid].replace("\n", "\n\t"))
+
+        return "\n".join(lines_list)
 
 
     @staticmethod
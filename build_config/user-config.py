@@ -1,2 +1,6 @@
 family = 'wikipedia'
-mylang = 'es'
\ No newline at end of file
+mylang = 'es'
+
+# Days that cached site info (siteinfo requests made by pywikibot when a site is first used) is kept on disk
+# (apicache folder) before requesting it again to Wikipedia
+API_config_expiry = 90